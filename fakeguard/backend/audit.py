@@ -0,0 +1,157 @@
+"""
+Prediction audit log: a bounded in-memory buffer drained to rotating files
+
+Built on sink.BufferedSink: the writer thread encodes everything buffered
+and writes it in one call. Files are per process (`predictions-<pid>.jsonl`
+or `.bin`) and rotate like logging's RotatingFileHandler (`.1` is the most
+recent backup).
+
+Binary files start with MAGIC followed by fixed-width RECORD structs:
+timestamp (unix seconds), text length, confidence, prediction code,
+sentiment code, endpoint code. A label the log does not know is stored as
+UNKNOWN_CODE.
+"""
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Iterator
+
+from sink import PREDICTIONS, SENTIMENTS, BufferedSink
+
+FORMATS = ("jsonl", "binary")
+MAGIC = b"FGAUDIT1"
+RECORD = struct.Struct("<dIfBBB")
+
+ENDPOINTS = ("predict", "batch", "stream", "long")
+# Binary code of a label missing from the tuples above; decoded as UNKNOWN_LABEL
+UNKNOWN_CODE = 255
+UNKNOWN_LABEL = "unknown"
+PREDICTION_CODES = {label: code for code, label in enumerate(PREDICTIONS)}
+SENTIMENT_CODES = {label: code for code, label in enumerate(SENTIMENTS)}
+ENDPOINT_CODES = {label: code for code, label in enumerate(ENDPOINTS)}
+
+
+def _label(labels, code: int) -> str:
+    return labels[code] if code < len(labels) else UNKNOWN_LABEL
+
+
+class PredictionAuditLog(BufferedSink):
+    """
+    Non-blocking prediction audit sink writing rotating files; without a
+    directory the sink is disabled
+    """
+
+    name = "Audit log"
+
+    def __init__(self, directory: str = None, fmt: str = "jsonl", capacity: int = 65536,
+                 max_file_bytes: int = 64 * 1024 * 1024, backups: int = 5, flush_seconds: float = 1.0):
+        if fmt not in FORMATS:
+            raise ValueError(f"Audit log format must be one of {', '.join(FORMATS)}, got '{fmt}'")
+        super().__init__(capacity, flush_seconds)
+        self.directory = Path(directory) if directory else None
+        self.fmt = fmt
+        self.max_file_bytes = max_file_bytes
+        self.backups = backups
+        self.rotations = 0
+        self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    @property
+    def path(self) -> Path:
+        suffix = "jsonl" if self.fmt == "jsonl" else "bin"
+        return self.directory / f"predictions-{os.getpid()}.{suffix}"
+
+    def record(self, endpoint: str, prediction: str, confidence: float, sentiment: str, text_length: int):
+        """Buffer one prediction; drops it (and counts the drop) if the buffer is full"""
+        self._append((time.time(), endpoint, prediction, float(confidence), str(sentiment), text_length))
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _encode(self, records) -> bytes:
+        if self.fmt == "jsonl":
+            return "".join(
+                json.dumps({
+                    "ts": round(ts, 6), "endpoint": endpoint, "prediction": prediction,
+                    "confidence": confidence, "sentiment": sentiment, "text_length": text_length,
+                }, separators=(",", ":")) + "\n"
+                for ts, endpoint, prediction, confidence, sentiment, text_length in records
+            ).encode("utf-8")
+        return b"".join(
+            RECORD.pack(ts, text_length, confidence, PREDICTION_CODES.get(prediction, UNKNOWN_CODE),
+                        SENTIMENT_CODES.get(sentiment, UNKNOWN_CODE), ENDPOINT_CODES.get(endpoint, UNKNOWN_CODE))
+            for ts, endpoint, prediction, confidence, sentiment, text_length in records
+        )
+
+    def _open_file(self):
+        path = self.path
+        self._file = open(path, "ab")
+        if self.fmt == "binary" and self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def _rotate(self):
+        """Shift backups up by one and start a fresh file"""
+        self._file.close()
+        path = self.path
+        for index in range(self.backups - 1, 0, -1):
+            source = path.with_name(f"{path.name}.{index}")
+            if source.exists():
+                os.replace(source, path.with_name(f"{path.name}.{index + 1}"))
+        if self.backups:
+            os.replace(path, path.with_name(f"{path.name}.1"))
+        else:
+            path.unlink()
+        self.rotations += 1
+        self._open_file()
+
+    def _write(self, records):
+        if self._file is None:
+            self._open_file()
+        if self._file.tell() >= self.max_file_bytes:
+            self._rotate()
+        self._file.write(self._encode(records))
+        self._file.flush()
+
+    def stats(self) -> dict:
+        """Audit sink counters for the monitoring endpoints"""
+        return {
+            "enabled": self.enabled,
+            "format": self.fmt,
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "rotations": self.rotations,
+        }
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Decode an audit file of either format back into record dicts"""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC))
+        if head != MAGIC:
+            f.seek(0)
+            for line in f:
+                yield json.loads(line)
+            return
+        while True:
+            data = f.read(RECORD.size)
+            if len(data) < RECORD.size:
+                return
+            ts, text_length, confidence, prediction, sentiment, endpoint = RECORD.unpack(data)
+            yield {
+                "ts": ts, "endpoint": _label(ENDPOINTS, endpoint), "prediction": _label(PREDICTIONS, prediction),
+                "confidence": round(confidence, 3), "sentiment": _label(SENTIMENTS, sentiment),
+                "text_length": text_length,
+            }
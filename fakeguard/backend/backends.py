@@ -0,0 +1,326 @@
+"""
+Model backend interface and the hashed TF-IDF linear backend
+
+A backend turns article texts into prediction dicts with the keys
+`prediction`, `confidence`, `sentiment`, `features` and `timings`.
+FakeNewsDetector (detector.py) is the heuristic backend; HashedTfidfBackend
+scores with a trained linear model whose weights are memory-mapped from a
+`.npz` file or a directory of `.npy` files, never unpickled.
+"""
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from matcher import PhraseMatcher, load_lexicons
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class ModelBackend(ABC):
+    """Interface implemented by every scoring model"""
+
+    # Registry name used by create_backend
+    name = None
+    model_version = None
+
+    @abstractmethod
+    def predict(self, text: str, explain: bool = False) -> dict:
+        """Score one text"""
+
+    @abstractmethod
+    def predict_many(self, texts: List[str], explain: bool = False) -> List[dict]:
+        """
+        Score a batch of texts
+        With `explain`, every result also has an 'explanation': the matched
+        lexicon phrases with their offsets and each feature's score contribution
+        """
+
+    @property
+    @abstractmethod
+    def spec(self) -> Tuple[str, dict]:
+        """(name, options) that rebuild an equivalent backend in another process"""
+
+    def predict_long(self, text: str, window_chars: int = 5000) -> dict:
+        """Score a document of any length with overlapping windows"""
+        raise NotImplementedError(f"The {self.name} backend does not support long documents")
+
+    def warmup(self):
+        """Load anything that is loaded lazily, before serving traffic"""
+
+    def describe(self) -> dict:
+        """Backend details for the model-info endpoint"""
+        return {"backend": self.name, "version": self.model_version}
+
+
+def create_backend(name: str, **options) -> ModelBackend:
+    """Build a backend by registry name"""
+    if name == "heuristic":
+        from detector import FakeNewsDetector
+        return FakeNewsDetector(**options)
+    if name == "tfidf":
+        return HashedTfidfBackend(**options)
+    raise ValueError(f"Unknown model backend '{name}', expected 'heuristic' or 'tfidf'")
+
+
+def _mmap_npz_member(path: Path, member: str) -> np.ndarray:
+    """
+    Memory-map one array stored uncompressed in an .npz archive
+    np.load ignores mmap_mode for archives, so the member's data offset is
+    located through the zip local header and the .npy header instead.
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(member + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        logger.warning(f"{path}:{member} is compressed and cannot be memory-mapped, loading it into memory")
+        with np.load(path) as archive:
+            return archive[member]
+    with open(path, "rb") as f:
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", f.read(4))
+        f.seek(name_length + extra_length, 1)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset,
+                     order="F" if fortran_order else "C")
+
+
+def load_array(path: Path, member: str) -> np.ndarray:
+    """Memory-map an array from an .npz archive or a directory of .npy files"""
+    if path.is_dir():
+        return np.load(path / f"{member}.npy", mmap_mode="r")
+    return _mmap_npz_member(path, member)
+
+
+def load_meta(path: Path) -> dict:
+    """Read the small JSON metadata of a model artifact without touching the weights"""
+    if path.is_dir():
+        return json.loads((path / "meta.json").read_text())
+    with np.load(path) as archive:
+        return json.loads(str(archive["meta"]))
+
+
+def save_artifact(path, weights: np.ndarray, idf: np.ndarray, bias: float, meta: dict):
+    """Write a model artifact as an uncompressed (memory-mappable) .npz"""
+    meta = dict(meta, bias=float(bias), n_features=int(len(weights)))
+    np.savez(path, weights=weights.astype(np.float32), idf=idf.astype(np.float32), meta=np.array(json.dumps(meta)))
+
+
+def hash_features(texts: List[str], n_features: int, ngrams: int = 2):
+    """
+    Hash the word n-grams of each text into `n_features` signed buckets
+    Returns (row, column, signed count) arrays with one entry per distinct
+    (text, bucket) pair, ready for sparse dot products with np.bincount.
+    """
+    rows = []
+    hashes = []
+    for row, text in enumerate(texts):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        grams = list(tokens)
+        for n in range(2, ngrams + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        hashes.extend(zlib.crc32(gram.encode("utf-8")) for gram in grams)
+        rows.extend([row] * len(grams))
+
+    hashes = np.array(hashes, dtype=np.int64)
+    rows = np.array(rows, dtype=np.int64)
+    columns = hashes % n_features
+    # The top hash bit picks the sign, so colliding n-grams tend to cancel out
+    signs = np.where(hashes >> 31, -1.0, 1.0)
+    keys, inverse = np.unique(rows * n_features + columns, return_inverse=True)
+    counts = np.bincount(inverse, weights=signs, minlength=len(keys))
+    return keys // n_features, keys % n_features, counts
+
+
+def tfidf_values(columns: np.ndarray, counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """Sublinear TF-IDF weight for each hashed entry"""
+    return np.sign(counts) * np.log1p(np.abs(counts)) * idf[columns]
+
+
+def _l2_normalize(rows: np.ndarray, values: np.ndarray, n_rows: int) -> np.ndarray:
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n_rows))
+    return values / np.maximum(norms[rows], 1e-12)
+
+
+def train_linear_model(texts: List[str], labels: List[int], n_features: int = 2 ** 18,
+                       ngrams: int = 2, epochs: int = 200, learning_rate: float = 1.0,
+                       l2: float = 1e-4):
+    """
+    Fit IDF weights and a logistic regression (label 1 = FAKE) with NumPy only
+    Returns (weights, idf, bias)
+    """
+    labels = np.asarray(labels, dtype=np.float64)
+    rows, columns, counts = hash_features(texts, n_features, ngrams)
+    document_frequency = np.bincount(columns, minlength=n_features)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    values = _l2_normalize(rows, tfidf_values(columns, counts, idf), len(texts))
+
+    weights = np.zeros(n_features)
+    bias = 0.0
+    for _ in range(epochs):
+        scores = np.bincount(rows, weights=values * weights[columns], minlength=len(texts)) + bias
+        error = 1 / (1 + np.exp(-scores)) - labels
+        gradient = np.bincount(columns, weights=values * error[rows], minlength=n_features) / len(texts)
+        weights -= learning_rate * (gradient + l2 * weights)
+        bias -= learning_rate * error.mean()
+    return weights, idf, bias
+
+
+class HashedTfidfBackend(ModelBackend):
+    """
+    Hashed TF-IDF features scored by a linear (logistic) model
+
+    Only the artifact metadata is read at construction; the weight and IDF
+    arrays are memory-mapped on first use, so cold start does not grow with
+    model size and forked workers share the same page-cache pages.
+    """
+
+    name = "tfidf"
+
+    def __init__(self, model_path: str, lexicon_path: str = None):
+        self.model_path = str(model_path)
+        self.lexicon_path = lexicon_path or os.getenv("LEXICON_PATH")
+        self._path = Path(model_path)
+        meta = load_meta(self._path)
+        self.model_version = meta.get("version", "tfidf")
+        self.accuracy = meta.get("accuracy")
+        self.n_features = int(meta["n_features"])
+        self.ngrams = int(meta.get("ngrams", 2))
+        self.bias = float(meta["bias"])
+        self.threshold = float(meta.get("threshold", 0.5))
+        self._weights = None
+        self._idf = None
+        self._load_lock = threading.Lock()
+
+        lexicons = load_lexicons(self.lexicon_path)
+        self.matcher = PhraseMatcher({name: lexicons[name] for name in ("positive_words", "negative_words")})
+        logger.info(f"TF-IDF backend initialized - Version {self.model_version} ({self.n_features} features)")
+
+    @property
+    def spec(self) -> Tuple[str, dict]:
+        return self.name, {"model_path": self.model_path, "lexicon_path": self.lexicon_path}
+
+    def _arrays(self):
+        """Memory-map the weights on first use"""
+        if self._weights is None:
+            with self._load_lock:
+                if self._weights is None:
+                    self._idf = load_array(self._path, "idf")
+                    self._weights = load_array(self._path, "weights")
+                    logger.info(f"TF-IDF weights mapped from {self._path}")
+        return self._weights, self._idf
+
+    def warmup(self):
+        self._arrays()
+
+    def describe(self) -> dict:
+        size = sum(p.stat().st_size for p in self._path.iterdir()) if self._path.is_dir() else self._path.stat().st_size
+        return {
+            "backend": self.name,
+            "version": self.model_version,
+            "features": self.n_features,
+            "features_extracted": self.n_features,
+            "ngrams": self.ngrams,
+            "model_size_mb": round(size / 2 ** 20, 2),
+        }
+
+    def predict(self, text: str, explain: bool = False) -> dict:
+        return self.predict_many([text], explain)[0]
+
+    def predict_many(self, texts: List[str], explain: bool = False) -> List[dict]:
+        if not texts:
+            return []
+        weights, idf = self._arrays()
+
+        started = time.perf_counter()
+        rows, columns, counts = hash_features(texts, self.n_features, self.ngrams)
+        values = _l2_normalize(rows, tfidf_values(columns, counts, idf), len(texts))
+        extracted = time.perf_counter()
+
+        scores = np.bincount(rows, weights=values * weights[columns], minlength=len(texts)) + self.bias
+        fake_probability = 1 / (1 + np.exp(-scores))
+        # Confidence grows from 50 at the decision boundary to 99 at certainty
+        confidence = np.round(50 + 49 * np.abs(2 * fake_probability - 1), 1)
+        matches = [[] for _ in texts] if explain else None
+        sentiment_counts = self.matcher.totals(self.matcher.found_many([text.lower() for text in texts], matches))
+        positive = sentiment_counts["positive_words"]
+        negative = sentiment_counts["negative_words"]
+        sentiment = np.select([positive > negative, negative > positive], ["positive", "negative"], default="neutral")
+        classified = time.perf_counter()
+
+        hashed = np.bincount(rows, minlength=len(texts))
+        timings = {
+            "extract_features": (extracted - started) / len(texts),
+            "classify": (classified - extracted) / len(texts),
+        }
+        results = [
+            {
+                "prediction": "FAKE" if fake_probability[i] > self.threshold else "REAL",
+                "confidence": confidence[i],
+                "sentiment": sentiment[i],
+                "features": {
+                    "hashed_features": int(hashed[i]),
+                    "fake_probability": round(float(fake_probability[i]) * 100, 1),
+                },
+                "timings": dict(timings),
+            }
+            for i in range(len(texts))
+        ]
+        if explain:
+            for i, result in enumerate(results):
+                # The linear model's logit splits into the bias and the summed feature weights
+                result["explanation"] = {
+                    "matches": self.matcher.spans(matches[i], texts[i]),
+                    "contributions": [
+                        {"feature": "bias", "value": 1.0, "score": round(self.bias, 4),
+                         "favours": "FAKE" if self.bias > 0 else "REAL"},
+                        {"feature": "hashed_features", "value": float(hashed[i]), "score": round(float(scores[i]) - self.bias, 4),
+                         "favours": "FAKE" if scores[i] > self.bias else "REAL"},
+                    ],
+                    "adjustment": 0.0,
+                    "fake_probability": result["features"]["fake_probability"],
+                }
+        return results
+
+
+def _train_from_jsonl(input_path: str, output_path: str, n_features: int, version: str):
+    """Train a TF-IDF artifact from JSONL records with "text" and "label" (1 = fake)"""
+    texts, labels = [], []
+    with open(input_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(int(record["label"]))
+    weights, idf, bias = train_linear_model(texts, labels, n_features=n_features)
+    save_artifact(output_path, weights, idf, bias, {"version": version, "ngrams": 2})
+    logger.info(f"Trained on {len(texts)} documents, saved {output_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Train a hashed TF-IDF model artifact")
+    parser.add_argument("input", help="JSONL file with 'text' and 'label' (1 = fake, 0 = real)")
+    parser.add_argument("output", help="Output .npz artifact")
+    parser.add_argument("--features", type=int, default=2 ** 18, help="Number of hashed features")
+    parser.add_argument("--version", default="tfidf-1.0.0", help="Model version recorded in the artifact")
+    cli_args = parser.parse_args()
+    _train_from_jsonl(cli_args.input, cli_args.output, cli_args.features, cli_args.version)
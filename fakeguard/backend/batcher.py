@@ -0,0 +1,101 @@
+"""
+Micro-batching of concurrent single-text predictions
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List
+
+from metrics import LatencyRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent `submit` calls into one vectorized scoring call
+
+    A batch is flushed when it reaches `max_batch_size` texts or when its
+    oldest text has waited `max_wait_ms`, whichever comes first. Each caller
+    gets its own result back, or the exception raised while scoring its batch.
+    Batch sizes and queue waits are recorded in the registry under `label`.
+    With `max_batch_size` 1 texts are scored straight away, without queueing.
+    """
+
+    def __init__(self, score_many: Callable[[List[str]], Awaitable[List[dict]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0,
+                 registry: LatencyRegistry = None, label: str = "predict"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_many = score_many
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.registry = registry or LatencyRegistry()
+        self.label = label
+        self.batches = 0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, text: str) -> dict:
+        """Queue one text and wait for its result"""
+        if self.max_batch_size == 1:
+            self._record([time.perf_counter()])
+            return (await self.score_many([text]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        """Start scoring the queued texts, up to one full batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_ms / 1000, self._flush)
+        if batch:
+            # Keep a reference so the task is not garbage collected mid-flight
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _record(self, enqueued: List[float]):
+        now = time.perf_counter()
+        queue_wait = self.registry.histogram("queue_wait", self.label)
+        for enqueued_at in enqueued:
+            queue_wait.observe(now - enqueued_at)
+        self.registry.histogram("batch_size", self.label).observe(len(enqueued))
+        self.batches += 1
+
+    async def _run(self, batch):
+        self._record([enqueued_at for _, _, enqueued_at in batch])
+        try:
+            results = await self.score_many([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have gone away (client disconnect) while we scored
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Batching configuration and rolling-window histogram summaries"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "batch_size": self.registry.histogram("batch_size", self.label).summary(),
+            "queue_wait": self.registry.histogram("queue_wait", self.label).summary(),
+        }
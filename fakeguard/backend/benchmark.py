@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Benchmark and load-test suite for FakeGuard
+
+Micro-benchmarks time `_extract_features`, `_classify` and `predict` on
+synthetic texts of 20-5000 characters. The load test starts the API under
+uvicorn in this process and drives `/api/predict` at fixed concurrency levels,
+reporting req/s and p50/p99 latency. Results are saved as JSON baselines that
+later runs can be compared against.
+
+Usage:
+    python benchmark.py run --output baseline.json
+    python benchmark.py run --output current.json --baseline baseline.json
+    python benchmark.py compare baseline.json current.json --threshold 10
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger("benchmark")
+
+TEXT_LENGTHS = (20, 100, 500, 1000, 2500, 5000)
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+FILLER_WORDS = (
+    "the", "a", "report", "government", "people", "city", "year", "market", "said",
+    "new", "data", "week", "local", "school", "health", "policy", "official", "team",
+)
+
+# Compared metrics and whether a higher value is better (medians, as micro means are noisy)
+COMPARED_METRICS = {"p50_us": False, "rps": True, "p50_ms": False, "p99_ms": False}
+
+
+def synthetic_text(length: int, rng: random.Random, vocabulary) -> str:
+    """Text of exactly `length` characters mixing lexicon phrases and filler words"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(vocabulary) if rng.random() < 0.2 else rng.choice(FILLER_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length].rstrip().ljust(length, ".")
+
+
+def synthetic_texts(length: int, count: int, seed: int = 0):
+    from matcher import load_lexicons
+
+    vocabulary = [phrase for phrases in load_lexicons().values() for phrase in phrases]
+    rng = random.Random(seed * 100003 + length)
+    return [synthetic_text(length, rng, vocabulary) for _ in range(count)]
+
+
+def _time_calls(function, arguments, iterations: int) -> dict:
+    """Time `iterations` calls cycling through `arguments`"""
+    samples = np.empty(iterations)
+    for i, args in zip(range(iterations), itertools.cycle(arguments)):
+        started = time.perf_counter()
+        function(*args)
+        samples[i] = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "mean_us": round(float(samples.mean()) * 1e6, 3),
+        "p50_us": round(float(np.percentile(samples, 50)) * 1e6, 3),
+        "p99_us": round(float(np.percentile(samples, 99)) * 1e6, 3),
+        "ops_per_sec": round(1 / float(samples.mean()), 1),
+    }
+
+
+def run_micro(iterations: int = 500, lengths=TEXT_LENGTHS) -> dict:
+    """Micro-benchmarks of the detector's scoring stages, keyed by function then text length"""
+    from detector import FakeNewsDetector
+
+    detector = FakeNewsDetector()
+    results = {"extract_features": {}, "classify": {}, "predict": {}}
+    for length in lengths:
+        texts = synthetic_texts(length, 16)
+        features = [(detector._extract_features(text), text.lower()) for text in texts]
+        results["extract_features"][str(length)] = _time_calls(detector._extract_features, [(t,) for t in texts], iterations)
+        results["classify"][str(length)] = _time_calls(detector._classify, features, iterations)
+        results["predict"][str(length)] = _time_calls(detector.predict, [(t,) for t in texts], iterations)
+        logger.info(
+            f"{length:>5} chars: extract {results['extract_features'][str(length)]['mean_us']}us, "
+            f"classify {results['classify'][str(length)]['mean_us']}us, "
+            f"predict {results['predict'][str(length)]['mean_us']}us"
+        )
+    return results
+
+
+def _run_to_completion(coroutine):
+    """Result of a coroutine that never suspends, without an event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("Coroutine suspended")
+
+
+def run_encoding(iterations: int = 500) -> dict:
+    """
+    Per-response cost of encoding an /api/predict response: the precompiled
+    encoder against the PredictionResponse model, validated and serialized the
+    way FastAPI handles a response_model
+    """
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from main import PredictionResponse, app, prediction_encoder
+
+    field = next(route.response_field for route in app.routes if getattr(route, "path", None) == "/api/predict")
+    results = [("FAKE", 87.3, "negative"), ("REAL", 64.0, "neutral"), ("REAL", 91.2, "positive")]
+
+    def pydantic_response(prediction, confidence, sentiment):
+        model = PredictionResponse(
+            prediction=prediction,
+            confidence=str(confidence),
+            sentiment=sentiment,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        content = _run_to_completion(serialize_response(field=field, response_content=model, is_coroutine=True))
+        return JSONResponse(content)
+
+    timings = {
+        "fast": _time_calls(prediction_encoder.response, results, iterations),
+        "pydantic": _time_calls(pydantic_response, results, iterations),
+    }
+    logger.info(f"encode response: fast {timings['fast']['mean_us']}us, pydantic {timings['pydantic']['mean_us']}us")
+    return timings
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class InProcessServer:
+    """The FakeGuard app served by uvicorn on a background thread"""
+
+    def __init__(self, app, port: int = None):
+        import uvicorn
+
+        self.port = port or _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="uvicorn", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def _drive(url: str, concurrency: int, duration: float, texts) -> dict:
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    import httpx
+
+    latencies = []
+    errors = 0
+    # Every request gets a distinct text so the prediction cache never answers it;
+    # the texts differ only in that suffix, so run_load turns the near-duplicate index off
+    sequence = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker(deadline: float, record: bool):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                n = next(sequence)
+                base = texts[n % len(texts)]
+                # The suffix replaces the end of the text so requests keep the configured length
+                suffix = f" #{n}"
+                text = base[:len(base) - len(suffix)] + suffix
+                started = time.perf_counter()
+                response = await client.post("/api/predict", json={"text": text})
+                if record:
+                    # Rejected requests (422, 429, 503) are fast and would inflate req/s
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+
+        # Short warmup to open connections and settle the pools
+        warmup_deadline = time.perf_counter() + min(duration / 5, 1.0)
+        await asyncio.gather(*(worker(warmup_deadline, False) for _ in range(concurrency)))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(started + duration, True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    samples = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+    }
+
+
+@contextmanager
+def _client_limits_disabled():
+    """Every simulated client shares one address: measure capacity, not the per-client limits"""
+    from main import load_shedder, rate_limiters
+
+    rates = [(limiter, limiter.rate) for limiter in rate_limiters.values()]
+    target = load_shedder.target
+    for limiter, _ in rates:
+        limiter.rate = 0
+    load_shedder.target = 0
+    try:
+        yield
+    finally:
+        for limiter, rate in rates:
+            limiter.rate = rate
+        load_shedder.target = target
+
+
+@contextmanager
+def _near_duplicates_disabled():
+    """The load texts are near-duplicates of each other: measure scoring, not the index"""
+    from main import near_duplicates
+
+    capacity = near_duplicates.capacity
+    near_duplicates.capacity = 0
+    try:
+        yield
+    finally:
+        near_duplicates.capacity = capacity
+
+
+def run_load(concurrency_levels=CONCURRENCY_LEVELS, duration: float = 5.0, text_length: int = 500) -> dict:
+    """Load-test /api/predict under uvicorn, keyed by concurrency level"""
+    from main import app
+
+    texts = synthetic_texts(text_length, 64)
+    results = {}
+    with InProcessServer(app) as server, _client_limits_disabled(), _near_duplicates_disabled():
+        for concurrency in concurrency_levels:
+            result = asyncio.run(_drive(server.url, concurrency, duration, texts))
+            results[str(concurrency)] = result
+            logger.info(
+                f"concurrency {concurrency:>3}: {result['rps']} req/s, "
+                f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, {result['errors']} errors"
+            )
+    return results
+
+
+def _flatten(results: dict, prefix: str = ""):
+    """Yield (dotted path, value, higher_is_better) for every compared metric"""
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, path + ".")
+        elif key in COMPARED_METRICS:
+            yield path, value, COMPARED_METRICS[key]
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0) -> list:
+    """
+    Compare two result files, returning one row per shared metric
+    A row is a regression when the metric got worse by more than `threshold` percent
+    """
+    previous = {path: value for path, value, _ in _flatten({k: baseline.get(k, {}) for k in ("micro", "load")})}
+    rows = []
+    for path, value, higher_is_better in _flatten({k: current.get(k, {}) for k in ("micro", "load")}):
+        if path not in previous or not previous[path]:
+            continue
+        change = (value - previous[path]) / previous[path] * 100
+        worse = -change if higher_is_better else change
+        rows.append({
+            "metric": path,
+            "baseline": previous[path],
+            "current": value,
+            "change_percent": round(change, 1),
+            "regression": worse > threshold,
+        })
+    return rows
+
+
+def print_comparison(rows: list, threshold: float) -> int:
+    """Print a comparison table; returns the number of regressions"""
+    width = max((len(row["metric"]) for row in rows), default=10)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['metric']:<{width}}  {row['baseline']:>12}  {row['current']:>12}  {row['change_percent']:>+7.1f}%  {flag}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{regressions} regression(s) beyond {threshold}% in {len(rows)} metrics")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and load-test the FakeGuard API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks and save the results")
+    run.add_argument("--output", required=True, help="JSON file for the results")
+    run.add_argument("--skip-micro", action="store_true", help="Skip the micro-benchmarks")
+    run.add_argument("--skip-load", action="store_true", help="Skip the load test")
+    run.add_argument("--iterations", type=int, default=500, help="Calls per micro-benchmark")
+    run.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY_LEVELS), help="Load test concurrency levels")
+    run.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    run.add_argument("--text-length", type=int, default=500, help="Characters per load test text")
+    run.add_argument("--baseline", help="Compare the results against this baseline file")
+    run.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+
+    diff = commands.add_parser("compare", help="Compare two result files")
+    diff.add_argument("baseline", help="Baseline results")
+    diff.add_argument("current", help="Current results")
+    diff.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # Per-request client logging would cost as much as the requests being measured
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args = parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        return 1 if print_comparison(compare(baseline, current, args.threshold), args.threshold) else 0
+
+    results = {
+        "created": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    if not args.skip_micro:
+        results["micro"] = run_micro(args.iterations)
+        results["micro"]["encode_response"] = run_encoding(args.iterations)
+    if not args.skip_load:
+        results["load"] = run_load(args.concurrency, args.duration, args.text_length)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if print_comparison(compare(baseline, results, args.threshold), args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Keeps the test suite's on-disk state out of the real data locations
+
+main.py reads its configuration at import time, so the paths are set before
+any test module imports it.
+"""
+import os
+import shutil
+import tempfile
+
+_data_dir = None
+
+
+def pytest_configure(config):
+    global _data_dir
+    _data_dir = tempfile.mkdtemp(prefix="fakeguard-tests-")
+    os.environ["PREDICTION_STORE_PATH"] = os.path.join(_data_dir, "predictions.db")
+    os.environ["AUDIT_LOG_DIR"] = os.path.join(_data_dir, "audit")
+
+
+def pytest_unconfigure(config):
+    if _data_dir is not None:
+        shutil.rmtree(_data_dir, ignore_errors=True)
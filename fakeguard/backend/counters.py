@@ -0,0 +1,117 @@
+"""
+Cluster-wide counters shared by all uvicorn worker processes
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable
+
+import numpy as np
+
+from sharedfile import fcntl, file_lock, open_shared
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FGSTATS1"
+# magic, slot count, counter count, creation time
+HEADER = struct.Struct("<8sIId")
+# Each slot row is [owner pid, owner thread id, counter values...]
+OWNER_COLUMNS = 2
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedCounters:
+    """
+    Monotonic counters aggregated across processes through a memory-mapped file
+
+    Every writing thread of every process owns one slot (row) in the file and
+    only ever increments its own row, so increments need no lock and cannot
+    race. Readers sum the rows. A slot is claimed under a file lock once per
+    thread; slots of dead processes are taken over with their counts intact,
+    so totals survive worker restarts. A file whose owners are all dead is
+    left over from a previous run and is reset on open.
+
+    Without a path (or without fcntl) the counters live in process memory.
+    """
+
+    def __init__(self, names: Iterable[str], path: str = None, slots: int = 256):
+        self.names = tuple(names)
+        self.path = path if fcntl is not None else None
+        self.slots = slots
+        self._columns = {name: OWNER_COLUMNS + i for i, name in enumerate(self.names)}
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._file = None
+
+        size = HEADER.size + slots * (OWNER_COLUMNS + len(self.names)) * 8
+        if self.path is None:
+            if path is not None:
+                logger.warning("fcntl is unavailable, stats counters are per process")
+            self._buffer = bytearray(size)
+            HEADER.pack_into(self._buffer, 0, MAGIC, slots, len(self.names), time.time())
+        else:
+            header = HEADER.pack(MAGIC, slots, len(self.names), time.time())
+            self._file, self._buffer = open_shared(self.path, size, header, self._reusable)
+        self._table = np.ndarray(
+            (slots, OWNER_COLUMNS + len(self.names)), dtype=np.int64,
+            buffer=self._buffer, offset=HEADER.size
+        )
+
+    def _reusable(self, data: bytes) -> bool:
+        """Whether an existing file has this layout and at least one live owner"""
+        magic, slots, counters, _ = HEADER.unpack_from(data)
+        if (magic, slots, counters) != (MAGIC, self.slots, len(self.names)):
+            return False
+        owners = np.frombuffer(data, dtype=np.int64, offset=HEADER.size)
+        owners = owners.reshape(self.slots, -1)[:, 0]
+        return any(_pid_alive(int(pid)) for pid in owners if pid)
+
+    def _claim_slot(self) -> np.ndarray:
+        """Claim a free slot, or one left by a dead process, for the calling thread"""
+        pid = os.getpid()
+        thread_id = threading.get_ident()
+        with self._claim_lock, file_lock(self._file):
+            for row in self._table:
+                owner = int(row[0])
+                if owner == 0 or (owner != pid and not _pid_alive(owner)):
+                    row[0] = pid
+                    row[1] = thread_id
+                    return row
+        raise RuntimeError(f"All {self.slots} stats counter slots are in use")
+
+    def _slot(self) -> np.ndarray:
+        cached = getattr(self._local, "slot", None)
+        # The pid check catches forked children that inherited the parent's slot
+        if cached is None or cached[0] != os.getpid():
+            cached = (os.getpid(), self._claim_slot())
+            self._local.slot = cached
+        return cached[1]
+
+    def increment(self, name: str, amount: int = 1):
+        """Add to a counter; only touches the calling thread's own slot"""
+        self._slot()[self._columns[name]] += amount
+
+    def totals(self) -> Dict[str, int]:
+        """Counter totals summed over every slot"""
+        sums = self._table[:, OWNER_COLUMNS:].sum(axis=0)
+        return {name: int(sums[i]) for i, name in enumerate(self.names)}
+
+    def workers(self) -> int:
+        """Number of live processes that have written to the counters"""
+        return sum(1 for pid in set(self._table[:, 0].tolist()) if pid and _pid_alive(pid))
+
+    @property
+    def created_at(self) -> float:
+        """Unix time at which the shared counters were (re)started"""
+        return HEADER.unpack_from(self._buffer, 0)[3]
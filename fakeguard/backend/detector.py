@@ -0,0 +1,528 @@
+"""
+FakeGuard fake news detector
+Kept separate from the API so scoring workers can import it without the app
+"""
+import hashlib
+import logging
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from backends import ModelBackend
+from matcher import PhraseMatcher, load_lexicons
+
+logger = logging.getLogger(__name__)
+
+# Character classes for the feature extractor; every character is in exactly one
+_OTHER, _SPACE, _UPPER, _PERIOD, _EXCLAMATION, _QUESTION = range(6)
+_PUNCTUATION_CLASSES = {'.': _PERIOD, '!': _EXCLAMATION, '?': _QUESTION}
+
+def _classify_char(char: str) -> int:
+    if char.isspace():
+        return _SPACE
+    if char.isupper():
+        return _UPPER
+    return _PUNCTUATION_CLASSES.get(char, _OTHER)
+
+_ASCII_CLASS = np.array([_classify_char(chr(i)) for i in range(128)], dtype=np.uint8)
+
+# Fixed layout of extracted features: one record per text, stackable into arrays
+FEATURE_RECORD = np.dtype([
+    ('word_count', '<i8'),
+    ('avg_word_length', '<f8'),
+    ('sentence_count', '<i8'),
+    ('uppercase_ratio', '<f8'),
+    ('punctuation_count', '<i8'),
+    ('exclamation_count', '<i8'),
+])
+
+def _codepoints(text: str) -> np.ndarray:
+    """Code points of a text as a NumPy view over its encoding (one byte each for ASCII)"""
+    if text.isascii():
+        return np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+def _char_classes(codepoints: np.ndarray) -> np.ndarray:
+    """Character class of every code point, by table lookup"""
+    if codepoints.dtype == np.uint8:
+        return _ASCII_CLASS[codepoints]
+    classes = np.full(len(codepoints), _OTHER, dtype=np.uint8)
+    is_ascii = codepoints < 128
+    classes[is_ascii] = _ASCII_CLASS[codepoints[is_ascii]]
+    if not is_ascii.all():
+        # Non-ASCII characters are rare, so only classify each distinct one once
+        unique, inverse = np.unique(codepoints[~is_ascii], return_inverse=True)
+        classes[~is_ascii] = np.array([_classify_char(chr(c)) for c in unique], dtype=np.uint8)[inverse]
+    return classes
+
+def validate_text(v: str) -> str:
+    """Validate a single article text, raising ValueError if it is out of bounds"""
+    if len(v) < 20:
+        raise ValueError('Text must be at least 20 characters')
+    if len(v) > 5000:
+        raise ValueError('Text must not exceed 5000 characters')
+    return v
+
+def _text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+def _combined_digest(digests: List[bytes]) -> bytes:
+    """Digest standing for the concatenation of texts, computed from their digests"""
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.blake2b(b''.join(digests), digest_size=16).digest()
+
+def _text_noise(texts: List[str]):
+    """
+    Two standard normal draws per text, derived from a hash of the text
+    so repeated texts always get the same score
+    """
+    return _digest_noise(b''.join(_text_digest(text) for text in texts))
+
+def _digest_noise(digests: bytes):
+    """_text_noise for already computed 16-byte text digests"""
+    bits = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+    # Box-Muller transform on two uniforms taken from the top 53 bits of each word
+    uniform = (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+    radius = np.sqrt(-2.0 * np.log1p(-uniform[:, 0]))
+    angle = 2.0 * np.pi * uniform[:, 1]
+    return radius * np.cos(angle), radius * np.sin(angle)
+
+def _segments(text: str, size: int):
+    """Yield (start, end, segment) for consecutive pieces of about `size` characters, cut at whitespace"""
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Prefer cutting after the last whitespace in the second half of the piece
+            cut = max(text.rfind(' ', start + size // 2, end), text.rfind('\n', start + size // 2, end))
+            if cut >= 0:
+                end = cut + 1
+        yield start, end, text[start:end]
+        start = end
+
+def _groups(items, size: int):
+    """Yield lists of up to `size` consecutive items"""
+    group = []
+    for item in items:
+        group.append(item)
+        if len(group) == size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+# Mock ML Model
+class FakeNewsDetector(ModelBackend):
+    name = 'heuristic'
+    # Lexicon categories the classifier scores on
+    LEXICON_CATEGORIES = ('fake_indicators', 'real_indicators', 'positive_words', 'negative_words')
+    # Columns of _feature_counts_batch
+    FEATURE_COUNTS = ('length', 'word_count', 'word_chars', 'periods', 'exclamations', 'questions', 'uppercase')
+    
+    def __init__(self, lexicon_path: str = None):
+        self.model_version = "1.0.0"
+        self.accuracy = 87.3
+        
+        # Compile all indicator lexicons into one matcher
+        self.lexicon_path = lexicon_path or os.getenv("LEXICON_PATH")
+        lexicons = load_lexicons(self.lexicon_path)
+        missing = [name for name in self.LEXICON_CATEGORIES if name not in lexicons]
+        if missing:
+            raise ValueError(f"Lexicon file is missing categories: {', '.join(missing)}")
+        self.matcher = PhraseMatcher({name: lexicons[name] for name in self.LEXICON_CATEGORIES})
+        
+        logger.info(f"FakeNews Detector initialized - Version {self.model_version}")
+    
+    @property
+    def spec(self):
+        return self.name, {'lexicon_path': self.lexicon_path}
+    
+    def describe(self) -> dict:
+        # Linguistic features plus one count per lexicon category
+        return dict(super().describe(), features_extracted=len(FEATURE_RECORD.names) + len(self.LEXICON_CATEGORIES))
+    
+    def predict(self, text: str, explain: bool = False):
+        """
+        Simulates fake news detection using pattern matching
+        In production, this would use actual trained ML models
+        """
+        if explain:
+            return self.predict_many([text], explain=True)[0]
+        try:
+            # Convert to lowercase for analysis
+            text_lower = text.lower()
+            
+            # Feature extraction
+            started = time.perf_counter()
+            features = self._extract_features(text)
+            extracted = time.perf_counter()
+            
+            # Prediction logic (simplified for demo)
+            prediction = self._classify(features, text_lower)
+            classified = time.perf_counter()
+            confidence = prediction['confidence']
+            sentiment = prediction['sentiment']
+            is_fake = prediction['is_fake']
+            
+            return {
+                'prediction': 'FAKE' if is_fake else 'REAL',
+                'confidence': confidence,
+                'sentiment': sentiment,
+                'features': features,
+                'timings': {
+                    'extract_features': extracted - started,
+                    'classify': classified - extracted
+                }
+            }
+        except Exception as e:
+            logger.error(f"Prediction error: {str(e)}")
+            raise
+    
+    def predict_many(self, texts: List[str], explain: bool = False) -> List[dict]:
+        """
+        Batched version of predict
+        Features and scores are computed as NumPy arrays over the whole batch,
+        and the reported stage timings are the per-text share of the batch
+        With `explain`, each result also carries an 'explanation' built from the
+        phrase matches and score terms of the same pass
+        """
+        try:
+            if not texts:
+                return []
+            
+            started = time.perf_counter()
+            features = self._extract_features_batch(texts)
+            extracted = time.perf_counter()
+            texts_lower = [text.lower() for text in texts]
+            matches = [[] for _ in texts] if explain else None
+            prediction = self._classify_batch(features, texts_lower, matches)
+            classified = time.perf_counter()
+            timings = {
+                'extract_features': (extracted - started) / len(texts),
+                'classify': (classified - extracted) / len(texts)
+            }
+            
+            results = [
+                {
+                    'prediction': 'FAKE' if prediction['is_fake'][i] else 'REAL',
+                    'confidence': prediction['confidence'][i],
+                    'sentiment': prediction['sentiment'][i],
+                    'features': features[i],
+                    'timings': dict(timings)
+                }
+                for i in range(len(texts))
+            ]
+            if explain:
+                for i, result in enumerate(results):
+                    result['explanation'] = self._explain(texts[i], matches[i], prediction, i)
+            return results
+        except Exception as e:
+            logger.error(f"Batch prediction error: {str(e)}")
+            raise
+    
+    def predict_long(self, text: str, window_chars: int = 5000, group_size: int = 32) -> dict:
+        """
+        Score a document of any length with overlapping windows
+        
+        The text is cut at whitespace into segments of about half a window, and
+        every window is two consecutive segments, so windows overlap by half.
+        Feature counts, lexicon phrases and hashes are computed once per segment
+        and combined for each window and for the whole document: no character is
+        scanned twice except around segment cuts, where a short junction is
+        checked for phrases crossing the cut. Segments are processed
+        `group_size` at a time, bounding working memory by the window size.
+        """
+        try:
+            segment_chars = max(window_chars // 2, 2 * self.matcher.longest_phrase, 1)
+            reach = max(self.matcher.longest_phrase - 1, 0)
+            extract_seconds = classify_seconds = 0.0
+            windows = []
+            document_counts = np.zeros(len(self.FEATURE_COUNTS), dtype=np.int64)
+            document_found = set()
+            digests = []
+            previous = None
+            
+            for group in _groups(_segments(text, segment_chars), group_size):
+                started = time.perf_counter()
+                texts_lower = [segment.lower() for _, _, segment in group]
+                counts = self._feature_counts_batch([segment for _, _, segment in group])
+                found = self.matcher.found_many(texts_lower)
+                segments = [
+                    (start, end, counts[i], found[i], _text_digest(texts_lower[i]), texts_lower[i])
+                    for i, (start, end, _) in enumerate(group)
+                ]
+                document_counts += counts.sum(axis=0)
+                for phrases in found:
+                    document_found |= phrases
+                digests.extend(segment[4] for segment in segments)
+                
+                # Pair every segment with the one before it, carrying the last one over
+                pairs = list(zip([previous] + segments[:-1], segments))
+                if previous is None:
+                    pairs = pairs[1:]
+                previous = segments[-1]
+                junctions = self.matcher.found_many([a[5][-reach:] + b[5][:reach] for a, b in pairs]) if reach else [set()] * len(pairs)
+                for phrases in junctions:
+                    document_found |= phrases
+                extract_seconds += time.perf_counter() - started
+                
+                started = time.perf_counter()
+                windows.extend(self._score_windows(
+                    [(a[0], b[1]) for a, b in pairs],
+                    np.array([a[2] + b[2] for a, b in pairs]).reshape(-1, len(self.FEATURE_COUNTS)),
+                    [a[3] | b[3] | junction for (a, b), junction in zip(pairs, junctions)],
+                    [_combined_digest([a[4], b[4]]) for a, b in pairs],
+                    len(windows)
+                ))
+                classify_seconds += time.perf_counter() - started
+            
+            started = time.perf_counter()
+            if len(digests) == 1:
+                # Shorter than a segment: the single window is the whole text
+                windows = self._score_windows(
+                    [(previous[0], previous[1])], previous[2][None], [previous[3]], [previous[4]], 0
+                )
+            document = self._score_windows(
+                [(0, len(text))], document_counts[None], [document_found], [_combined_digest(digests)], 0
+            )[0]
+            classify_seconds += time.perf_counter() - started
+            record = self._features_from_counts(document_counts[None])[0]
+            features = {name: record[name].item() for name in FEATURE_RECORD.names}
+            features.update({name: int(values[0]) for name, values in self.matcher.totals([document_found]).items()})
+            
+            return {
+                'prediction': document['prediction'],
+                'confidence': document['confidence'],
+                'sentiment': document['sentiment'],
+                'fake_probability': document['fake_probability'],
+                'features': features,
+                'window_chars': window_chars,
+                'windows': windows,
+                'timings': {
+                    'extract_features': extract_seconds,
+                    'classify': classify_seconds
+                }
+            }
+        except Exception as e:
+            logger.error(f"Long document prediction error: {str(e)}")
+            raise
+    
+    def _score_windows(self, bounds, counts: np.ndarray, found, digests, first_index: int) -> List[dict]:
+        """Score windows from their summed feature counts, phrase sets and digests"""
+        if not bounds:
+            return []
+        features = self._features_from_counts(counts)
+        prediction = self._score_batch(
+            features, self.matcher.totals(found), *_digest_noise(b''.join(digests))
+        )
+        return [
+            {
+                'index': first_index + i,
+                'start': start,
+                'end': end,
+                'prediction': 'FAKE' if prediction['is_fake'][i] else 'REAL',
+                'confidence': float(prediction['confidence'][i]),
+                'sentiment': str(prediction['sentiment'][i]),
+                'fake_probability': float(prediction['fake_probability'][i])
+            }
+            for i, (start, end) in enumerate(bounds)
+        ]
+    
+    def _extract_features(self, text: str) -> np.void:
+        """Extract linguistic features from text, as a FEATURE_RECORD"""
+        length, word_count, word_chars, periods, exclamations, questions, uppercase = self._feature_counts(text).tolist()
+        # Same values as _features_from_counts, without its per-column array work
+        return np.array((
+            word_count,
+            word_chars / word_count if word_count else 0.0,
+            periods + exclamations + questions,
+            uppercase / length if length else 0.0,
+            exclamations + questions,
+            exclamations,
+        ), dtype=FEATURE_RECORD)[()]
+    
+    def _extract_features_batch(self, texts: List[str]) -> np.ndarray:
+        """Extract the same features as _extract_features for a batch, one FEATURE_RECORD row per text"""
+        return self._features_from_counts(self._feature_counts_batch(texts))
+    
+    def _feature_counts(self, text: str) -> np.ndarray:
+        """
+        FEATURE_COUNTS of a single text in one pass: a class lookup per
+        character, then one histogram of the classes
+        """
+        classes = _char_classes(_codepoints(text))
+        by_class = np.bincount(classes, minlength=6)
+        is_space = classes == _SPACE
+        # A word starts at every non-space character that follows a space (or the start)
+        word_count = np.count_nonzero(is_space[:-1] > is_space[1:]) + (len(text) > 0 and not is_space[0])
+        return np.array([
+            len(text),
+            word_count,
+            len(text) - by_class[_SPACE],
+            by_class[_PERIOD],
+            by_class[_EXCLAMATION],
+            by_class[_QUESTION],
+            by_class[_UPPER],
+        ], dtype=np.int64)
+    
+    def _feature_counts_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Additive character and word counts per text, one row per text and one
+        column per FEATURE_COUNTS entry; counts of adjacent texts can be summed
+        """
+        # Join the batch into one code point buffer; every text keeps a trailing
+        # separator so word runs never cross text boundaries
+        classes = _char_classes(_codepoints('\n'.join(texts) + '\n'))
+        lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        
+        is_space = classes == _SPACE
+        word_start = ~is_space & np.concatenate(([True], is_space[:-1]))
+        
+        def per_text(mask):
+            return np.add.reduceat(mask.astype(np.int64), starts)
+        
+        return np.column_stack([
+            lengths,
+            per_text(word_start),
+            per_text(~is_space),
+            per_text(classes == _PERIOD),
+            per_text(classes == _EXCLAMATION),
+            per_text(classes == _QUESTION),
+            per_text(classes == _UPPER),
+        ])
+    
+    def _features_from_counts(self, counts: np.ndarray) -> np.ndarray:
+        """FEATURE_RECORD rows, as returned by _extract_features_batch, from summed feature counts"""
+        lengths, word_count, word_chars, periods, exclamations, questions, uppercase = counts.T
+        features = np.empty(len(counts), dtype=FEATURE_RECORD)
+        features['word_count'] = word_count
+        # Words are maximal non-space runs, so their mean length is chars / words
+        features['avg_word_length'] = np.divide(word_chars, word_count, out=np.zeros(len(counts)), where=word_count > 0)
+        features['sentence_count'] = periods + exclamations + questions
+        features['uppercase_ratio'] = np.divide(uppercase, lengths, out=np.zeros(len(counts)), where=lengths > 0)
+        features['punctuation_count'] = exclamations + questions
+        features['exclamation_count'] = exclamations
+        return features
+    
+    def _classify(self, features: dict, text_lower: str) -> dict:
+        """Classify text as fake or real based on features"""
+        
+        # Count indicators and sentiment words in a single pass
+        counts = self.matcher.count(text_lower)
+        fake_count = counts['fake_indicators']
+        real_count = counts['real_indicators']
+        
+        # Feature-based scoring
+        exclamation_score = min(features['exclamation_count'] * 10, 40)
+        caps_score = features['uppercase_ratio'] * 30
+        
+        # Combined score
+        fake_score = fake_count * 15 + exclamation_score + caps_score
+        real_score = real_count * 15
+        
+        # Normalize with some deterministic per-text jitter for demo
+        probability_noise, confidence_noise = _text_noise([text_lower])
+        total_score = fake_score + real_score
+        fake_probability = (fake_score / (total_score + 1)) * 100 if total_score > 0 else 50
+        fake_probability = np.clip(fake_probability + probability_noise[0] * 5, 0, 100)
+        
+        # Sentiment analysis
+        pos_count = counts['positive_words']
+        neg_count = counts['negative_words']
+        
+        if pos_count > neg_count:
+            sentiment = 'positive'
+        elif neg_count > pos_count:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+        
+        # Confidence (higher if more indicators found)
+        indicator_confidence = min((fake_count + real_count) * 5 + 60, 95)
+        confidence = max(indicator_confidence + confidence_noise[0] * 3, 50)
+        confidence = np.clip(confidence, 50, 99)
+        
+        return {
+            'is_fake': fake_probability > 50,
+            'confidence': round(confidence, 1),
+            'sentiment': sentiment,
+            'fake_probability': round(fake_probability, 1)
+        }
+    
+    def _classify_batch(self, features: dict, texts_lower: List[str], matches: List[list] = None) -> dict:
+        """
+        Vectorized _classify over a batch of lowercased texts
+        `matches`, one list per text, collects the phrase matches for explanations
+        """
+        # Count indicators and sentiment words in a single pass over the batch
+        counts = self.matcher.totals(self.matcher.found_many(texts_lower, matches))
+        return self._score_batch(features, counts, *_text_noise(texts_lower))
+    
+    def _score_batch(self, features: dict, counts: dict, probability_noise, confidence_noise) -> dict:
+        """Scores from feature arrays, lexicon counts and per-text noise"""
+        fake_count = counts['fake_indicators']
+        real_count = counts['real_indicators']
+        
+        # Feature-based scoring
+        exclamation_score = np.minimum(features['exclamation_count'] * 10, 40)
+        caps_score = features['uppercase_ratio'] * 30
+        
+        # Combined score
+        fake_score = fake_count * 15 + exclamation_score + caps_score
+        real_score = real_count * 15
+        
+        # Normalize with some deterministic per-text jitter for demo
+        total_score = fake_score + real_score
+        fake_probability = np.where(total_score > 0, fake_score / (total_score + 1) * 100, 50)
+        fake_probability = np.clip(fake_probability + probability_noise * 5, 0, 100)
+        
+        # Sentiment analysis
+        pos_count = counts['positive_words']
+        neg_count = counts['negative_words']
+        sentiment = np.select(
+            [pos_count > neg_count, neg_count > pos_count],
+            ['positive', 'negative'],
+            default='neutral'
+        )
+        
+        # Confidence (higher if more indicators found)
+        indicator_confidence = np.minimum((fake_count + real_count) * 5 + 60, 95)
+        confidence = np.maximum(indicator_confidence + confidence_noise * 3, 50)
+        confidence = np.clip(confidence, 50, 99)
+        
+        return {
+            'is_fake': fake_probability > 50,
+            'confidence': np.round(confidence, 1),
+            'sentiment': sentiment,
+            'fake_probability': np.round(fake_probability, 1),
+            # Score terms, kept for explanations
+            'terms': {
+                'fake_indicators': (fake_count, fake_count * 15),
+                'exclamation_count': (features['exclamation_count'], exclamation_score),
+                'uppercase_ratio': (features['uppercase_ratio'], caps_score),
+                'real_indicators': (real_count, real_score),
+                'adjustment': probability_noise * 5
+            }
+        }
+    
+    def _explain(self, text: str, matches: list, prediction: dict, i: int) -> dict:
+        """Explanation of the i-th text of a _score_batch result"""
+        terms = prediction['terms']
+        return {
+            'matches': self.matcher.spans(matches, text),
+            'contributions': [
+                {
+                    'feature': feature,
+                    'value': round(float(terms[feature][0][i]), 4),
+                    'score': round(float(terms[feature][1][i]), 2),
+                    'favours': 'REAL' if feature == 'real_indicators' else 'FAKE'
+                }
+                for feature in ('fake_indicators', 'exclamation_count', 'uppercase_ratio', 'real_indicators')
+            ],
+            'adjustment': round(float(terms['adjustment'][i]), 2),
+            'fake_probability': float(prediction['fake_probability'][i])
+        }
@@ -0,0 +1,166 @@
+"""
+Execution modes for CPU-bound scoring, keeping the asyncio event loop free
+"""
+import asyncio
+import functools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+from backends import ModelBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Detectors owned by each process pool worker, keyed by spec; the initializer
+# builds the startup backend, later versions are built on their first call
+_worker_detectors = {}
+_worker_detector = None
+# Backends kept per worker: the active model, a shadow candidate and one being retired
+WORKER_BACKENDS = 3
+
+
+def _spec_key(spec) -> str:
+    name, options = spec
+    return json.dumps([name, options], sort_keys=True)
+
+
+def _worker_backend(spec) -> ModelBackend:
+    """The worker's backend for a spec, building and warming it on first use"""
+    key = _spec_key(spec)
+    backend = _worker_detectors.pop(key, None)
+    if backend is None:
+        name, options = spec
+        backend = create_backend(name, **options)
+        backend.warmup()
+    # Re-insert so the dict stays ordered from least to most recently used
+    _worker_detectors[key] = backend
+    while len(_worker_detectors) > WORKER_BACKENDS:
+        _worker_detectors.pop(next(iter(_worker_detectors)))
+    return backend
+
+
+def _init_worker(backend: str, options: dict):
+    """Process pool initializer: build and warm the worker's backend before any request arrives"""
+    global _worker_detector
+    _worker_detector = _worker_backend((backend, options))
+
+
+def _worker_call(spec, method: str, args: tuple):
+    """Run a method of the backend described by `spec` inside a process pool worker"""
+    return getattr(_worker_backend(spec), method)(*args)
+
+
+def _timed_call(submitted: float, function, *args):
+    """Run `function` in a pool worker, also returning how long it waited for the worker"""
+    # time.monotonic is system-wide, so this also holds across processes
+    return time.monotonic() - submitted, function(*args)
+
+
+def _worker_ready() -> bool:
+    """No-op task used to force every worker to start and warm up"""
+    return _worker_detector is not None
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the in-flight limit is reached and a request has to be shed"""
+
+
+class ScoringExecutor:
+    """
+    Runs detector calls inline, on a thread pool or on a process pool
+
+    At most `max_in_flight` calls are admitted at once; beyond that `run` raises
+    ExecutorSaturated immediately instead of queueing, so callers can answer 503
+    and latency stays bounded under overload. Admitted calls may still wait for
+    a free worker; `on_queue_wait(seconds)` is called with that wait after each
+    pool call.
+    """
+
+    MODES = ("inline", "thread", "process")
+
+    def __init__(self, detector: ModelBackend, mode: str = "thread", workers: int = 4,
+                 max_in_flight: int = 64, retry_after: int = 1,
+                 on_queue_wait: Callable[[float], None] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Scoring mode must be one of {', '.join(self.MODES)}, got '{mode}'")
+        self.detector = detector
+        self.mode = mode
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.on_queue_wait = on_queue_wait
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Create the worker pool on first use"""
+        if self._pool is None and self.mode != "inline":
+            with self._lock:
+                if self._pool is None:
+                    if self.mode == "thread":
+                        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="scoring")
+                    else:
+                        self._pool = ProcessPoolExecutor(
+                            self.workers,
+                            initializer=_init_worker,
+                            initargs=self.detector.spec
+                        )
+        return self._pool
+
+    def start(self):
+        """Create the pool and, in process mode, pre-warm a detector in every worker"""
+        pool = self._get_pool()
+        if self.mode == "process":
+            warmed = [pool.submit(_worker_ready) for _ in range(self.workers)]
+            ready = sum(1 for future in warmed if future.result())
+            logger.info(f"Scoring process pool warmed - {ready} task(s) confirmed ready")
+        logger.info(f"Scoring executor started - mode={self.mode}, workers={self.workers}")
+
+    def shutdown(self):
+        """Stop the worker pool, waiting for in-flight work"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def run(self, method: str, *args, backend: ModelBackend = None):
+        """
+        Call a detector method in the configured execution mode
+        `backend` overrides the executor's detector for this call, which is how
+        swapped-in model versions and shadow candidates are scored
+        """
+        detector = backend or self.detector
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.in_flight} scoring calls already in flight")
+            self.in_flight += 1
+        try:
+            if self.mode == "inline":
+                return getattr(detector, method)(*args)
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                call = functools.partial(_timed_call, time.monotonic(), getattr(detector, method), *args)
+            else:
+                call = functools.partial(_timed_call, time.monotonic(), _worker_call, detector.spec, method, args)
+            waited, result = await loop.run_in_executor(self._get_pool(), call)
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(waited)
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Executor counters for the monitoring endpoints"""
+        return {
+            "mode": self.mode,
+            "workers": 0 if self.mode == "inline" else self.workers,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,382 @@
+"""
+URL ingestion: pooled async page fetcher, streaming HTML-to-text extraction
+and an on-disk page cache
+"""
+import asyncio
+import codecs
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import time
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+TEXT_TYPES = HTML_TYPES + ("text/plain",)
+
+
+class FetchError(Exception):
+    """A page could not be fetched or used; `status_code` is the API status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text converter
+
+    Markup can be fed in arbitrary chunks as it arrives. Script, style and
+    other non-content elements are dropped, block elements become line breaks,
+    and collection stops once `max_chars` characters of text have been seen so
+    the caller can stop downloading.
+    """
+
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "object"}
+    BLOCK_TAGS = {
+        "p", "div", "br", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+        "article", "section", "header", "footer", "blockquote", "pre", "title", "hr",
+    }
+
+    def __init__(self, max_chars: int = 5000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self._parts = []
+        self._length = 0
+        self._skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self._length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.full:
+            self._parts.append(data)
+            self._length += len(data)
+
+    def text(self) -> str:
+        """Extracted text with whitespace collapsed, one block per line"""
+        lines = (re.sub(r"\s+", " ", line).strip() for line in "".join(self._parts).split("\n"))
+        return "\n".join(line for line in lines if line)[:self.max_chars]
+
+
+class PlainTextExtractor:
+    """TextExtractor counterpart for text/plain responses"""
+
+    def __init__(self, max_chars: int = 5000):
+        self.max_chars = max_chars
+        self._parts = []
+        self._length = 0
+
+    @property
+    def full(self) -> bool:
+        return self._length >= self.max_chars
+
+    def feed(self, data: str):
+        if not self.full:
+            self._parts.append(data)
+            self._length += len(data)
+
+    def close(self):
+        pass
+
+    def text(self) -> str:
+        return "".join(self._parts).strip()[:self.max_chars]
+
+
+class PageCache:
+    """
+    Extracted page texts on disk, one JSON file per URL
+
+    Entries keep the response's ETag and Last-Modified validators so stale
+    pages can be revalidated with a conditional request instead of being
+    downloaded and parsed again. Once more than `max_entries` pages are
+    stored, the least recently written ones are removed.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 10000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._entries = sum(1 for _ in self.directory.glob("*.json"))
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def put(self, url: str, entry: dict):
+        path = self._path(url)
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        is_new = not path.exists()
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(dict(entry, url=url), f)
+        # Atomic, so readers in other workers never see a partial entry
+        os.replace(temp, path)
+        if is_new:
+            self._entries += 1
+            if self._entries > self.max_entries:
+                self.prune()
+
+    def prune(self):
+        """Remove the least recently written entries until a tenth of the cap is free"""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                pass
+        entries.sort()
+        # Other workers share the directory, so the count is taken from disk
+        excess = len(entries) - self.max_entries * 9 // 10
+        for _, path in entries[:max(excess, 0)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._entries = min(len(entries), self.max_entries * 9 // 10)
+
+
+def _freshness(headers: "httpx.Headers", default_ttl: float) -> Optional[float]:
+    """Seconds a response may be reused without revalidation, or None if it must not be stored"""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return float(match.group(1)) if match else default_ttl
+
+
+def _is_public(address: str) -> bool:
+    """Whether an IP address is globally routable (not loopback, private, link-local, ...)"""
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class URLFetcher:
+    """
+    Fetches pages and turns them into article text
+
+    Connections are pooled and kept alive across requests, at most
+    `per_host_limit` requests run against the same host at once, and bodies
+    larger than `max_bytes` (after decompression) are rejected. Concurrent
+    requests for the same URL share one fetch, and extracted texts are kept
+    in the page cache: fresh entries are returned without any network call,
+    stale ones are revalidated with If-None-Match / If-Modified-Since.
+
+    Unless `allow_private` is set, every request, including each redirect
+    hop, is refused when its host resolves to a loopback, private,
+    link-local or otherwise non-public address.
+    """
+
+    def __init__(self, cache_dir: str, timeout: float = 10.0, max_bytes: int = 2 * 1024 * 1024,
+                 max_connections: int = 100, per_host_limit: int = 4, cache_ttl: float = 3600,
+                 max_chars: int = 5000, cache_max_entries: int = 10000, allow_private: bool = False):
+        self.cache = PageCache(cache_dir, cache_max_entries) if cache_dir else None
+        self.allow_private = allow_private
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.cache_ttl = cache_ttl
+        self.max_chars = max_chars
+        self.counts = {"cache_hits": 0, "revalidated": 0, "fetched": 0, "errors": 0}
+        self._loop = None
+        self._client = None
+        self._host_limits = {}
+        self._in_flight = {}
+
+    def _bind_loop(self):
+        """
+        Pools, semaphores and in-flight futures belong to one event loop; the
+        server runs a single loop, but rebuild them if we are called from another
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Imported on first use: httpx costs more startup time than the rest of the API
+            import httpx
+
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                headers={"User-Agent": "FakeGuard/1.0 (+article scoring)"},
+                # Request hooks also run for every redirect the client follows
+                event_hooks={"request": [self._check_host]},
+            )
+            self._host_limits = {}
+            self._in_flight = {}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    async def _check_host(self, request: "httpx.Request"):
+        """Refuse requests to hosts that resolve to non-public addresses"""
+        if self.allow_private:
+            return
+        host = request.url.host
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, request.url.port or 0, type=socket.SOCK_STREAM
+            )
+        except (socket.gaierror, UnicodeError) as e:
+            raise FetchError(f"Could not resolve {host}: {e}")
+        if not infos or not all(_is_public(info[4][0]) for info in infos):
+            raise FetchError(f"Host {host} is not a public address", status_code=422)
+
+    async def fetch_text(self, url: str) -> str:
+        """Return the article text of a page, from the cache when possible"""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError("URL must be an absolute http(s) URL", status_code=422)
+        self._bind_loop()
+
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_text(url, parts.hostname))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        try:
+            # Shielded so one caller going away does not cancel the shared fetch
+            return await asyncio.shield(task)
+        except FetchError:
+            self.counts["errors"] += 1
+            raise
+
+    async def _fetch_text(self, url: str, host: str) -> str:
+        import httpx
+
+        entry = self.cache.get(url) if self.cache else None
+        if entry and entry["expires_at"] > time.time():
+            self.counts["cache_hits"] += 1
+            return entry["text"]
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with self._host_slot(host):
+            try:
+                async with self._client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and entry:
+                        self.counts["revalidated"] += 1
+                        text = entry["text"]
+                    elif response.status_code >= 400:
+                        raise FetchError(f"Upstream returned HTTP {response.status_code}")
+                    else:
+                        text = await self._extract(response)
+                        self.counts["fetched"] += 1
+            except httpx.TimeoutException:
+                raise FetchError(f"Timed out fetching {url}", status_code=504)
+            except httpx.HTTPError as e:
+                raise FetchError(f"Could not fetch {url}: {e}")
+
+        ttl = _freshness(response.headers, self.cache_ttl)
+        if self.cache and ttl is not None:
+            validators = entry or {}
+            self.cache.put(url, {
+                "text": text,
+                "etag": response.headers.get("etag", validators.get("etag")),
+                "last_modified": response.headers.get("last-modified", validators.get("last_modified")),
+                "expires_at": time.time() + ttl,
+            })
+        return text
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        """
+        Hold one of the host's `per_host_limit` slots; a host's semaphore only
+        exists while requests to it are running or waiting, so the table does
+        not grow with every host ever fetched
+        """
+        limit = self._host_limits.get(host)
+        if limit is None:
+            # [semaphore, requests holding or waiting for it]
+            limit = self._host_limits[host] = [asyncio.Semaphore(self.per_host_limit), 0]
+        limit[1] += 1
+        try:
+            async with limit[0]:
+                yield
+        finally:
+            limit[1] -= 1
+            if not limit[1]:
+                del self._host_limits[host]
+
+    async def _extract(self, response: "httpx.Response") -> str:
+        """Stream the body through the extractor, enforcing the size limit"""
+        content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+        if content_type not in TEXT_TYPES:
+            raise FetchError(f"Unsupported content type '{content_type}'", status_code=422)
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise FetchError(f"Page exceeds {self.max_bytes} bytes", status_code=422)
+
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        extractor = TextExtractor(self.max_chars) if content_type in HTML_TYPES else PlainTextExtractor(self.max_chars)
+
+        received = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > self.max_bytes:
+                raise FetchError(f"Page exceeds {self.max_bytes} bytes", status_code=422)
+            extractor.feed(decoder.decode(chunk))
+            if extractor.full:
+                # Enough article text; the rest of the page is not downloaded
+                break
+        else:
+            extractor.feed(decoder.decode(b"", final=True))
+        extractor.close()
+        return extractor.text()
+
+    def stats(self) -> dict:
+        """Fetch and page cache counters for the monitoring endpoints"""
+        return dict(self.counts, in_flight=len(self._in_flight), per_host_limit=self.per_host_limit)
@@ -1,13 +1,33 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
+import time
+import asyncio
+import hmac
 from datetime import datetime
-import numpy as np
 from pydantic import BaseModel, validator
-import pickle
+from typing import Any, List, Optional
 import os
-import json
-from pathlib import Path
+import re
+import tempfile
+from backends import ModelBackend, create_backend
+from detector import validate_text
+from cache import PredictionCache, normalize_text
+from executor import ScoringExecutor, ExecutorSaturated
+from batcher import MicroBatcher
+from fetcher import URLFetcher, FetchError
+from audit import PredictionAuditLog
+from store import PredictionStore
+from sink import PREDICTIONS
+from neardup import NearDuplicateIndex
+from registry import ModelRegistry
+from responses import PredictionEncoder, ResponseCache
+from ratelimit import ANONYMOUS, KEYED, PREMIUM, LoadShedder, RateLimitMiddleware, TokenBucketLimiter
+from metrics import LatencyRegistry, LatencyMiddleware
+from counters import SharedCounters
+from streaming import NDJSONStreamingResponse, iter_lines, parse_record, encode_line
+from starlette.requests import ClientDisconnect
 
 # Configure logging
 logging.basicConfig(
@@ -23,27 +43,164 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Per-client rate limits (requests per second and burst) on the prediction
+# endpoints, by tier: anonymous clients by IP, clients sending one of the keys
+# in API_KEYS as X-API-Key, and the premium keys in PREMIUM_API_KEYS. Unknown
+# keys are limited by IP. A rate of 0 disables that tier's limit
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "50"))
+RATE_LIMIT_KEY_RPS = float(os.getenv("RATE_LIMIT_KEY_RPS", "100"))
+RATE_LIMIT_KEY_BURST = float(os.getenv("RATE_LIMIT_KEY_BURST", "200"))
+RATE_LIMIT_PREMIUM_RPS = float(os.getenv("RATE_LIMIT_PREMIUM_RPS", "0"))
+RATE_LIMIT_PREMIUM_BURST = float(os.getenv("RATE_LIMIT_PREMIUM_BURST", "1000"))
+API_KEYS = {key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip()}
+PREMIUM_API_KEYS = {key.strip() for key in os.getenv("PREMIUM_API_KEYS", "").split(",") if key.strip()}
+RATE_LIMIT_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "300"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+# Take the client IP from X-Forwarded-For (only behind a trusted proxy)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+# Load shedding: scoring queue delay above which anonymous (then keyed) requests are shed; 0 disables it
+SHED_TARGET_MS = float(os.getenv("SHED_TARGET_MS", "50"))
+SHED_INTERVAL_MS = float(os.getenv("SHED_INTERVAL_MS", "100"))
+
+# Allowed browser origins, comma-separated
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()]
+
+rate_limiters = {
+    tier: TokenBucketLimiter(rate, burst, idle_seconds=RATE_LIMIT_IDLE_SECONDS, max_clients=RATE_LIMIT_MAX_CLIENTS)
+    for tier, rate, burst in (
+        (ANONYMOUS, RATE_LIMIT_RPS, RATE_LIMIT_BURST),
+        (KEYED, RATE_LIMIT_KEY_RPS, RATE_LIMIT_KEY_BURST),
+        (PREMIUM, RATE_LIMIT_PREMIUM_RPS, RATE_LIMIT_PREMIUM_BURST),
+    )
+}
+load_shedder = LoadShedder(target_ms=SHED_TARGET_MS, interval_ms=SHED_INTERVAL_MS)
+
+# Added before CORS so that it runs inside it: rejections still carry CORS headers
+app.add_middleware(
+    RateLimitMiddleware,
+    limiters=rate_limiters,
+    shedder=load_shedder,
+    api_keys=API_KEYS,
+    premium_keys=PREMIUM_API_KEYS,
+    trust_forwarded=RATE_LIMIT_TRUST_PROXY
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Model backend: heuristic, or tfidf with a weight artifact at MODEL_PATH
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "heuristic")
+MODEL_PATH = os.getenv("MODEL_PATH", "./models/")
+
+# Model registry: hot reload of TF-IDF artifacts from MODEL_DIR (empty disables it)
+MODEL_DIR = os.getenv("MODEL_DIR", "")
+MODEL_WATCH_SECONDS = float(os.getenv("MODEL_WATCH_SECONDS", "5"))
+MODEL_SHADOW_FRACTION = float(os.getenv("MODEL_SHADOW_FRACTION", "0"))
+# Token that admin calls (model promotion) must send as X-Admin-Token; empty disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Batch configuration
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "100"))
+
+# Long-document mode: maximum text length and window size
+LONG_TEXT_MAX_CHARS = int(os.getenv("LONG_TEXT_MAX_CHARS", "1000000"))
+LONG_WINDOW_CHARS = int(os.getenv("LONG_WINDOW_CHARS", "5000"))
+
+# Streaming bulk-scoring configuration
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "64"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(64 * 1024)))
+
+# Prediction cache configuration
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+
+# Near-duplicate index (MinHash/LSH); a size of 0 disables it
+NEARDUP_INDEX_SIZE = int(os.getenv("NEARDUP_INDEX_SIZE", "20000"))
+NEARDUP_THRESHOLD = float(os.getenv("NEARDUP_THRESHOLD", "0.8"))
+NEARDUP_NUM_PERM = int(os.getenv("NEARDUP_NUM_PERM", "128"))
+NEARDUP_BANDS = int(os.getenv("NEARDUP_BANDS", "16"))
+NEARDUP_INDEX_FILE = os.getenv("NEARDUP_INDEX_FILE", "")
+
+# Scoring execution configuration (inline, thread or process)
+SCORING_MODE = os.getenv("SCORING_MODE", "thread")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 4)))
+SCORING_MAX_IN_FLIGHT = int(os.getenv("SCORING_MAX_IN_FLIGHT", "64"))
+SCORING_RETRY_AFTER = int(os.getenv("SCORING_RETRY_AFTER", "1"))
+
+# Micro-batching of concurrent /api/predict calls (max size 1 disables it)
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "32"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "2"))
+
+# URL ingestion: fetch limits and on-disk page cache (empty dir disables it)
+URL_FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "10"))
+URL_FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+URL_FETCH_MAX_CONNECTIONS = int(os.getenv("URL_FETCH_MAX_CONNECTIONS", "100"))
+URL_FETCH_PER_HOST = int(os.getenv("URL_FETCH_PER_HOST", "4"))
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fakeguard-pages"))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "3600"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "10000"))
+# Lets URLs resolve to loopback/private addresses; only for local testing
+URL_FETCH_ALLOW_PRIVATE = os.getenv("URL_FETCH_ALLOW_PRIVATE", "false").lower() == "true"
+
+# Prediction audit log; off unless a directory on durable storage is set
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "")
+AUDIT_LOG_FORMAT = os.getenv("AUDIT_LOG_FORMAT", "jsonl")
+AUDIT_LOG_BUFFER = int(os.getenv("AUDIT_LOG_BUFFER", "65536"))
+AUDIT_LOG_MAX_BYTES = int(os.getenv("AUDIT_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+AUDIT_LOG_BACKUPS = int(os.getenv("AUDIT_LOG_BACKUPS", "5"))
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv("AUDIT_LOG_FLUSH_SECONDS", "1"))
+
+# Persistent prediction history in SQLite; off unless a path on durable storage is set
+PREDICTION_STORE_PATH = os.getenv("PREDICTION_STORE_PATH", "")
+PREDICTION_STORE_BUFFER = int(os.getenv("PREDICTION_STORE_BUFFER", "65536"))
+PREDICTION_STORE_FLUSH_SECONDS = float(os.getenv("PREDICTION_STORE_FLUSH_SECONDS", "1"))
+HISTORY_MAX_BUCKETS = int(os.getenv("HISTORY_MAX_BUCKETS", "1000"))
+
+# Cluster-wide stats counters, shared by workers started by the same parent
+STATS_FILE = os.getenv(
+    "STATS_FILE",
+    os.path.join(tempfile.gettempdir(), f"fakeguard-stats-{os.getppid()}.bin")
+)
+
+# Encode /api/predict responses with the precompiled encoder; false uses the
+# PredictionResponse model and response_model validation, for comparison
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "true").lower() == "true"
+
+# /api/stats is computed at most once per interval, shared by every poller
+STATS_CACHE_SECONDS = float(os.getenv("STATS_CACHE_SECONDS", "1"))
+
+# Latency histogram configuration
+LATENCY_WINDOW_SECONDS = float(os.getenv("LATENCY_WINDOW_SECONDS", "60"))
+
+# Latency histograms
+latency = LatencyRegistry(window_seconds=LATENCY_WINDOW_SECONDS)
+
+app.add_middleware(LatencyMiddleware, registry=latency)
+
+def record_stage_timings(result: dict) -> dict:
+    """Move the detector's stage timings from a fresh result into the histograms"""
+    for stage, seconds in result.pop('timings', {}).items():
+        latency.histogram('stage', stage).observe(seconds)
+    return result
+
 # Request/Response Models
 class PredictionRequest(BaseModel):
     text: str = None
     url: str = None
+    explain: bool = False
     
     @validator('text')
     def text_must_be_valid(cls, v):
         if v is not None:
-            if len(v) < 20:
-                raise ValueError('Text must be at least 20 characters')
-            if len(v) > 5000:
-                raise ValueError('Text must not exceed 5000 characters')
+            validate_text(v)
         return v
     
     class Config:
@@ -53,11 +210,30 @@ class PredictionRequest(BaseModel):
             }
         }
 
+class PhraseMatch(BaseModel):
+    phrase: str
+    categories: List[str]
+    start: int
+    end: int
+
+class FeatureContribution(BaseModel):
+    feature: str
+    value: float
+    score: float
+    favours: str
+
+class Explanation(BaseModel):
+    matches: List[PhraseMatch]
+    contributions: List[FeatureContribution]
+    adjustment: float
+    fake_probability: float
+
 class PredictionResponse(BaseModel):
     prediction: str
     confidence: str
     sentiment: str
     timestamp: str
+    explanation: Optional[Explanation] = None
     
     class Config:
         schema_extra = {
@@ -69,145 +245,323 @@ class PredictionResponse(BaseModel):
             }
         }
 
+class BatchPredictionRequest(BaseModel):
+    # Items are checked one by one in the handler, so a null or a number fails only itself
+    texts: List[Any]
+    
+    @validator('texts')
+    def batch_must_be_valid(cls, v):
+        if not v:
+            raise ValueError('At least one text must be provided')
+        if len(v) > BATCH_MAX_SIZE:
+            raise ValueError(f'Batch must not exceed {BATCH_MAX_SIZE} texts')
+        return v
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "texts": [
+                    "Breaking news: Scientists discover major breakthrough in renewable energy technology...",
+                    "According to the official report, the study shows steady growth in the data..."
+                ]
+            }
+        }
+
+class BatchItemResult(BaseModel):
+    index: int
+    prediction: Optional[str] = None
+    confidence: Optional[str] = None
+    sentiment: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchItemResult]
+    total: int
+    succeeded: int
+    failed: int
+    timestamp: str
+
+class LongPredictionRequest(BaseModel):
+    text: str
+    window_chars: Optional[int] = None
+    
+    @validator('text')
+    def long_text_must_be_valid(cls, v):
+        if len(v) < 20:
+            raise ValueError('Text must be at least 20 characters')
+        if len(v) > LONG_TEXT_MAX_CHARS:
+            raise ValueError(f'Text must not exceed {LONG_TEXT_MAX_CHARS} characters')
+        return v
+    
+    @validator('window_chars')
+    def window_must_be_valid(cls, v):
+        if v is not None and not 200 <= v <= 5000:
+            raise ValueError('window_chars must be between 200 and 5000')
+        return v
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "text": "A long investigative piece of any length..."
+            }
+        }
+
+class WindowScore(BaseModel):
+    index: int
+    start: int
+    end: int
+    prediction: str
+    confidence: str
+    sentiment: str
+    fake_probability: float
+
+class LongPredictionResponse(BaseModel):
+    prediction: str
+    confidence: str
+    sentiment: str
+    window_chars: int
+    window_count: int
+    windows: List[WindowScore]
+    timestamp: str
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
     model_version: str
     uptime: str
+    total_predictions: int
+    workers: int
 
 # Global stats
+counters = SharedCounters(("total_predictions", "total_errors"), path=STATS_FILE or None)
 stats = {
-    "total_predictions": 0,
-    "total_errors": 0,
     "model_version": "1.0.0",
     "start_time": datetime.utcnow(),
     "accuracy": 87.3,
-    "avg_latency": 342,
 }
 
-# Mock ML Model
-class FakeNewsDetector:
-    def __init__(self):
-        self.model_version = "1.0.0"
-        self.accuracy = 87.3
-        logger.info(f"FakeNews Detector initialized - Version {self.model_version}")
-    
-    def predict(self, text: str):
-        """
-        Simulates fake news detection using pattern matching
-        In production, this would use actual trained ML models
-        """
-        try:
-            # Convert to lowercase for analysis
-            text_lower = text.lower()
-            
-            # Feature extraction
-            features = self._extract_features(text)
-            
-            # Prediction logic (simplified for demo)
-            prediction = self._classify(features, text_lower)
-            confidence = prediction['confidence']
-            sentiment = prediction['sentiment']
-            is_fake = prediction['is_fake']
-            
-            return {
-                'prediction': 'FAKE' if is_fake else 'REAL',
-                'confidence': confidence,
-                'sentiment': sentiment,
-                'features': features
-            }
-        except Exception as e:
-            logger.error(f"Prediction error: {str(e)}")
-            raise
-    
-    def _extract_features(self, text: str) -> dict:
-        """Extract linguistic features from text"""
-        words = text.split()
-        return {
-            'word_count': len(words),
-            'avg_word_length': np.mean([len(w) for w in words]) if words else 0,
-            'sentence_count': text.count('.') + text.count('!') + text.count('?'),
-            'uppercase_ratio': sum(1 for c in text if c.isupper()) / len(text) if text else 0,
-            'punctuation_count': sum(1 for c in text if c in '!?'),
-            'exclamation_count': text.count('!'),
-        }
-    
-    def _classify(self, features: dict, text_lower: str) -> dict:
-        """Classify text as fake or real based on features"""
-        
-        # Fake news indicators
-        fake_indicators = [
-            'breaking', 'shocking', 'exclusive', 'you won\'t believe',
-            'doctors hate', 'one weird trick', 'miracle', 'guaranteed',
-            'secret', 'conspiracy', 'cover-up', 'exposed'
-        ]
-        
-        real_indicators = [
-            'according to', 'study shows', 'research', 'data',
-            'analysis', 'report', 'official', 'statement'
-        ]
-        
-        # Count indicators
-        fake_count = sum(1 for indicator in fake_indicators if indicator in text_lower)
-        real_count = sum(1 for indicator in real_indicators if indicator in text_lower)
-        
-        # Feature-based scoring
-        exclamation_score = min(features['exclamation_count'] * 10, 40)
-        caps_score = features['uppercase_ratio'] * 30
-        
-        # Combined score
-        fake_score = fake_count * 15 + exclamation_score + caps_score
-        real_score = real_count * 15
-        
-        # Normalize with some randomness for demo
-        total_score = fake_score + real_score
-        fake_probability = (fake_score / (total_score + 1)) * 100 if total_score > 0 else 50
-        fake_probability = np.clip(fake_probability + np.random.normal(0, 5), 0, 100)
-        
-        # Sentiment analysis
-        positive_words = ['good', 'great', 'amazing', 'excellent', 'best']
-        negative_words = ['bad', 'terrible', 'horrible', 'worst', 'awful']
-        
-        pos_count = sum(1 for w in positive_words if w in text_lower)
-        neg_count = sum(1 for w in negative_words if w in text_lower)
-        
-        if pos_count > neg_count:
-            sentiment = 'positive'
-        elif neg_count > pos_count:
-            sentiment = 'negative'
-        else:
-            sentiment = 'neutral'
-        
-        # Confidence (higher if more indicators found)
-        indicator_confidence = min((fake_count + real_count) * 5 + 60, 95)
-        confidence = max(indicator_confidence + np.random.normal(0, 3), 50)
-        confidence = np.clip(confidence, 50, 99)
-        
-        return {
-            'is_fake': fake_probability > 50,
-            'confidence': round(confidence, 1),
-            'sentiment': sentiment,
-            'fake_probability': round(fake_probability, 1)
-        }
+# Initialize model registry; request handlers score with model_registry.active.
+# Construction only reads metadata; the model is exercised by warm_up_model()
+model_registry = ModelRegistry(
+    MODEL_DIR or None,
+    default=lambda: create_backend(MODEL_BACKEND, **({"model_path": MODEL_PATH} if MODEL_BACKEND == "tfidf" else {})),
+    poll_seconds=MODEL_WATCH_SECONDS,
+    shadow_fraction=MODEL_SHADOW_FRACTION,
+    lexicon_path=os.getenv("LEXICON_PATH")
+)
+# Backend loaded at startup
+detector = model_registry.active
+
+# Precompiled encoder for /api/predict responses
+prediction_encoder = PredictionEncoder()
+
+# Pre-encoded responses of the read-only endpoints
+response_cache = ResponseCache()
+
+# Initialize prediction cache
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+# Initialize near-duplicate index
+near_duplicates = NearDuplicateIndex(
+    capacity=NEARDUP_INDEX_SIZE,
+    threshold=NEARDUP_THRESHOLD,
+    num_perm=NEARDUP_NUM_PERM,
+    bands=NEARDUP_BANDS,
+    model_version=f"{detector.name}:{detector.model_version}",
+    path=NEARDUP_INDEX_FILE or None,
+    registry=latency
+)
+
+# Verdicts of a replaced model must not answer for the new one
+model_registry.add_listener(
+    lambda backend: near_duplicates.set_model_version(f"{backend.name}:{backend.model_version}")
+)
+
+# Initialize prediction audit log
+audit_log = PredictionAuditLog(
+    AUDIT_LOG_DIR or None,
+    fmt=AUDIT_LOG_FORMAT,
+    capacity=AUDIT_LOG_BUFFER,
+    max_file_bytes=AUDIT_LOG_MAX_BYTES,
+    backups=AUDIT_LOG_BACKUPS,
+    flush_seconds=AUDIT_LOG_FLUSH_SECONDS
+)
+
+# Initialize prediction store
+prediction_store = PredictionStore(
+    PREDICTION_STORE_PATH or None,
+    capacity=PREDICTION_STORE_BUFFER,
+    flush_seconds=PREDICTION_STORE_FLUSH_SECONDS,
+    max_buckets=HISTORY_MAX_BUCKETS
+)
+
+def log_prediction(endpoint: str, result: dict, text: str):
+    """Hand a served prediction to the audit log and the prediction store; neither blocks"""
+    audit_log.record(endpoint, result['prediction'], result['confidence'], result['sentiment'], len(text))
+    prediction_store.record(
+        endpoint, result['prediction'], result['confidence'], result['sentiment'], text,
+        model_registry.active.model_version
+    )
+
+# Initialize URL fetcher
+url_fetcher = URLFetcher(
+    PAGE_CACHE_DIR,
+    timeout=URL_FETCH_TIMEOUT,
+    max_bytes=URL_FETCH_MAX_BYTES,
+    max_connections=URL_FETCH_MAX_CONNECTIONS,
+    per_host_limit=URL_FETCH_PER_HOST,
+    cache_ttl=PAGE_CACHE_TTL,
+    cache_max_entries=PAGE_CACHE_MAX_ENTRIES,
+    allow_private=URL_FETCH_ALLOW_PRIVATE
+)
 
-# Initialize detector
-detector = FakeNewsDetector()
+def observe_scoring_queue_wait(seconds: float):
+    """Feed the time a scoring call waited for a worker to the histograms and the load shedder"""
+    latency.histogram('queue_wait', 'scoring').observe(seconds)
+    load_shedder.observe(seconds)
+
+# Initialize scoring executor
+scoring_executor = ScoringExecutor(
+    detector,
+    mode=SCORING_MODE,
+    workers=SCORING_WORKERS,
+    max_in_flight=SCORING_MAX_IN_FLIGHT,
+    retry_after=SCORING_RETRY_AFTER,
+    on_queue_wait=observe_scoring_queue_wait
+)
+
+async def score(method: str, *args, backend: ModelBackend = None):
+    """
+    Run a method of the active model (or `backend`) on the scoring executor,
+    shedding load with 503 when saturated
+    """
+    try:
+        return await scoring_executor.run(method, *args, backend=backend or model_registry.active)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry later",
+            headers={"Retry-After": str(scoring_executor.retry_after)}
+        )
+
+async def score_texts(texts: List[str], check_cache: bool = True) -> List[dict]:
+    """
+    Score normalized texts in one batch, reusing cached results where possible
+    Cache misses that are near-duplicates of recently scored texts take over
+    their verdicts; only the rest reach the detector. Callers that have
+    already missed the cache pass `check_cache=False`, so each text counts
+    as one lookup; results are cached either way
+    """
+    backend = model_registry.active
+    cache_keys = [PredictionCache.make_key(text, backend.model_version) for text in texts]
+    if check_cache:
+        predictions = [prediction_cache.get(key) for key in cache_keys]
+    else:
+        predictions = [None] * len(texts)
+    misses = [i for i, result in enumerate(predictions) if result is None]
+    if misses and near_duplicates.capacity:
+        signatures, matches = await asyncio.to_thread(near_duplicates.lookup_many, [texts[i] for i in misses])
+        signatures = dict(zip(misses, signatures))
+        for i, match in zip(misses, matches):
+            predictions[i] = match
+        misses = [i for i in misses if predictions[i] is None]
+    scored = await score('predict_many', [texts[i] for i in misses], backend=backend) if misses else []
+    shadowed = model_registry.sample(len(scored))
+    if shadowed:
+        start_shadow_scoring([texts[misses[j]] for j in shadowed], [scored[j] for j in shadowed])
+    for i, result in zip(misses, scored):
+        predictions[i] = record_stage_timings(result)
+        prediction_cache.put(cache_keys[i], result)
+        if near_duplicates.capacity and backend is model_registry.active:
+            near_duplicates.insert(signatures[i], result)
+    return predictions
+
+# Background shadow scoring tasks, referenced until they finish
+shadow_tasks = set()
+
+def start_shadow_scoring(texts: List[str], results: List[dict]):
+    """
+    Score a sample of texts with the candidate model in the background
+    Shadow calls only take executor slots while it is at most half busy, so
+    they never cause live requests to be shed
+    """
+    candidate = model_registry.candidate
+    active = [{'prediction': r['prediction'], 'confidence': r['confidence']} for r in results]
+    active_seconds = [sum(r['timings'].values()) for r in results]
+
+    async def run():
+        shadow = None
+        if scoring_executor.in_flight < scoring_executor.max_in_flight // 2:
+            try:
+                shadow = await scoring_executor.run('predict_many', texts, backend=candidate)
+            except ExecutorSaturated:
+                pass
+            except Exception as e:
+                logger.error(f"Shadow scoring with {candidate.model_version} failed: {e}")
+                return
+        model_registry.record_shadow(candidate, active, active_seconds, shadow)
+
+    task = asyncio.create_task(run())
+    shadow_tasks.add(task)
+    task.add_done_callback(shadow_tasks.discard)
+
+# Coalesce concurrent single predictions into vectorized batches; /api/predict
+# only submits texts it has already looked up in the cache
+predict_batcher = MicroBatcher(
+    lambda texts: score_texts(texts, check_cache=False),
+    max_batch_size=PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+    registry=latency,
+    label='/api/predict'
+)
 
 # API Endpoints
-@app.get("/", tags=["Info"])
-async def root():
-    """Root endpoint with API information"""
+def build_root() -> dict:
     return {
         "service": "FakeGuard API",
         "version": "1.0.0",
         "description": "AI-Based Fake News Detection Platform",
         "endpoints": {
             "health": "/api/health",
+            "ready": "/api/ready",
             "predict": "/api/predict",
-            "stats": "/api/stats"
+            "predict_batch": "/api/predict/batch",
+            "predict_stream": "/api/predict/stream",
+            "predict_long": "/api/predict/long",
+            "stats": "/api/stats",
+            "history": "/api/history/predictions",
+            "history_aggregates": "/api/history/aggregates"
         }
     }
 
+@app.get("/", tags=["Info"])
+async def root(request: Request):
+    """Root endpoint with API information"""
+    return response_cache.get('root', build_root).response(request.headers.get('if-none-match'))
+
+# Warmup and readiness state of this process
+readiness = {"model_warm": False, "ready": False, "warmup_seconds": None}
+
+WARMUP_TEXT = "According to the official report, the committee SHOCKED everyone! Was it true?"
+
+def warm_up_model():
+    """
+    Load and exercise the active model once
+    serve.py calls this in the parent before forking workers, so the loaded
+    lexicons, tables and mapped weights are shared copy-on-write; in a worker
+    that inherited a warm model it does nothing
+    """
+    if readiness['model_warm']:
+        return
+    started = time.perf_counter()
+    backend = model_registry.active
+    backend.warmup()
+    # One real batch touches every lazily built table and NumPy code path
+    backend.predict_many([WARMUP_TEXT])
+    readiness['warmup_seconds'] = round(time.perf_counter() - started, 3)
+    readiness['model_warm'] = True
+    logger.info(f"Model {backend.model_version} warmed up in {readiness['warmup_seconds']}s")
+
 @app.get("/api/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """Health check endpoint"""
@@ -215,77 +569,335 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "model_version": detector.model_version,
-        "uptime": str(uptime)
+        "model_version": model_registry.active.model_version,
+        "uptime": str(uptime),
+        "total_predictions": counters.totals()['total_predictions'],
+        "workers": counters.workers()
+    }
+
+@app.get("/api/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness probe: 503 until this worker has warmed its model and started
+    its scoring executor, and again once it begins shutting down
+    """
+    if not readiness['ready']:
+        return JSONResponse(status_code=503, content={"status": "starting", "pid": os.getpid()})
+    return {
+        "status": "ready",
+        "pid": os.getpid(),
+        "model_version": model_registry.active.model_version,
+        "warmup_seconds": readiness['warmup_seconds']
     }
 
-@app.post("/api/predict", response_model=PredictionResponse, tags=["Prediction"])
-async def predict(request: PredictionRequest, background_tasks: BackgroundTasks):
+@app.post("/api/predict", response_model=PredictionResponse, response_model_exclude_none=True, tags=["Prediction"])
+async def predict(request: PredictionRequest, raw_request: Request):
     """
     Predict if news content is fake or real
+    With "explain": true, the response also lists the matched lexicon phrases
+    and each feature's contribution to the score
     """
+    # Body parsing and validation happen before the handler runs
+    latency.histogram('stage', 'validation').observe(time.perf_counter() - raw_request.state.started_at)
     try:
         # Validate input
         if not request.text and not request.url:
             raise HTTPException(status_code=400, detail="Either 'text' or 'url' must be provided")
         
         # Get text to analyze
-        text_to_analyze = request.text
         if request.url:
-            # In production, scrape URL here
-            raise HTTPException(status_code=501, detail="URL processing not yet implemented")
+            text_to_analyze = validate_text(normalize_text(await url_fetcher.fetch_text(request.url)))
+        else:
+            text_to_analyze = normalize_text(request.text)
+        
+        if request.explain:
+            # Cached and batched results carry no explanation; score this text on its own
+            result = record_stage_timings((await score('predict_many', [text_to_analyze], True))[0])
+        else:
+            # Make prediction, reusing the cached result for repeated texts and
+            # batching cache misses with concurrent requests
+            cache_key = PredictionCache.make_key(text_to_analyze, model_registry.active.model_version)
+            result = prediction_cache.get(cache_key)
+            if result is None:
+                result = await predict_batcher.submit(text_to_analyze)
+        
+        # Update stats
+        counters.increment('total_predictions')
+        
+        # Audit log and history for monitoring
+        log_prediction('predict', result, text_to_analyze)
+        
+        if FAST_RESPONSES and not request.explain:
+            response = prediction_encoder.response(result['prediction'], result['confidence'], result['sentiment'])
+        else:
+            response = PredictionResponse(
+                prediction=result['prediction'],
+                confidence=str(result['confidence']),
+                sentiment=result['sentiment'],
+                timestamp=datetime.utcnow().isoformat(),
+                explanation=result.get('explanation')
+            )
+        raw_request.state.handler_finished = time.perf_counter()
+        return response
+    
+    except HTTPException:
+        raise
+    except FetchError as e:
+        counters.increment('total_errors')
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except ValueError as e:
+        counters.increment('total_errors')
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        counters.increment('total_errors')
+        logger.error(f"Prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/api/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
+async def predict_batch(request: BatchPredictionRequest, raw_request: Request):
+    """
+    Predict a batch of news texts in one vectorized pass
+    Invalid texts are reported per item and do not fail the batch
+    """
+    latency.histogram('stage', 'validation').observe(time.perf_counter() - raw_request.state.started_at)
+    try:
+        results = [None] * len(request.texts)
+        valid_indices = []
+        valid_texts = []
         
-        logger.info(f"Processing prediction for text length: {len(text_to_analyze)}")
+        # Validate each text independently
+        for index, text in enumerate(request.texts):
+            try:
+                if not isinstance(text, str):
+                    raise ValueError('Text must be a string')
+                valid_texts.append(normalize_text(validate_text(text)))
+                valid_indices.append(index)
+            except ValueError as e:
+                results[index] = BatchItemResult(index=index, error=str(e))
         
-        # Make prediction
-        result = detector.predict(text_to_analyze)
+        # Make predictions, scoring only the texts that are not cached
+        predictions = await score_texts(valid_texts)
+        timestamp = datetime.utcnow().isoformat()
+        
+        for index, text, result in zip(valid_indices, valid_texts, predictions):
+            results[index] = BatchItemResult(
+                index=index,
+                prediction=result['prediction'],
+                confidence=str(result['confidence']),
+                sentiment=result['sentiment']
+            )
+            log_prediction('batch', result, text)
         
         # Update stats
-        stats['total_predictions'] += 1
+        failed = len(request.texts) - len(valid_texts)
+        counters.increment('total_predictions', len(valid_texts))
+        counters.increment('total_errors', failed)
         
-        # Log for monitoring
-        background_tasks.add_task(
-            log_prediction,
-            result['prediction'],
-            result['confidence'],
-            result['sentiment']
+        response = BatchPredictionResponse(
+            results=results,
+            total=len(results),
+            succeeded=len(valid_texts),
+            failed=failed,
+            timestamp=timestamp
         )
+        raw_request.state.handler_finished = time.perf_counter()
+        return response
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        counters.increment('total_errors')
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/api/predict/long", response_model=LongPredictionResponse, tags=["Prediction"])
+async def predict_long(request: LongPredictionRequest, raw_request: Request):
+    """
+    Predict a document longer than 5000 characters
+    The text is scored in overlapping windows whose feature counts are combined
+    into one verdict for the whole document, returned with every window's score
+    """
+    latency.histogram('stage', 'validation').observe(time.perf_counter() - raw_request.state.started_at)
+    try:
+        text_to_analyze = normalize_text(request.text)
+        result = record_stage_timings(
+            await score('predict_long', text_to_analyze, request.window_chars or LONG_WINDOW_CHARS)
+        )
+        
+        counters.increment('total_predictions')
+        log_prediction('long', result, text_to_analyze)
         
-        return PredictionResponse(
+        response = LongPredictionResponse(
             prediction=result['prediction'],
             confidence=str(result['confidence']),
             sentiment=result['sentiment'],
+            window_chars=result['window_chars'],
+            window_count=len(result['windows']),
+            windows=[dict(window, confidence=str(window['confidence'])) for window in result['windows']],
             timestamp=datetime.utcnow().isoformat()
         )
+        raw_request.state.handler_finished = time.perf_counter()
+        return response
     
-    except ValueError as e:
-        stats['total_errors'] += 1
-        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
-        stats['total_errors'] += 1
-        logger.error(f"Prediction error: {str(e)}")
+        counters.increment('total_errors')
+        logger.error(f"Long document prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/stats", tags=["Monitoring"])
-async def get_stats():
-    """Get system statistics"""
+async def score_stream_batch(records: List[tuple]) -> bytes:
+    """Score one micro-batch of (line, id, text, error) records into NDJSON lines"""
+    valid = [(line, record_id, text) for line, record_id, text, error in records if error is None]
+    while True:
+        try:
+            predictions = await score_texts([text for _, _, text in valid])
+            break
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            # Saturated: wait instead of failing, which also slows reading the upload
+            await asyncio.sleep(scoring_executor.retry_after)
+    
+    results = iter(predictions)
+    lines = []
+    for line, record_id, text, error in records:
+        if error is not None:
+            lines.append(encode_line({"line": line, "id": record_id, "error": error}))
+            continue
+        result = next(results)
+        log_prediction('stream', result, text)
+        lines.append(encode_line({
+            "line": line,
+            "id": record_id,
+            "prediction": result['prediction'],
+            "confidence": str(result['confidence']),
+            "sentiment": str(result['sentiment'])
+        }))
+    
+    counters.increment('total_predictions', len(valid))
+    counters.increment('total_errors', len(records) - len(valid))
+    return b''.join(lines)
+
+@app.post("/api/predict/stream", response_class=NDJSONStreamingResponse, tags=["Prediction"])
+async def predict_stream(raw_request: Request):
+    """
+    Score an NDJSON upload of {"id", "text"} records, streaming NDJSON results back
+    Records are read and scored in micro-batches, so memory stays flat for any
+    upload size, and a slow reader pauses scoring and reading of the upload
+    """
+    async def generate():
+        records = []
+        total = failed = 0
+        try:
+            async for line, data in iter_lines(raw_request.stream(), STREAM_MAX_LINE_BYTES):
+                if data is not None and not data.strip():
+                    continue
+                record_id = None
+                try:
+                    if data is None:
+                        raise ValueError(f"Line exceeds {STREAM_MAX_LINE_BYTES} bytes")
+                    record_id, text = parse_record(data)
+                    records.append((line, record_id, normalize_text(validate_text(text)), None))
+                except ValueError as e:
+                    records.append((line, record_id, None, str(e)))
+                    failed += 1
+                total += 1
+                
+                if len(records) >= STREAM_BATCH_SIZE:
+                    yield await score_stream_batch(records)
+                    records = []
+            if records:
+                yield await score_stream_batch(records)
+            yield encode_line({"done": True, "total": total, "succeeded": total - failed, "failed": failed})
+        except ClientDisconnect:
+            logger.warning(f"Client disconnected from prediction stream after {total} records")
+    
+    logger.info("Processing streaming prediction upload")
+    return NDJSONStreamingResponse(generate())
+
+def build_stats() -> dict:
     uptime = datetime.utcnow() - stats['start_time']
+    totals = counters.totals()
     return {
-        "total_predictions": stats['total_predictions'],
-        "total_errors": stats['total_errors'],
-        "error_rate": (stats['total_errors'] / max(stats['total_predictions'], 1)) * 100,
-        "model_version": detector.model_version,
+        "total_predictions": totals['total_predictions'],
+        "total_errors": totals['total_errors'],
+        "error_rate": (totals['total_errors'] / max(totals['total_predictions'], 1)) * 100,
+        "workers": counters.workers(),
+        "model_version": model_registry.active.model_version,
         "model_accuracy": stats['accuracy'],
-        "avg_latency_ms": stats['avg_latency'],
+        "avg_latency_ms": latency.histogram('request', '/api/predict').summary()['mean_ms'],
+        "latency": {
+            "requests": latency.summaries('request'),
+            "stages": latency.summaries('stage')
+        },
+        "cache": prediction_cache.stats(),
+        "executor": scoring_executor.stats(),
+        "batching": predict_batcher.stats(),
+        "near_duplicates": near_duplicates.stats(),
+        "url_fetcher": url_fetcher.stats(),
+        "audit_log": audit_log.stats(),
+        "prediction_store": prediction_store.stats(),
+        "model_registry": model_registry.stats(),
+        "response_cache": response_cache.stats(),
+        "rate_limiting": {
+            "tiers": {tier: limiter.stats() for tier, limiter in rate_limiters.items()},
+            "scoring_queue_wait": latency.histogram('queue_wait', 'scoring').summary(),
+            "load_shedding": load_shedder.stats()
+        },
         "uptime_seconds": uptime.total_seconds(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
-@app.get("/api/model-info", tags=["Model"])
-async def model_info():
-    """Get ML model information"""
+@app.get("/api/stats", tags=["Monitoring"])
+async def get_stats(request: Request):
+    """
+    Get system statistics
+    Computed at most once per STATS_CACHE_SECONDS; pollers in between share the same bytes
+    """
+    encoded = response_cache.get('stats', build_stats, max_age=STATS_CACHE_SECONDS)
+    return encoded.response(request.headers.get('if-none-match'))
+
+def history_store() -> PredictionStore:
+    if not prediction_store.enabled:
+        raise HTTPException(status_code=404, detail="Prediction history is disabled")
+    return prediction_store
+
+@app.get("/api/history/aggregates", tags=["Monitoring"])
+async def history_aggregates(start: float = None, end: float = None, bucket: int = 3600):
+    """
+    Prediction counts per verdict per `bucket` seconds between `start` and
+    `end` (Unix seconds; the last 24 hours by default), from the store's rollups
+    """
+    store = history_store()
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    try:
+        buckets = await asyncio.to_thread(store.aggregate, start, end, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"start": start, "end": end, "bucket_seconds": bucket, "buckets": buckets}
+
+@app.get("/api/history/predictions", tags=["Monitoring"])
+async def history_predictions(start: float = None, end: float = None, verdict: str = None,
+                              text_hash: str = None, limit: int = 100):
+    """Stored predictions, newest first, filtered by time range, verdict or text hash"""
+    store = history_store()
+    if verdict is not None and verdict not in PREDICTIONS:
+        raise HTTPException(status_code=422, detail=f"Verdict must be one of {', '.join(PREDICTIONS)}")
+    if text_hash is not None and not re.fullmatch(r"[0-9a-f]{32}", text_hash):
+        raise HTTPException(status_code=422, detail="Text hash must be 32 lowercase hex digits")
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=422, detail="Limit must be between 1 and 1000")
+    predictions = await asyncio.to_thread(store.recent, start, end, verdict, text_hash, limit)
+    return {"predictions": predictions, "count": len(predictions)}
+
+def build_model_info() -> dict:
+    backend = model_registry.active.describe()
     return {
-        "version": detector.model_version,
+        "version": backend["version"],
         "accuracy": stats['accuracy'],
         "precision": 86.8,
         "recall": 87.9,
@@ -293,41 +905,107 @@ async def model_info():
         "roc_auc": 0.933,
         "training_date": "2025-02-01",
         "training_dataset_size": 25000,
-        "features_extracted": 500,
-        "ensemble_models": 4,
-        "avg_inference_time_ms": 342,
-        "model_size_mb": 125
+        # Only reported when the active backend has them
+        **{key: backend[key] for key in ("features_extracted", "ensemble_models", "model_size_mb") if key in backend},
+        "avg_inference_time_ms": round(sum(
+            latency.histogram('stage', stage).summary()['mean_ms']
+            for stage in ('extract_features', 'classify')
+        ), 3),
+        "backend": backend
     }
 
-def log_prediction(prediction: str, confidence: float, sentiment: str):
-    """Background task to log predictions"""
-    logger.info(f"Prediction: {prediction}, Confidence: {confidence}%, Sentiment: {sentiment}")
+@app.get("/api/model-info", tags=["Model"])
+async def model_info(request: Request):
+    """
+    Get ML model information
+    Encoded once per model version; the measured inference time in it is
+    refreshed with the stats interval
+    """
+    encoded = response_cache.get(
+        'model_info', build_model_info, key=model_registry.active, max_age=STATS_CACHE_SECONDS
+    )
+    return encoded.response(request.headers.get('if-none-match'))
+
+def require_admin(request: Request):
+    """Reject the request unless it carries the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    token = request.headers.get('x-admin-token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+@app.post("/api/model/promote", tags=["Model"])
+async def promote_model(request: Request):
+    """Make the shadow candidate model the active one (requires the admin token)"""
+    require_admin(request)
+    try:
+        model_registry.promote()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_registry.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    totals = counters.totals()
+    scalars = {
+        "fakeguard_predictions_total": ("Total successful predictions", "counter", totals['total_predictions']),
+        "fakeguard_errors_total": ("Total prediction errors", "counter", totals['total_errors']),
+        "fakeguard_cache_hits_total": ("Prediction cache hits", "counter", prediction_cache.hits),
+        "fakeguard_cache_misses_total": ("Prediction cache misses", "counter", prediction_cache.misses),
+        "fakeguard_near_duplicate_hits_total": ("Predictions answered by the near-duplicate index", "counter", near_duplicates.short_circuits),
+        "fakeguard_scoring_in_flight": ("Scoring calls currently in flight", "gauge", scoring_executor.in_flight),
+        "fakeguard_rate_limited_total": ("Requests rejected by per-client rate limits", "counter", sum(limiter.limited for limiter in rate_limiters.values())),
+        "fakeguard_shed_total": ("Requests shed on scoring queue delay", "counter", sum(load_shedder.shed.values())),
+        "fakeguard_scoring_queue_delay_seconds": ("Standing scoring queue delay seen by the load shedder", "gauge", load_shedder.delay),
+        "fakeguard_audit_dropped_total": ("Audit records dropped on buffer overflow", "counter", audit_log.dropped),
+        "fakeguard_store_dropped_total": ("Prediction store records dropped on buffer overflow", "counter", prediction_store.dropped),
+    }
+    return PlainTextResponse(
+        latency.render_prometheus(scalars),
+        media_type="text/plain; version=0.0.4"
+    )
 
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Handle HTTP exceptions"""
     logger.error(f"HTTP Exception: {exc.status_code} - {exc.detail}")
-    return {
-        "error": exc.detail,
-        "status_code": exc.status_code,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "error": exc.detail,
+            "status_code": exc.status_code,
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        headers=exc.headers
+    )
 
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
     logger.info("=" * 50)
     logger.info("FakeGuard API Server Starting")
-    logger.info(f"Model Version: {detector.model_version}")
+    logger.info(f"Model Version: {model_registry.active.model_version}")
+    warm_up_model()
+    scoring_executor.start()
+    model_registry.start()
+    readiness['ready'] = True
     logger.info("=" * 50)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("=" * 50)
     logger.info(f"FakeGuard API Server Shutting Down")
-    logger.info(f"Total Predictions: {stats['total_predictions']}")
-    logger.info(f"Total Errors: {stats['total_errors']}")
+    readiness['ready'] = False
+    totals = counters.totals()
+    logger.info(f"Total Predictions: {totals['total_predictions']}")
+    logger.info(f"Total Errors: {totals['total_errors']}")
+    model_registry.stop()
+    scoring_executor.shutdown()
+    await url_fetcher.aclose()
+    audit_log.stop()
+    prediction_store.stop()
     logger.info("=" * 50)
 
 if __name__ == "__main__":
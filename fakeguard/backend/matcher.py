@@ -0,0 +1,156 @@
+"""
+Single-pass multi-pattern matcher for the detector's indicator lexicons
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+DEFAULT_LEXICON_PATH = Path(__file__).parent / "lexicons.json"
+
+
+def load_lexicons(path=None) -> Dict[str, List[str]]:
+    """Load phrase lexicons from a JSON file mapping category -> list of phrases"""
+    path = Path(path) if path else DEFAULT_LEXICON_PATH
+    with open(path, encoding="utf-8") as f:
+        lexicons = json.load(f)
+    if not isinstance(lexicons, dict) or not all(isinstance(v, list) for v in lexicons.values()):
+        raise ValueError(f"Lexicon file {path} must map category names to lists of phrases")
+    return lexicons
+
+
+def _trie_pattern(node: dict) -> str:
+    """Convert a character trie into a regex that prefers the longest phrase"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # A phrase ends here; the greedy optional keeps trying longer phrases first
+        body = "(?:" + body + ")?"
+    return body
+
+
+class PhraseMatcher:
+    """
+    Counts distinct lexicon phrases per category with a single regex scan
+
+    All phrases are compiled into one trie-shaped pattern, so the scan cost does
+    not grow with the number of phrases. The longest phrase starting at each
+    position is reported and the shorter phrases that are its prefixes are added
+    from a precomputed table, which keeps the results identical to a separate
+    `phrase in text` check per phrase.
+    """
+
+    def __init__(self, lexicons: Dict[str, List[str]]):
+        self.categories = list(lexicons)
+        if any("\n" in phrase for phrases in lexicons.values() for phrase in phrases):
+            raise ValueError("Lexicon phrases must not contain newlines")
+        self.phrases = sorted({p.lower() for phrases in lexicons.values() for p in phrases if p})
+        self._index = {phrase: i for i, phrase in enumerate(self.phrases)}
+
+        # Phrase x category membership, summed over matched phrases to get counts
+        self._membership = np.zeros((len(self.phrases), len(self.categories)), dtype=np.int64)
+        for column, category in enumerate(self.categories):
+            for phrase in lexicons[category]:
+                if phrase:
+                    self._membership[self._index[phrase.lower()], column] = 1
+        self._phrase_categories = [
+            [self.categories[column] for column in np.flatnonzero(row)] for row in self._membership
+        ]
+
+        # Phrases that also occur wherever a given phrase occurs (its lexicon prefixes)
+        self._prefixes = [
+            [self._index[phrase[:end]] for end in range(1, len(phrase) + 1) if phrase[:end] in self._index]
+            for phrase in self.phrases
+        ]
+
+        trie = {}
+        for phrase in self.phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._pattern = re.compile(_trie_pattern(trie)) if self.phrases else None
+
+    def _matches(self, text: str):
+        """Yield (position, phrase index) for the longest phrase at each matching position"""
+        if self._pattern is None:
+            return
+        search = self._pattern.search
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            yield start, self._index[match.group()]
+            # Resume one character later so overlapping phrases are still found
+            match = search(text, start + 1)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Count the distinct phrases of each category found in an already lowercased text"""
+        found = set()
+        for _, phrase in self._matches(text):
+            found.update(self._prefixes[phrase])
+        totals = self._membership[list(found)].sum(axis=0)
+        return {category: int(totals[i]) for i, category in enumerate(self.categories)}
+
+    @property
+    def longest_phrase(self) -> int:
+        """Length of the longest phrase, i.e. how far a match can reach across a cut"""
+        return max(map(len, self.phrases), default=0)
+
+    def count_many(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Batched count: one scan over the joined texts, one count array per category"""
+        return self.totals(self.found_many(texts))
+
+    def found_many(self, texts: List[str], matches: List[list] = None) -> List[Set[int]]:
+        """
+        Indices of the distinct phrases found in each already lowercased text
+        When `matches` is given (one list per text), the (offset, phrase index)
+        of every match found along the way is appended to the text's list too
+        """
+        found = [set() for _ in texts]
+        if texts:
+            # Texts are joined on newlines, which no phrase contains, so matches never
+            # straddle two texts; positions are mapped back with a binary search
+            starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+            for position, phrase in self._matches("\n".join(texts)):
+                row = int(np.searchsorted(starts, position, side="right")) - 1
+                found[row].update(self._prefixes[phrase])
+                if matches is not None:
+                    matches[row].append((position - int(starts[row]), phrase))
+        return found
+
+    def spans(self, matches: List[Tuple[int, int]], text: str = None) -> List[dict]:
+        """
+        Every phrase occurrence behind a text's found_many matches, as its phrase,
+        categories and [start, end) character offsets, in order of position
+        Offsets are into the lowercased text, or into `text` itself when given
+        """
+        spans = []
+        for start, phrase in matches:
+            # The longest phrase at a position comes last, after its prefixes
+            for index in self._prefixes[phrase]:
+                spans.append({
+                    "phrase": self.phrases[index],
+                    "categories": self._phrase_categories[index],
+                    "start": start,
+                    "end": start + len(self.phrases[index]),
+                })
+        if text is not None and spans:
+            # A few characters lowercase to several (such as "İ"); map offsets back
+            ends = np.cumsum([len(char.lower()) for char in text])
+            if ends[-1] != len(text):
+                for span in spans:
+                    span["start"] = int(np.searchsorted(ends, span["start"], side="right"))
+                    span["end"] = int(np.searchsorted(ends, span["end"] - 1, side="right")) + 1
+        return spans
+
+    def totals(self, found: List[Set[int]]) -> Dict[str, np.ndarray]:
+        """Per-category counts for sets of phrase indices, such as unions of found_many results"""
+        counts = np.zeros((len(found), len(self.categories)), dtype=np.int64)
+        for row, phrases in enumerate(found):
+            if phrases:
+                counts[row] = self._membership[list(phrases)].sum(axis=0)
+        return {category: counts[:, i] for i, category in enumerate(self.categories)}
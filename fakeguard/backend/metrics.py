@@ -0,0 +1,240 @@
+"""
+Latency histograms for the API and Prometheus text exposition
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict
+
+# Bucket upper bounds in seconds, from 25us (feature extraction) up to 10s
+DEFAULT_BUCKETS = (
+    0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Bucket upper bounds for families that count items rather than time
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# Metric families: prometheus name, label name, help text
+FAMILIES = {
+    "request": ("fakeguard_request_duration_seconds", "path", "HTTP request latency by endpoint"),
+    "stage": ("fakeguard_stage_duration_seconds", "stage", "Prediction latency by processing stage"),
+    "queue_wait": ("fakeguard_batch_queue_wait_seconds", "endpoint", "Time a request waits for its micro-batch or a scoring worker"),
+    "batch_size": ("fakeguard_batch_size", "endpoint", "Texts scored per micro-batch"),
+}
+
+# Families whose histograms use COUNT_BUCKETS and report plain values instead of milliseconds
+COUNT_FAMILIES = ("batch_size",)
+
+
+class _Shard:
+    """Counts written by a single thread; readers merge all shards"""
+
+    __slots__ = ("epochs", "window_counts", "window_sums", "counts", "sum")
+
+    def __init__(self, buckets: int, slots: int):
+        self.epochs = [-1] * slots
+        self.window_counts = [[0] * buckets for _ in range(slots)]
+        self.window_sums = [0.0] * slots
+        self.counts = [0] * buckets
+        self.sum = 0.0
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram over a rolling window
+
+    Every thread records into its own shard, so `observe` never takes a lock
+    and never races another writer. The window is a ring of `slots` sub-windows;
+    a slot is reset when its time comes around again. All-time cumulative
+    counts are kept as well for Prometheus.
+
+    With `unit="ms"` observations are seconds summarized in milliseconds; with
+    `unit=None` they are plain counts, summarized as they are.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window_seconds: float = 60, slots: int = 6, unit: str = "ms"):
+        self.buckets = tuple(buckets)
+        self.unit = unit
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self._slot_seconds = window_seconds / slots
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            # Only taken once per thread, never on the recording path
+            shard = _Shard(len(self.buckets) + 1, self.slots)
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def observe(self, seconds: float):
+        """Record one duration in seconds"""
+        shard = self._shard()
+        bucket = bisect_left(self.buckets, seconds)
+        epoch = int(time.monotonic() / self._slot_seconds)
+        slot = epoch % self.slots
+        if shard.epochs[slot] != epoch:
+            shard.window_counts[slot] = [0] * (len(self.buckets) + 1)
+            shard.window_sums[slot] = 0.0
+            shard.epochs[slot] = epoch
+        shard.window_counts[slot][bucket] += 1
+        shard.window_sums[slot] += seconds
+        shard.counts[bucket] += 1
+        shard.sum += seconds
+
+    @contextmanager
+    def time(self):
+        """Context manager recording the duration of its block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def _window(self):
+        """Bucket counts and sum over the rolling window, merged across shards"""
+        oldest = int(time.monotonic() / self._slot_seconds) - self.slots + 1
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in list(self._shards):
+            for slot in range(self.slots):
+                if shard.epochs[slot] >= oldest:
+                    for bucket, count in enumerate(shard.window_counts[slot]):
+                        counts[bucket] += count
+                    total += shard.window_sums[slot]
+        return counts, total
+
+    def _quantile(self, counts, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        rank = q * sum(counts)
+        seen = 0
+        for bucket, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if bucket == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[bucket - 1] if bucket else 0.0
+                upper = self.buckets[bucket]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def summary(self) -> dict:
+        """Count, mean and p50/p95/p99 (in milliseconds for durations) over the rolling window"""
+        counts, total = self._window()
+        count = sum(counts)
+        scale = 1000 if self.unit == "ms" else 1
+        suffix = f"_{self.unit}" if self.unit else ""
+        return {
+            "count": count,
+            f"mean{suffix}": round(total / count * scale, 3) if count else 0.0,
+            f"p50{suffix}": round(self._quantile(counts, 0.50) * scale, 3),
+            f"p95{suffix}": round(self._quantile(counts, 0.95) * scale, 3),
+            f"p99{suffix}": round(self._quantile(counts, 0.99) * scale, 3),
+            "window_seconds": self.window_seconds,
+        }
+
+    def cumulative(self):
+        """All-time bucket counts and sum, merged across shards"""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in list(self._shards):
+            for bucket, count in enumerate(shard.counts):
+                counts[bucket] += count
+            total += shard.sum
+        return counts, total
+
+
+class LatencyRegistry:
+    """Latency histograms grouped by metric family and label value"""
+
+    def __init__(self, window_seconds: float = 60, slots: int = 6):
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self._families = {family: {} for family in FAMILIES}
+
+    def histogram(self, family: str, label: str) -> LatencyHistogram:
+        """Get or create the histogram for a label within a family"""
+        histograms = self._families[family]
+        histogram = histograms.get(label)
+        if histogram is None:
+            if family in COUNT_FAMILIES:
+                histogram = LatencyHistogram(COUNT_BUCKETS, self.window_seconds, self.slots, unit=None)
+            else:
+                histogram = LatencyHistogram(window_seconds=self.window_seconds, slots=self.slots)
+            histogram = histograms.setdefault(label, histogram)
+        return histogram
+
+    def summaries(self, family: str) -> Dict[str, dict]:
+        """Rolling-window summaries for every label of a family"""
+        return {label: histogram.summary() for label, histogram in sorted(self._families[family].items())}
+
+    def render_prometheus(self, counters: Dict[str, tuple] = None) -> str:
+        """
+        Render all histograms in Prometheus text format
+        `counters` maps metric name -> (help text, type, value) for extra scalar metrics
+        """
+        lines = []
+        for name, (help_text, metric_type, value) in (counters or {}).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {value}")
+        for family, (name, label_name, help_text) in FAMILIES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for label, histogram in sorted(self._families[family].items()):
+                counts, total = histogram.cumulative()
+                cumulative = 0
+                bounds = [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label_name}="{label}"}} {total}')
+                lines.append(f'{name}_count{{{label_name}="{label}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+class LatencyMiddleware:
+    """
+    ASGI middleware timing every HTTP request into a LatencyRegistry
+
+    Requests are labelled by the matched route path (unmatched paths are folded
+    into "other"). A handler that sets `request.state.handler_finished` also gets
+    its serialization stage timed, up to the start of the response. Unlike
+    BaseHTTPMiddleware this passes `receive` through untouched, so streaming
+    endpoints can keep reading the request body while they respond.
+    """
+
+    def __init__(self, app, registry: LatencyRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state["started_at"] = started
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start" and "handler_finished" in state:
+                self.registry.histogram("stage", "serialization").observe(
+                    time.perf_counter() - state["handler_finished"]
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # The router records the matched endpoint in the shared scope
+            path = scope["path"] if "endpoint" in scope else "other"
+            self.registry.histogram("request", path).observe(time.perf_counter() - started)
@@ -0,0 +1,278 @@
+"""
+Near-duplicate index: MinHash signatures with LSH banding
+
+Lightly edited rewrites of a story share most of their word 3-grams, so their
+MinHash signatures agree in most positions. Signatures are split into bands;
+texts sharing any whole band are candidates, and a candidate whose estimated
+Jaccard similarity reaches the threshold lends its verdict to the new text.
+Shingles are lowercased words, so they do not see the exclamation marks and
+capitals the heuristic model scores; those are stored with every verdict and
+must match too.
+"""
+import hashlib
+import logging
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from metrics import LatencyRegistry
+from sharedfile import fcntl, file_lock, open_shared
+from sink import PREDICTIONS, SENTIMENTS
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SHINGLE_WORDS = 3
+
+MAGIC = b"FGNDUP02"
+# magic, capacity, permutations, bands, inserts so far, model version digest
+HEADER = struct.Struct("<8sIIIQ16s")
+SEQUENCE_OFFSET = 20
+VERSION_OFFSET = 28
+
+VERDICT = np.dtype([
+    ("prediction", "u1"), ("sentiment", "u1"), ("confidence", "<f4"),
+    ("exclamations", "u1"), ("uppercase", "u1"),
+])
+# Steps of the uppercase ratio that count as the same; 0.02 moves the
+# heuristic's caps score by at most 0.6 points
+UPPERCASE_BUCKETS = 50
+
+
+class Signature(NamedTuple):
+    """MinHash of a text's shingles plus the surface features they cannot see"""
+    minhash: np.ndarray
+    exclamations: int
+    uppercase: int
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """crc32 of every word 3-gram of a text (its words, if it is shorter)"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) > SHINGLE_WORDS:
+        tokens = [" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)]
+    return np.fromiter((zlib.crc32(token.encode("utf-8")) for token in set(tokens)), dtype=np.uint64)
+
+
+class NearDuplicateIndex:
+    """
+    Bounded MinHash/LSH index of recent texts and their verdicts
+
+    Holds up to `capacity` signatures; once full, the oldest entry is replaced.
+    With a path (and fcntl) the signatures and verdicts live in a memory-mapped
+    file that survives restarts and is shared by worker processes: inserts are
+    serialized by a file lock, and each process indexes entries added by the
+    others the next time it looks something up. A file written for another
+    layout or model version is reset. After a model swap, `set_model_version`
+    starts the index over; a process still on the old model neither reads nor
+    writes verdicts recorded for the new one.
+    """
+
+    def __init__(self, capacity: int = 20000, threshold: float = 0.8, num_perm: int = 128,
+                 bands: int = 16, model_version: str = "", path: str = None,
+                 registry: LatencyRegistry = None, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.capacity = capacity
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.path = path if fcntl is not None else None
+        self.registry = registry or LatencyRegistry()
+        self.lookups = 0
+        self.short_circuits = 0
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: (a * x + b) >> 32 over 64-bit wraparound
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+        self._version = hashlib.blake2b(model_version.encode("utf-8"), digest_size=16).digest()
+        self._buckets = [{} for _ in range(bands)]
+        self._slot_keys = {}
+        self._seen = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+        size = HEADER.size + capacity * (num_perm * 4 + VERDICT.itemsize)
+        if self.path is None:
+            if path is not None:
+                logger.warning("fcntl is unavailable, the near-duplicate index is kept in memory")
+            self._buffer = bytearray(size)
+            HEADER.pack_into(self._buffer, 0, MAGIC, capacity, num_perm, bands, 0, self._version)
+        else:
+            header = HEADER.pack(MAGIC, capacity, num_perm, bands, 0, self._version)
+            self._file, self._buffer = open_shared(self.path, size, header, self._reusable)
+        self._signatures = np.ndarray((capacity, num_perm), dtype=np.uint32, buffer=self._buffer, offset=HEADER.size)
+        self._verdicts = np.ndarray(
+            (capacity,), dtype=VERDICT, buffer=self._buffer, offset=HEADER.size + capacity * num_perm * 4
+        )
+        with self._lock:
+            self._refresh()
+        if self._seen:
+            logger.info(f"Near-duplicate index loaded {self.size} entries from {self.path}")
+
+    def _reusable(self, data: bytes) -> bool:
+        """Whether an existing file matches this layout and model version"""
+        magic, capacity, num_perm, bands, _, version = HEADER.unpack_from(data)
+        return (magic, capacity, num_perm, bands, version) == (MAGIC, self.capacity, self.num_perm, self.bands, self._version)
+
+    @property
+    def size(self) -> int:
+        return min(self._seen, self.capacity)
+
+    def _sequence(self) -> int:
+        return struct.unpack_from("<Q", self._buffer, SEQUENCE_OFFSET)[0]
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _index_slot(self, slot: int):
+        """(Re)index one slot from the shared signatures, dropping what it held before"""
+        for band, key in enumerate(self._slot_keys.get(slot, ())):
+            slots = self._buckets[band].get(key)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._buckets[band][key]
+        keys = self._band_keys(self._signatures[slot])
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, set()).add(slot)
+        self._slot_keys[slot] = keys
+
+    def _current(self) -> bool:
+        """Whether the stored verdicts belong to this process's model version"""
+        return bytes(self._buffer[VERSION_OFFSET:VERSION_OFFSET + 16]) == self._version
+
+    def _clear(self):
+        self._buckets = [{} for _ in range(self.bands)]
+        self._slot_keys = {}
+        self._seen = 0
+
+    def set_model_version(self, model_version: str):
+        """Forget every verdict when the model changes (once per shared file)"""
+        with self._lock, file_lock(self._file):
+            self._version = hashlib.blake2b(model_version.encode("utf-8"), digest_size=16).digest()
+            if not self._current():
+                HEADER.pack_into(self._buffer, 0, MAGIC, self.capacity, self.num_perm, self.bands, 0, self._version)
+            self._clear()
+            self._refresh()
+
+    def _refresh(self):
+        """Index entries inserted since the last look, by this or another process"""
+        sequence = self._sequence()
+        if sequence == self._seen:
+            return
+        if sequence < self._seen:
+            # Another process started the file over
+            self._clear()
+        start = max(self._seen, sequence - self.capacity)
+        for position in range(start, sequence):
+            self._index_slot(position % self.capacity)
+        self._seen = sequence
+
+    def signature(self, text: str) -> Optional[Signature]:
+        """Signature of a text, or None if it has no words"""
+        hashes = shingle_hashes(text)
+        if not len(hashes):
+            return None
+        # (num_perm, shingles) hash matrix; uint64 arithmetic wraps around by design
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        uppercase = sum(map(str.isupper, text)) / len(text)
+        return Signature(
+            permuted.min(axis=1).astype(np.uint32),
+            min(text.count("!"), 255),
+            min(int(uppercase * UPPERCASE_BUCKETS), UPPERCASE_BUCKETS),
+        )
+
+    def lookup(self, signature: Optional[Signature]) -> Optional[dict]:
+        """
+        Verdict of the most similar indexed text at or above the threshold
+        whose surface features are the same, if any
+        """
+        if signature is None:
+            return None
+        with self._lock:
+            if not self._current():
+                return None
+            self._refresh()
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature.minhash)):
+                candidates.update(self._buckets[band].get(key, ()))
+            verdicts = self._verdicts
+            candidates = [
+                slot for slot in candidates
+                if verdicts[slot]["exclamations"] == signature.exclamations
+                and verdicts[slot]["uppercase"] == signature.uppercase
+            ]
+            if not candidates:
+                return None
+            slots = np.array(candidates, dtype=np.int64)
+            similarity = (self._signatures[slots] == signature.minhash).mean(axis=1)
+            best = int(similarity.argmax())
+            if similarity[best] < self.threshold:
+                return None
+            verdict = self._verdicts[slots[best]]
+            return {
+                "prediction": PREDICTIONS[verdict["prediction"]],
+                "confidence": round(float(verdict["confidence"]), 1),
+                "sentiment": SENTIMENTS[verdict["sentiment"]],
+                "similarity": round(float(similarity[best]), 3),
+            }
+
+    def lookup_many(self, texts: List[str]):
+        """
+        Signatures and near-duplicate verdicts (or None) for a batch of texts
+        CPU-bound; the API runs it off the event loop
+        """
+        started = time.perf_counter()
+        signatures = [self.signature(text) for text in texts]
+        matches = [self.lookup(signature) for signature in signatures]
+        elapsed = time.perf_counter() - started
+        histogram = self.registry.histogram("stage", "near_duplicate_lookup")
+        for _ in texts:
+            histogram.observe(elapsed / max(len(texts), 1))
+        with self._lock:
+            self.lookups += len(texts)
+            self.short_circuits += sum(match is not None for match in matches)
+        return signatures, matches
+
+    def insert(self, signature: Optional[Signature], result: dict):
+        """Add a scored text's signature and verdict, replacing the oldest entry when full"""
+        if signature is None or not self.capacity:
+            return
+        with self._lock, file_lock(self._file):
+            if not self._current():
+                return
+            self._refresh()
+            slot = self._seen % self.capacity
+            self._signatures[slot] = signature.minhash
+            self._verdicts[slot] = (
+                PREDICTIONS.index(result["prediction"]),
+                SENTIMENTS.index(str(result["sentiment"])),
+                float(result["confidence"]),
+                signature.exclamations,
+                signature.uppercase,
+            )
+            # Publish the entry only after it is fully written
+            struct.pack_into("<Q", self._buffer, SEQUENCE_OFFSET, self._seen + 1)
+            self._refresh()
+
+    def stats(self) -> dict:
+        """Index size, lookup latency and short-circuit rate for the monitoring endpoints"""
+        return {
+            "size": self.size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "short_circuits": self.short_circuits,
+            "short_circuit_rate": round(self.short_circuits / self.lookups * 100, 2) if self.lookups else 0.0,
+            "lookup_latency": self.registry.histogram("stage", "near_duplicate_lookup").summary(),
+            "persistent": self.path is not None,
+        }
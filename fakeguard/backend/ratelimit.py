@@ -0,0 +1,267 @@
+"""
+Per-client rate limiting and priority-aware load shedding
+
+Clients are identified by their `X-API-Key` header when it holds a known key,
+and by IP address otherwise. They fall into three tiers: anonymous (by IP),
+keyed (a configured API key) and premium (keys listed as premium). Each client gets a token bucket
+sized for its tier; buckets live in an LRU-ordered dict, so an active client
+costs one small entry and idle clients are evicted from the front.
+
+Independently of the per-client limits, the load shedder watches how long
+scoring calls wait for a worker. When that queue delay stands above the
+target, anonymous requests are rejected first, keyed requests only once it
+reaches twice the target, and premium requests are never shed, so paying
+clients keep their latency while the overload is absorbed by cheap traffic.
+"""
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Tuple
+
+from starlette.responses import JSONResponse
+
+# Client tiers, from first to last shed
+ANONYMOUS, KEYED, PREMIUM = "anonymous", "keyed", "premium"
+TIERS = (ANONYMOUS, KEYED, PREMIUM)
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by client, `rate` tokens per second up to `burst`
+
+    A rate of 0 disables the limiter. Entries untouched for `idle_seconds` are
+    evicted, and the least recently seen client is dropped beyond `max_clients`;
+    an evicted client simply comes back with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, idle_seconds: float = 300.0,
+                 max_clients: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.idle_seconds = idle_seconds
+        self.max_clients = max_clients
+        self.clock = clock
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+        # key -> [tokens, last update], least recently seen first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take `cost` tokens from the client's bucket; returns (allowed, seconds until allowed)"""
+        if not self.enabled:
+            return True, 0.0
+        now = self.clock()
+        self._evict(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            self.allowed += 1
+            return True, 0.0
+        self.limited += 1
+        return False, (cost - bucket[0]) / self.rate
+
+    def remaining(self, key: str) -> int:
+        """Whole tokens left in a client's bucket, as of its last request"""
+        bucket = self._buckets.get(key)
+        return int(bucket[0]) if bucket is not None else int(self.burst)
+
+    def _evict(self, now: float):
+        """Drop idle clients; the dict is in last-seen order, so they are all at the front"""
+        buckets = self._buckets
+        while buckets:
+            _, last = next(iter(buckets.values()))
+            if now - last < self.idle_seconds:
+                break
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evicted": self.evicted,
+        }
+
+
+class LoadShedder:
+    """
+    Sheds low-priority requests while scoring calls queue for too long
+
+    Queue delays are reported through `observe`. As in CoDel, the standing
+    delay is the smallest delay seen over the last `interval_ms`: a burst that
+    drains quickly leaves some call through without waiting and does not count,
+    a queue that never drains does. An interval without any sample (because
+    everything was shed, or the service is idle) resets it to zero. A target
+    of 0 disables shedding.
+    """
+
+    def __init__(self, target_ms: float = 50.0, interval_ms: float = 100.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.target = target_ms / 1000
+        self.interval = interval_ms / 1000
+        self.clock = clock
+        self.delay = 0.0
+        self.shed = {tier: 0 for tier in TIERS}
+        self._interval_start = clock()
+        self._interval_min = math.inf
+
+    @property
+    def enabled(self) -> bool:
+        return self.target > 0
+
+    def _roll(self, now: float):
+        elapsed = now - self._interval_start
+        if elapsed < self.interval:
+            return
+        if elapsed >= 2 * self.interval or self._interval_min == math.inf:
+            # The last full interval saw no samples
+            self.delay = 0.0
+        else:
+            self.delay = self._interval_min
+        self._interval_start = now
+        self._interval_min = math.inf
+
+    def observe(self, seconds: float):
+        """Record how long a scoring call waited for a worker"""
+        self._roll(self.clock())
+        self._interval_min = min(self._interval_min, seconds)
+
+    def admit(self, tier: str) -> bool:
+        """Whether a request of `tier` may proceed at the current queue delay"""
+        if not self.enabled:
+            return True
+        self._roll(self.clock())
+        if self._admits(tier):
+            return True
+        self.shed[tier] += 1
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "target_ms": round(self.target * 1000, 3),
+            "queue_delay_ms": round(self.delay * 1000, 3),
+            "shedding": [tier for tier in TIERS if not self._admits(tier)],
+            "shed": dict(self.shed),
+        }
+
+    def _admits(self, tier: str) -> bool:
+        if not self.enabled or self.delay <= self.target or tier == PREMIUM:
+            return True
+        return tier == KEYED and self.delay <= 2 * self.target
+
+
+def client_identity(scope, api_keys: Iterable[str] = (), premium_keys: Iterable[str] = (),
+                    trust_forwarded: bool = False) -> Tuple[str, str]:
+    """
+    (tier, bucket key) of the client making an ASGI request
+    Only keys in `api_keys` or `premium_keys` earn a bucket of their own; with
+    any other key the client is limited by address, like anonymous clients,
+    so made-up keys cannot be used to get fresh buckets
+    """
+    api_key = None
+    forwarded = None
+    for name, value in scope["headers"]:
+        if name == b"x-api-key":
+            api_key = value.decode("latin-1").strip()
+        elif name == b"x-forwarded-for" and trust_forwarded:
+            forwarded = value.decode("latin-1").split(",")[0].strip()
+    if api_key:
+        if api_key in premium_keys:
+            return PREMIUM, f"key:{api_key}"
+        if api_key in api_keys:
+            return KEYED, f"key:{api_key}"
+    client = scope.get("client")
+    return ANONYMOUS, f"ip:{forwarded or (client[0] if client else 'unknown')}"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying per-client limits and load shedding to some paths
+
+    Requests are rejected before their body is read: 429 with Retry-After and
+    X-RateLimit-* headers when the client's bucket is empty, 503 with
+    Retry-After when their tier is being shed. Only paths starting with one of
+    `prefixes` are limited; health checks and monitoring are never throttled.
+    The key collections are consulted on every request, so keys added to them
+    later take effect without a restart.
+    """
+
+    def __init__(self, app, limiters: Dict[str, TokenBucketLimiter], shedder: LoadShedder,
+                 prefixes: Tuple[str, ...] = ("/api/predict",), api_keys: Iterable[str] = (),
+                 premium_keys: Iterable[str] = (), trust_forwarded: bool = False, retry_after: int = 1):
+        self.app = app
+        self.limiters = limiters
+        self.shedder = shedder
+        self.prefixes = tuple(prefixes)
+        self.api_keys = api_keys
+        self.premium_keys = premium_keys
+        self.trust_forwarded = trust_forwarded
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        tier, key = client_identity(scope, self.api_keys, self.premium_keys, self.trust_forwarded)
+        limiter = self.limiters[tier]
+        allowed, wait = limiter.acquire(key)
+        if not allowed:
+            retry_after = max(1, math.ceil(wait))
+            response = _reject(429, "Rate limit exceeded, please retry later", {
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(int(limiter.burst)),
+                "X-RateLimit-Remaining": "0",
+            })
+            await response(scope, receive, send)
+            return
+        if not self.shedder.admit(tier):
+            response = _reject(503, "Server is busy, please retry later", {"Retry-After": str(self.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        if not limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        remaining = str(limiter.remaining(key)).encode()
+        limit = str(int(limiter.burst)).encode()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-ratelimit-limit", limit),
+                    (b"x-ratelimit-remaining", remaining),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def _reject(status_code: int, detail: str, headers: dict) -> JSONResponse:
+    # Same body as the API's HTTPException handler
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": detail, "status_code": status_code, "timestamp": datetime.utcnow().isoformat()},
+        headers=headers
+    )
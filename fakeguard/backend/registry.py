@@ -0,0 +1,233 @@
+"""
+Model registry: hot reload of model artifacts and shadow scoring of candidates
+
+The registry watches a directory of TF-IDF artifacts (`.npz` files or
+directories holding `meta.json`) and loads the newest one on a background
+thread. Readers take `registry.active` once per call, so swapping versions
+is a single reference assignment and in-flight requests finish on the model
+they started with.
+
+With a shadow fraction, a new artifact becomes a candidate instead: that
+fraction of scored texts is also scored by the candidate off the request path,
+recording agreement and latency deltas until the candidate is promoted.
+"""
+import logging
+import random
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from backends import ModelBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+
+def find_artifacts(directory: Path) -> List[Path]:
+    """Model artifacts in a directory, oldest first; hidden and temporary names are skipped"""
+    artifacts = []
+    for path in directory.iterdir():
+        if path.name.startswith((".", "~")) or path.name.endswith(".tmp"):
+            continue
+        if path.suffix == ".npz" and path.is_file():
+            artifacts.append((path.stat().st_mtime_ns, path.name, path))
+        elif (path / "meta.json").is_file():
+            # meta.json is written last, so its mtime marks a complete artifact
+            artifacts.append(((path / "meta.json").stat().st_mtime_ns, path.name, path))
+    return [path for _, _, path in sorted(artifacts)]
+
+
+class ShadowStats:
+    """Agreement and latency deltas between the active model and a candidate"""
+
+    def __init__(self, candidate_version: str):
+        self.candidate_version = candidate_version
+        self.compared = 0
+        self.agreed = 0
+        self.skipped = 0
+        self.confidence_delta = 0.0
+        self.active_seconds = 0.0
+        self.candidate_seconds = 0.0
+
+    def record(self, active: List[dict], active_seconds: List[float], candidate: List[dict]):
+        for result, seconds, shadow in zip(active, active_seconds, candidate):
+            self.compared += 1
+            self.agreed += result["prediction"] == shadow["prediction"]
+            self.confidence_delta += float(shadow["confidence"]) - float(result["confidence"])
+            self.active_seconds += seconds
+            self.candidate_seconds += sum(shadow.get("timings", {}).values())
+
+    def summary(self) -> dict:
+        compared = max(self.compared, 1)
+        active_ms = self.active_seconds / compared * 1000
+        candidate_ms = self.candidate_seconds / compared * 1000
+        return {
+            "candidate_version": self.candidate_version,
+            "compared": self.compared,
+            "skipped": self.skipped,
+            "agreement_rate": round(self.agreed / self.compared * 100, 2) if self.compared else 0.0,
+            "mean_confidence_delta": round(self.confidence_delta / compared, 3),
+            "active_mean_ms": round(active_ms, 3),
+            "candidate_mean_ms": round(candidate_ms, 3),
+            "latency_delta_ms": round(candidate_ms - active_ms, 3),
+        }
+
+
+class ModelRegistry:
+    """
+    Holds the active model backend, and optionally a shadow candidate
+
+    Without a directory the registry just holds `default()`. With one, the
+    newest artifact is loaded at construction (falling back to `default()` if
+    there is none) and the directory is polled every `poll_seconds` once
+    `start` is called. New artifacts are promoted as soon as they are loaded
+    and warmed, or become the shadow candidate when `shadow_fraction` > 0.
+    Listeners are called with the new backend after every swap.
+    """
+
+    def __init__(self, directory: str = None, default: Callable[[], ModelBackend] = None,
+                 poll_seconds: float = 5.0, shadow_fraction: float = 0.0, lexicon_path: str = None):
+        self.directory = Path(directory) if directory else None
+        self.poll_seconds = poll_seconds
+        self.shadow_fraction = shadow_fraction
+        self.lexicon_path = lexicon_path
+        self.candidate: Optional[ModelBackend] = None
+        self.shadow: Optional[ShadowStats] = None
+        self.loads = 0
+        self.failures = 0
+        self.swaps = 0
+        self.last_error = None
+        self.last_swap = None
+        self._listeners = []
+        self._seen = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        newest = self._newest()
+        if newest is not None:
+            self._seen = newest
+            self.active = self._load(newest[0])
+        elif default is not None:
+            self.active = default()
+        else:
+            raise ValueError(f"No model artifacts found in {self.directory}")
+
+    def add_listener(self, callback: Callable[[ModelBackend], None]):
+        """Call `callback(backend)` whenever a new version becomes active"""
+        self._listeners.append(callback)
+
+    def _newest(self):
+        """(path, mtime) of the newest artifact, or None"""
+        if self.directory is None or not self.directory.is_dir():
+            return None
+        artifacts = find_artifacts(self.directory)
+        if not artifacts:
+            return None
+        path = artifacts[-1]
+        marker = path / "meta.json" if path.is_dir() else path
+        return path, marker.stat().st_mtime_ns
+
+    def _load(self, path: Path) -> ModelBackend:
+        backend = create_backend("tfidf", model_path=str(path), lexicon_path=self.lexicon_path)
+        backend.warmup()
+        self.loads += 1
+        logger.info(f"Model {backend.model_version} loaded from {path}")
+        return backend
+
+    def check(self) -> bool:
+        """Load the newest artifact if it changed since the last check; returns True if it did"""
+        try:
+            newest = self._newest()
+        except OSError as e:
+            logger.error(f"Cannot scan model directory {self.directory}: {e}")
+            return False
+        if newest is None or newest == self._seen:
+            return False
+        # Remember the attempt either way, so a broken artifact is retried only once it changes
+        self._seen = newest
+        try:
+            backend = self._load(newest[0])
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{newest[0].name}: {e}"
+            logger.error(f"Failed to load model artifact {newest[0]}: {e}")
+            return False
+        if self.shadow_fraction > 0:
+            with self._lock:
+                self.candidate = backend
+                self.shadow = ShadowStats(backend.model_version)
+            logger.info(f"Model {backend.model_version} is shadowing {self.active.model_version}")
+        else:
+            self._swap(backend)
+        return True
+
+    def _swap(self, backend: ModelBackend):
+        with self._lock:
+            previous, self.active = self.active, backend
+            self.swaps += 1
+            self.last_swap = datetime.utcnow()
+        logger.info(f"Model {backend.model_version} is now active (was {previous.model_version})")
+        for callback in self._listeners:
+            callback(backend)
+
+    def promote(self) -> ModelBackend:
+        """Make the shadow candidate the active model"""
+        with self._lock:
+            candidate, self.candidate = self.candidate, None
+        if candidate is None:
+            raise LookupError("There is no candidate model to promote")
+        self._swap(candidate)
+        return candidate
+
+    def sample(self, count: int) -> List[int]:
+        """Indices of `count` scored texts to shadow-score, empty without a candidate"""
+        if self.candidate is None:
+            return []
+        return [i for i in range(count) if random.random() < self.shadow_fraction]
+
+    def record_shadow(self, candidate: ModelBackend, active: List[dict], active_seconds: List[float],
+                      shadow: Optional[List[dict]]):
+        """Record one shadow comparison; `shadow` is None when the candidate call was shed"""
+        with self._lock:
+            if self.candidate is not candidate:
+                # Promoted or replaced meanwhile: the comparison no longer applies
+                return
+            if shadow is None:
+                self.shadow.skipped += len(active)
+            else:
+                self.shadow.record(active, active_seconds, shadow)
+
+    def start(self):
+        """Start polling the model directory"""
+        if self.directory is None or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread = self._thread
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.poll_seconds):
+            self.check()
+
+    def stats(self) -> dict:
+        """Registry state for the monitoring endpoints"""
+        return {
+            "directory": str(self.directory) if self.directory else None,
+            "active_version": self.active.model_version,
+            "candidate_version": self.candidate.model_version if self.candidate else None,
+            "loads": self.loads,
+            "failures": self.failures,
+            "swaps": self.swaps,
+            "last_swap": self.last_swap.isoformat() if self.last_swap else None,
+            "last_error": self.last_error,
+            "shadow_fraction": self.shadow_fraction,
+            "shadow": self.shadow.summary() if self.shadow else None,
+        }
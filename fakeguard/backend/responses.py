@@ -0,0 +1,108 @@
+"""
+Precompiled and cached response encoding
+
+A prediction response always has the same four string fields, and the
+prediction and sentiment labels come from small closed sets. The encoder
+renders the JSON around them once per (prediction, sentiment) pair, so
+encoding a response is a join of byte strings: no pydantic model, no second
+validation against the route's response_model and no generic JSON encoder.
+Timestamps are formatted at most once per second.
+
+Read-only endpoints go through a ResponseCache instead: their JSON is encoded
+once per key (such as the model version) or per time interval, and served as
+the same bytes, with an ETag, to every caller until then.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from starlette.responses import Response
+
+
+class UTCTimestamp:
+    """ISO 8601 UTC timestamp with second resolution, formatted once per second"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._second = None
+        self._value = b""
+
+    def __call__(self) -> bytes:
+        second = int(self.clock())
+        if second != self._second:
+            self._value = datetime.utcfromtimestamp(second).isoformat().encode()
+            self._second = second
+        return self._value
+
+
+class PredictionEncoder:
+    """Encodes `PredictionResponse` bodies straight to bytes"""
+
+    def __init__(self, timestamp: UTCTimestamp = None):
+        self.timestamp = timestamp or UTCTimestamp()
+        # (prediction, sentiment) -> JSON before and after the confidence value
+        self._fragments: Dict[Tuple[str, str], Tuple[bytes, bytes]] = {}
+
+    def _compile(self, prediction: str, sentiment: str) -> Tuple[bytes, bytes]:
+        head = '{"prediction":' + json.dumps(prediction) + ',"confidence":"'
+        middle = '","sentiment":' + json.dumps(sentiment) + ',"timestamp":"'
+        fragments = self._fragments[(prediction, sentiment)] = (head.encode(), middle.encode())
+        return fragments
+
+    def encode(self, prediction: str, confidence, sentiment: str) -> bytes:
+        fragments = self._fragments.get((prediction, sentiment)) or self._compile(prediction, sentiment)
+        # str() of a number never needs escaping inside a JSON string
+        return b"".join((fragments[0], str(confidence).encode(), fragments[1], self.timestamp(), b'"}'))
+
+    def response(self, prediction: str, confidence, sentiment: str) -> Response:
+        """A ready-to-send response; FastAPI passes Response objects through without validating them"""
+        return Response(self.encode(prediction, confidence, sentiment), media_type="application/json")
+
+
+class EncodedResponse:
+    """A JSON body encoded once, with an ETag derived from its bytes"""
+
+    def __init__(self, content: Any):
+        # Same encoding as Starlette's JSONResponse
+        self.body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=8).hexdigest() + '"'
+
+    def response(self, if_none_match: str = None, cache_control: str = "no-cache") -> Response:
+        """200 with the body, or 304 when the client already holds it"""
+        headers = {"ETag": self.etag, "Cache-Control": cache_control}
+        if if_none_match is not None and self.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    Encoded responses by name, rebuilt when their key changes or, with a
+    `max_age`, once they are older than that many seconds
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.hits = 0
+        self.builds = 0
+        # name -> (key, built at, response)
+        self._entries: Dict[str, Tuple[Hashable, float, EncodedResponse]] = {}
+
+    def get(self, name: str, build: Callable[[], Any], key: Hashable = None, max_age: float = None) -> EncodedResponse:
+        now = self.clock()
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key and (max_age is None or now - entry[1] < max_age):
+            self.hits += 1
+            return entry[2]
+        encoded = EncodedResponse(build())
+        self._entries[name] = (key, now, encoded)
+        self.builds += 1
+        return encoded
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds}
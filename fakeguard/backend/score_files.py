@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Offline batch scorer for CSV, JSONL and Parquet corpora
+
+Scores documents with a model backend (FakeNewsDetector by default) across a process pool without going
+through the HTTP API. Inputs are memory-mapped and split into chunks that the
+workers read directly, so corpora larger than RAM are fine. Results are written
+in the input's format, and progress is checkpointed so an interrupted run
+resumes where it stopped.
+
+Usage:
+    python score_files.py corpus/ --output-dir scored/ --workers 8
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from cache import normalize_text
+from backends import create_backend
+from detector import validate_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = pq = None
+
+logger = logging.getLogger("score_files")
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+RESULT_FIELDS = ["id", "prediction", "confidence", "sentiment", "error"]
+
+# Detector owned by each worker process, built once by the initializer
+_worker_detector = None
+
+
+def _init_worker(backend: str, options: dict):
+    global _worker_detector
+    _worker_detector = create_backend(backend, **options)
+
+
+def _score_records(records):
+    """Score (id, text) pairs with the worker's detector, one result dict per record"""
+    results = []
+    valid = []
+    for record_id, text in records:
+        result = {"id": record_id, "prediction": None, "confidence": None, "sentiment": None, "error": None}
+        try:
+            if not isinstance(text, str):
+                raise ValueError("Missing text")
+            valid.append((result, normalize_text(validate_text(text))))
+        except ValueError as e:
+            result["error"] = str(e)
+        results.append(result)
+
+    predictions = _worker_detector.predict_many([text for _, text in valid])
+    for (result, _), prediction in zip(valid, predictions):
+        result["prediction"] = prediction["prediction"]
+        result["confidence"] = str(prediction["confidence"])
+        result["sentiment"] = str(prediction["sentiment"])
+    return results
+
+
+def _score_text_chunk(path: str, fmt: str, start: int, end: int, options: dict):
+    """
+    Worker task: parse and score the records in bytes [start, end) of a CSV or
+    JSONL file, returning the encoded output for the chunk. Records without an
+    id are keyed by "<chunk offset>:<index>".
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end].decode("utf-8", errors="replace")
+
+    records = []
+    if fmt == "jsonl":
+        for index, line in enumerate(data.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = {}
+            if not isinstance(row, dict):
+                row = {}
+            records.append((row.get(options["id_column"], f"{start}:{index}"), row.get(options["text_column"])))
+    else:
+        reader = csv.DictReader(io.StringIO(data, newline=""), fieldnames=options["header"])
+        for index, row in enumerate(reader):
+            records.append((row.get(options["id_column"]) or f"{start}:{index}", row.get(options["text_column"])))
+
+    results = _score_records(records)
+    output = io.StringIO(newline="")
+    if fmt == "jsonl":
+        for result in results:
+            output.write(json.dumps(result, separators=(",", ":")) + "\n")
+    else:
+        csv.DictWriter(output, RESULT_FIELDS, lineterminator="\n").writerows(results)
+    errors = sum(1 for result in results if result["error"])
+    return end, output.getvalue().encode("utf-8"), len(results), errors
+
+
+def _score_parquet_group(path: str, group: int, part_path: str, options: dict):
+    """Worker task: score one Parquet row group and write it as its own part file"""
+    parquet = pq.ParquetFile(path, memory_map=True)
+    columns = [c for c in (options["id_column"], options["text_column"]) if c in parquet.schema_arrow.names]
+    rows = parquet.read_row_group(group, columns=columns).to_pylist()
+    first_row = sum(parquet.metadata.row_group(g).num_rows for g in range(group))
+    records = [
+        (str(row[options["id_column"]]) if row.get(options["id_column"]) is not None else str(first_row + i),
+         row.get(options["text_column"]))
+        for i, row in enumerate(rows)
+    ]
+    results = _score_records(records)
+    table = pa.Table.from_pylist(results, schema=pa.schema([(name, pa.string()) for name in RESULT_FIELDS]))
+    pq.write_table(table, part_path + ".tmp")
+    os.replace(part_path + ".tmp", part_path)
+    return len(results), sum(1 for result in results if result["error"])
+
+
+def _record_boundary(mm: mmap.mmap, position: int, start: int, fmt: str) -> int:
+    """
+    First record boundary (offset after a newline) at or after `position`.
+    For CSV a newline only ends a record outside quotes, i.e. after an even
+    number of quote characters since `start`, which is itself a boundary.
+    """
+    size = len(mm)
+    newline = mm.find(b"\n", position)
+    if fmt == "csv":
+        quotes = mm[start:newline if newline >= 0 else size].count(b'"')
+        while newline >= 0 and quotes % 2:
+            following = mm.find(b"\n", newline + 1)
+            quotes += mm[newline:following if following >= 0 else size].count(b'"')
+            newline = following
+    return size if newline < 0 else newline + 1
+
+
+class Checkpoint:
+    """Resumable progress for one input file, stored next to its output"""
+
+    def __init__(self, output_path: Path, input_path: Path):
+        self.path = output_path.with_name(output_path.name + ".checkpoint.json")
+        stat = input_path.stat()
+        self.state = {
+            "input": str(input_path),
+            "input_size": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns,
+            "input_offset": 0,
+            "output_size": 0,
+            "documents": 0,
+            "errors": 0,
+            "complete": False,
+        }
+        if self.path.exists():
+            saved = json.loads(self.path.read_text())
+            # A checkpoint only applies to the exact same input
+            if all(saved.get(key) == self.state[key] for key in ("input", "input_size", "input_mtime_ns")):
+                self.state = saved
+
+    def save(self, **updates):
+        self.state.update(updates)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps(self.state))
+        os.replace(temporary, self.path)
+
+
+class Progress:
+    """Throughput reporting in documents per second"""
+
+    def __init__(self, interval: float = 10.0):
+        self.started = time.perf_counter()
+        self.documents = 0
+        self.errors = 0
+        self.interval = interval
+        self._last_report = self.started
+
+    def add(self, documents: int, errors: int):
+        self.documents += documents
+        self.errors += errors
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            logger.info(f"Progress: {self.documents} docs, {self.rate():.1f} docs/sec")
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.documents / elapsed if elapsed > 0 else 0.0
+
+
+def score_text_file(pool, input_path: Path, output_path: Path, fmt: str, args, progress: Progress) -> dict:
+    """Score a CSV or JSONL file chunk by chunk, resuming from its checkpoint"""
+    checkpoint = Checkpoint(output_path, input_path)
+    if checkpoint.state["complete"] and not args.force:
+        logger.info(f"Skipping {input_path}: already scored")
+        return checkpoint.state
+    if args.force:
+        checkpoint.save(input_offset=0, output_size=0, documents=0, errors=0, complete=False)
+
+    options = {"id_column": args.id_column, "text_column": args.text_column, "header": None}
+    with open(input_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            checkpoint.save(complete=True)
+            return checkpoint.state
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with mm, open(output_path, "ab") as output:
+        start = checkpoint.state["input_offset"]
+        if fmt == "csv":
+            header_end = _record_boundary(mm, 0, 0, fmt)
+            options["header"] = next(csv.reader(io.StringIO(mm[:header_end].decode("utf-8-sig"))))
+            start = max(start, header_end)
+
+        # Drop any output written after the last checkpoint, then resume
+        output.truncate(checkpoint.state["output_size"])
+        if fmt == "csv" and checkpoint.state["output_size"] == 0:
+            output.write((",".join(RESULT_FIELDS) + "\n").encode("utf-8"))
+            output.flush()
+            checkpoint.save(input_offset=start, output_size=output.tell())
+        if start > 0:
+            logger.info(f"Resuming {input_path} at byte {start} of {len(mm)}")
+
+        # Keep a bounded window of chunks in flight and write results in order
+        pending = deque()
+        while start < len(mm) or pending:
+            while start < len(mm) and len(pending) < args.workers * 2:
+                end = _record_boundary(mm, min(start + args.chunk_bytes, len(mm)), start, fmt)
+                pending.append(pool.submit(_score_text_chunk, str(input_path), fmt, start, end, options))
+                start = end
+            end, data, documents, errors = pending.popleft().result()
+            output.write(data)
+            output.flush()
+            progress.add(documents, errors)
+            checkpoint.save(
+                input_offset=end,
+                output_size=output.tell(),
+                documents=checkpoint.state["documents"] + documents,
+                errors=checkpoint.state["errors"] + errors
+            )
+    checkpoint.save(complete=True)
+    return checkpoint.state
+
+
+def score_parquet_file(pool, input_path: Path, output_path: Path, args, progress: Progress) -> dict:
+    """Score a Parquet file into a directory of part files, one per row group"""
+    if pq is None:
+        raise SystemExit("Parquet input requires pyarrow: pip install pyarrow")
+    checkpoint = Checkpoint(output_path, input_path)
+    if checkpoint.state["complete"] and not args.force:
+        logger.info(f"Skipping {input_path}: already scored")
+        return checkpoint.state
+    if args.force:
+        checkpoint.save(documents=0, errors=0, complete=False)
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    options = {"id_column": args.id_column, "text_column": args.text_column}
+    groups = pq.ParquetFile(input_path, memory_map=True).num_row_groups
+    # Finished part files are the checkpoint: only missing row groups are scored
+    futures = []
+    for group in range(groups):
+        part_path = output_path / f"part-{group:05d}.parquet"
+        if args.force or not part_path.exists():
+            futures.append(pool.submit(_score_parquet_group, str(input_path), group, str(part_path), options))
+    for future in futures:
+        documents, errors = future.result()
+        progress.add(documents, errors)
+        checkpoint.save(
+            documents=checkpoint.state["documents"] + documents,
+            errors=checkpoint.state["errors"] + errors
+        )
+    checkpoint.save(complete=True)
+    return checkpoint.state
+
+
+def find_inputs(paths):
+    """Expand files and directories into (path, format) pairs"""
+    for path in map(Path, paths):
+        candidates = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for candidate in candidates:
+            fmt = FORMATS.get(candidate.suffix.lower())
+            if fmt:
+                yield candidate, fmt
+            elif not path.is_dir():
+                raise SystemExit(f"Unsupported input format: {candidate}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score CSV, JSONL or Parquet files with the FakeGuard detector")
+    parser.add_argument("inputs", nargs="+", help="Input files or directories")
+    parser.add_argument("--output-dir", required=True, help="Directory for scored outputs and checkpoints")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument("--chunk-bytes", type=int, default=4 * 1024 * 1024, help="Input bytes per CSV/JSONL task")
+    parser.add_argument("--text-column", default="text", help="Column or field holding the article text")
+    parser.add_argument("--id-column", default="id", help="Column or field holding the document id")
+    parser.add_argument("--lexicon-path", default=None, help="Lexicon file for the detector")
+    parser.add_argument("--backend", choices=("heuristic", "tfidf"), default="heuristic", help="Model backend")
+    parser.add_argument("--model-path", default=None, help="Model artifact for the tfidf backend")
+    parser.add_argument("--force", action="store_true", help="Ignore checkpoints and rescore everything")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    args = parse_args(argv)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    options = {"lexicon_path": args.lexicon_path}
+    if args.backend == "tfidf":
+        if not args.model_path:
+            raise SystemExit("--model-path is required for the tfidf backend")
+        options["model_path"] = args.model_path
+
+    progress = Progress()
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.backend, options)) as pool:
+        for input_path, fmt in find_inputs(args.inputs):
+            output_path = output_dir / f"{input_path.stem}.scored{input_path.suffix}"
+            logger.info(f"Scoring {input_path} -> {output_path}")
+            if fmt == "parquet":
+                state = score_parquet_file(pool, input_path, output_path, args, progress)
+            else:
+                state = score_text_file(pool, input_path, output_path, fmt, args, progress)
+            logger.info(f"Finished {input_path}: {state['documents']} docs, {state['errors']} errors")
+
+    elapsed = time.perf_counter() - progress.started
+    logger.info(
+        f"Scored {progress.documents} docs ({progress.errors} errors) in {elapsed:.1f}s "
+        f"- {progress.rate():.1f} docs/sec"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
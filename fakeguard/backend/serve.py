@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Pre-fork launcher for the FakeGuard API
+
+`uvicorn --workers N` spawns fresh interpreters that each import the app and
+load the model again. This launcher imports the app once, warms the model in
+the parent, binds the listening socket and then forks the workers, so they
+start serving immediately and share the parent's model pages copy-on-write.
+The parent supervises: workers that die are replaced, and SIGTERM/SIGINT stop
+them all gracefully.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+
+logger = logging.getLogger("serve")
+
+# Workers dying faster than this are not restarted in a tight loop
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the FakeGuard API with pre-forked workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"), help="Interface to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Port to bind")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--log-level", default="info", help="uvicorn log level")
+    return parser.parse_args(argv)
+
+
+def _serve_worker(config, sockets):
+    """Child process body: run one uvicorn server on the inherited socket"""
+    import uvicorn
+
+    # The parent's handlers must not run in the child; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def _spawn(config, sockets) -> int:
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            _serve_worker(config, sockets)
+        except BaseException:
+            logger.exception("Worker crashed")
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    import uvicorn
+
+    # Import and warm everything the workers need before forking
+    started = time.perf_counter()
+    import main as api
+
+    api.warm_up_model()
+    config = uvicorn.Config(api.app, host=args.host, port=args.port, log_level=args.log_level)
+    sockets = [config.bind_socket()]
+    # Keep the garbage collector from touching (and so copying) inherited objects
+    gc.collect()
+    gc.freeze()
+    logger.info(f"App imported and model warmed in {time.perf_counter() - started:.2f}s, "
+                f"forking {args.workers} worker(s) on {args.host}:{args.port}")
+
+    workers = {_spawn(config, sockets) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    last_restart = 0.0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it")
+        time.sleep(max(0.0, last_restart + RESTART_BACKOFF_SECONDS - time.monotonic()))
+        last_restart = time.monotonic()
+        workers.add(_spawn(config, sockets))
+    for sock in sockets:
+        sock.close()
+    logger.info("All workers stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Memory-mapped files shared by all uvicorn worker processes
+
+Setup and other cross-process critical sections run under a POSIX record
+lock on the file. A file with another layout (or contents its owner can no
+longer use) is reset to a fresh header followed by zeros.
+"""
+import mmap
+from contextlib import contextmanager
+from typing import IO, Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: callers keep their data in process memory
+    fcntl = None
+
+
+@contextmanager
+def file_lock(f: Optional[IO[bytes]]):
+    """Exclusive lock on a shared file; does nothing without a file"""
+    if f is None:
+        yield
+        return
+    # POSIX record locks belong to the process, so workers forked after the
+    # file was opened still exclude each other (flock locks would be shared)
+    fcntl.lockf(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.lockf(f.fileno(), fcntl.LOCK_UN)
+
+
+def prepare_file(f: IO[bytes], size: int, header: bytes, reusable: Callable[[bytes], bool]):
+    """
+    Reset the file to `header` followed by zeros, `size` bytes in all, unless
+    it already has that size and `reusable` accepts its contents; call under
+    file_lock
+    """
+    f.seek(0)
+    data = f.read(size)
+    if len(data) == size and reusable(data):
+        return
+    f.truncate(0)
+    f.write(header)
+    f.write(bytes(size - len(header)))
+    f.flush()
+
+
+def open_shared(path: str, size: int, header: bytes, reusable: Callable[[bytes], bool]) -> Tuple[IO[bytes], mmap.mmap]:
+    """Open (and if needed reset) a shared file; returns the file and a map of its `size` bytes"""
+    f = open(path, "a+b")
+    with file_lock(f):
+        prepare_file(f, size, header, reusable)
+    return f, mmap.mmap(f.fileno(), size)
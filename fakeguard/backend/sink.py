@@ -0,0 +1,121 @@
+"""
+Buffered background sinks for served predictions
+
+Request handlers only append a tuple to a bounded in-memory buffer; a writer
+thread drains everything buffered and hands it to the sink in one batch. The
+audit log and the prediction store are both built on this.
+"""
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Verdict and sentiment labels, in the order their codes are stored
+PREDICTIONS = ("REAL", "FAKE")
+SENTIMENTS = ("negative", "neutral", "positive")
+
+
+class BufferedSink(ABC):
+    """
+    Non-blocking prediction sink
+
+    `record` never waits: when `capacity` records are already buffered the
+    record is dropped and counted instead. The writer thread starts on the
+    first record and flushes every `flush_seconds`, or sooner once the buffer
+    is half full. Subclasses open their destination in `_open`, write a batch
+    in `_write` and release it in `_close`. A batch whose write raises is
+    logged and counted as failed, and the writer keeps going; errors of
+    `write_errors` types are expected and logged without a traceback.
+    """
+
+    name = "Prediction sink"
+    write_errors = (OSError,)
+
+    def __init__(self, capacity: int = 65536, flush_seconds: float = 1.0):
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._buffer = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def enabled(self) -> bool:
+        pass
+
+    def _append(self, record: tuple):
+        """Buffer one record; drops it (and counts the drop) if the buffer is full"""
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self.start()
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self._buffer.append(record)
+        if len(self._buffer) >= self.capacity // 2:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the writer thread"""
+        with self._start_lock:
+            if self._thread is None and self.enabled:
+                self._open()
+                self._stopping = False
+                name = self.name.lower().replace(" ", "-")
+                self._thread = threading.Thread(target=self._run, name=f"{name}-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Write everything buffered and stop the writer thread"""
+        thread = self._thread
+        if thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except self.write_errors as e:
+                logger.error(f"{self.name} write failed: {e}")
+            except Exception:
+                # Anything else must not end the thread, or every later record is dropped
+                logger.exception(f"{self.name} write failed")
+            if self._stopping:
+                break
+        self._close()
+
+    def flush(self):
+        """Write out everything currently buffered (called by the writer thread)"""
+        count = len(self._buffer)
+        if not count:
+            return
+        try:
+            self._write([self._buffer.popleft() for _ in range(count)])
+        except Exception:
+            self.failed += count
+            raise
+        self.written += count
+
+    def _open(self):
+        pass
+
+    @abstractmethod
+    def _write(self, records: List[tuple]):
+        pass
+
+    def _close(self):
+        pass
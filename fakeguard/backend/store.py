@@ -0,0 +1,198 @@
+"""
+Persistent prediction store: SQLite in WAL mode, written in batches
+
+Built on sink.BufferedSink: the writer thread inserts everything buffered
+in one transaction, which also adds the batch to per-minute, per-hour and
+per-day rollups (counts per verdict), so time-range aggregates read a few
+rollup rows instead of scanning predictions. Each worker process writes through its own
+connection; WAL lets them share one file while readers keep going.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List
+
+from sink import PREDICTIONS, BufferedSink
+
+# Rollup bucket sizes in seconds; aggregate buckets must be a multiple of one
+ROLLUP_SECONDS = (60, 3600, 86400)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    endpoint TEXT NOT NULL,
+    prediction TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    sentiment TEXT NOT NULL,
+    text_length INTEGER NOT NULL,
+    text_hash BLOB NOT NULL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS predictions_prediction_ts ON predictions (prediction, ts);
+CREATE INDEX IF NOT EXISTS predictions_text_hash ON predictions (text_hash);
+CREATE TABLE IF NOT EXISTS rollups (
+    bucket_seconds INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    prediction TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (bucket_seconds, bucket, prediction)
+) WITHOUT ROWID;
+"""
+
+INSERT_PREDICTION = """
+INSERT INTO predictions (ts, endpoint, prediction, confidence, sentiment, text_length, text_hash, model_version)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+ADD_TO_ROLLUP = """
+INSERT INTO rollups (bucket_seconds, bucket, prediction, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (bucket_seconds, bucket, prediction) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def text_hash(text: str) -> str:
+    """Hex digest under which a normalized text is stored: the first 16 bytes of its SHA-256"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:32]
+
+
+class PredictionStore(BufferedSink):
+    """
+    Non-blocking, persistent prediction history; without a path the store
+    is disabled
+    """
+
+    name = "Prediction store"
+    write_errors = (sqlite3.Error,)
+
+    def __init__(self, path: str = None, capacity: int = 65536, flush_seconds: float = 1.0,
+                 busy_timeout: float = 5.0, max_buckets: int = 1000, clock: Callable[[], float] = time.time):
+        super().__init__(capacity, flush_seconds)
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.busy_timeout = busy_timeout
+        self.max_buckets = max_buckets
+        self._connection = None
+        # Query connections, one per thread that runs queries
+        self._readers = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, endpoint: str, prediction: str, confidence: float, sentiment: str, text: str,
+               model_version: str = None):
+        """Buffer one prediction; drops it (and counts the drop) if the buffer is full"""
+        # The text is hashed by the writer, off the request path
+        self._append((self.clock(), endpoint, prediction, float(confidence), str(sentiment), text, model_version))
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=self.busy_timeout, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        # In WAL mode a crash can lose the last commits but never corrupts the file
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _open(self):
+        self._connection = self._connect()
+
+    def _close(self):
+        self._connection.close()
+        self._connection = None
+
+    def _write(self, records):
+        """Insert a batch and add it to the rollups in one transaction"""
+        rows = [
+            (ts, endpoint, prediction, confidence, sentiment, len(text), bytes.fromhex(text_hash(text)), model_version)
+            for ts, endpoint, prediction, confidence, sentiment, text, model_version in records
+        ]
+        rollups = Counter(
+            (seconds, int(row[0] // seconds) * seconds, row[2]) for row in rows for seconds in ROLLUP_SECONDS
+        )
+        with self._connection:
+            self._connection.executemany(INSERT_PREDICTION, rows)
+            self._connection.executemany(ADD_TO_ROLLUP, [key + (n,) for key, n in rollups.items()])
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._readers.connection = self._connect()
+        return connection
+
+    def aggregate(self, start: float, end: float, bucket_seconds: int) -> List[dict]:
+        """
+        Prediction counts per verdict for every `bucket_seconds` bucket that
+        overlaps [start, end), oldest first, read from the coarsest rollup
+        that fits; buckets are aligned to the Unix epoch (UTC)
+        """
+        if self.path is None:
+            raise ValueError("The prediction store is disabled")
+        sizes = [size for size in ROLLUP_SECONDS if bucket_seconds % size == 0]
+        if bucket_seconds <= 0 or not sizes:
+            raise ValueError(f"Bucket must be a positive multiple of {ROLLUP_SECONDS[0]} seconds")
+        if end <= start:
+            raise ValueError("End must be after start")
+        first = int(start // bucket_seconds) * bucket_seconds
+        if (end - first) / bucket_seconds > self.max_buckets:
+            raise ValueError(f"Range must not span more than {self.max_buckets} buckets")
+
+        counts = {
+            bucket: dict.fromkeys(PREDICTIONS, 0) for bucket in range(first, int(end), bucket_seconds)
+        }
+        rows = self._reader().execute(
+            "SELECT bucket - bucket % ?, prediction, SUM(count) FROM rollups"
+            " WHERE bucket_seconds = ? AND bucket >= ? AND bucket < ? GROUP BY 1, 2",
+            (bucket_seconds, max(sizes), first, end),
+        )
+        for bucket, prediction, count in rows:
+            counts.setdefault(bucket, dict.fromkeys(PREDICTIONS, 0))[prediction] = count
+        return [{"start": bucket, "counts": counts[bucket]} for bucket in sorted(counts)]
+
+    def recent(self, start: float = None, end: float = None, prediction: str = None,
+               text_hash: str = None, limit: int = 100) -> List[dict]:
+        """Stored predictions in [start, end), newest first, optionally for one verdict or text hash"""
+        if self.path is None:
+            raise ValueError("The prediction store is disabled")
+        conditions, parameters = [], []
+        if start is not None:
+            conditions.append("ts >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("ts < ?")
+            parameters.append(end)
+        if prediction is not None:
+            conditions.append("prediction = ?")
+            parameters.append(prediction)
+        if text_hash is not None:
+            conditions.append("text_hash = ?")
+            parameters.append(bytes.fromhex(text_hash))
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        rows = self._reader().execute(
+            "SELECT ts, endpoint, prediction, confidence, sentiment, text_length, text_hash, model_version"
+            f" FROM predictions{where} ORDER BY ts DESC LIMIT ?",
+            parameters + [limit],
+        )
+        return [
+            {
+                "ts": ts, "endpoint": endpoint, "prediction": prediction, "confidence": confidence,
+                "sentiment": sentiment, "text_length": text_length, "text_hash": digest.hex(),
+                "model_version": model_version,
+            }
+            for ts, endpoint, prediction, confidence, sentiment, text_length, digest, model_version in rows
+        ]
+
+    def stats(self) -> dict:
+        """Store counters for the monitoring endpoints"""
+        return {
+            "enabled": self.enabled,
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
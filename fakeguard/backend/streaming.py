@@ -0,0 +1,77 @@
+"""
+NDJSON helpers for the streaming bulk-scoring endpoint
+"""
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response that lets its body generator keep reading the request
+
+    StreamingResponse normally listens for client disconnects by consuming
+    `receive()` while it streams, which would swallow the request body chunks
+    the generator is still reading. Here the generator is the only consumer
+    and sees disconnects itself through `request.stream()`.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a chunked byte stream into (line number, line) pairs without holding
+    more than one line in memory. Lines longer than `max_line_bytes` are yielded
+    as None so the caller can report them, and the rest of them is discarded.
+    """
+    buffer = bytearray()
+    line_no = 0
+    overflow = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not overflow:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        overflow = True
+                        buffer.clear()
+                break
+            line_no += 1
+            if overflow or len(buffer) + end - start > max_line_bytes:
+                yield line_no, None
+            else:
+                buffer += chunk[start:end]
+                yield line_no, bytes(buffer)
+            buffer.clear()
+            overflow = False
+            start = end + 1
+    if buffer or overflow:
+        yield line_no + 1, None if overflow else bytes(buffer)
+
+
+def parse_record(line: bytes) -> Tuple[object, str]:
+    """Parse one {"id", "text"} record, raising ValueError if it is malformed"""
+    try:
+        record = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a JSON object")
+    text = record.get("text")
+    if not isinstance(text, str):
+        raise ValueError("Record must have a string 'text' field")
+    return record.get("id"), text
+
+
+def encode_line(record: dict) -> bytes:
+    """Encode one result record as an NDJSON line"""
+    return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
@@ -1,10 +1,22 @@
+import json
+import time
+
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
-from main import app
+from main import app, detector, API_KEYS, prediction_cache, response_cache, scoring_executor, rate_limiters, load_shedder, BATCH_MAX_SIZE
+from ratelimit import ANONYMOUS, KEYED, TokenBucketLimiter
+from detector import FEATURE_RECORD
 
 client = TestClient(app)
 
 
+def fresh_stats() -> dict:
+    """/api/stats recomputed now rather than served from the shared response cache"""
+    response_cache.clear()
+    return client.get("/api/stats").json()
+
+
 class TestHealthEndpoint:
     """Test health check endpoint"""
 
@@ -29,6 +41,27 @@ class TestHealthEndpoint:
         assert data["status"] == "healthy"
 
 
+class TestReadinessEndpoint:
+    """Test the readiness probe"""
+
+    def test_not_ready_before_startup(self):
+        """Test that readiness is 503 until the startup warmup has run"""
+        response = client.get("/api/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+        # Liveness is unaffected
+        assert client.get("/api/health").status_code == 200
+
+    def test_ready_after_startup(self):
+        """Test that readiness goes green once the model is warm, and not after shutdown"""
+        with TestClient(app) as started:
+            response = started.get("/api/ready")
+            assert response.status_code == 200
+            assert response.json()["status"] == "ready"
+            assert response.json()["model_version"] == detector.model_version
+        assert client.get("/api/ready").status_code == 503
+
+
 class TestPredictionEndpoint:
     """Test prediction endpoint"""
 
@@ -52,6 +85,36 @@ class TestPredictionEndpoint:
         assert "sentiment" in data
         assert "timestamp" in data
 
+    def test_fast_response_matches_model_response(self, monkeypatch):
+        """Test that the precompiled encoder and the PredictionResponse path return the same fields"""
+        import main
+
+        payload = {"text": "This is a legitimate news article with factual information."}
+        fast = client.post("/api/predict", json=payload)
+        monkeypatch.setattr(main, "FAST_RESPONSES", False)
+        slow = client.post("/api/predict", json=payload)
+        assert fast.headers["content-type"] == slow.headers["content-type"] == "application/json"
+        fast, slow = fast.json(), slow.json()
+        assert fast.pop("timestamp")[:19] <= slow.pop("timestamp")[:19]
+        assert fast == slow
+
+    def test_predict_explain(self):
+        """Test that explain mode adds phrase offsets and score contributions to the same verdict"""
+        text = "BREAKING!!! Shocking secret cover-up, according to officials"
+        plain = client.post("/api/predict", json={"text": text}).json()
+        explained = client.post("/api/predict", json={"text": text, "explain": True}).json()
+        assert "explanation" not in plain
+        explanation = explained.pop("explanation")
+        assert explained.pop("timestamp")[:19] >= plain.pop("timestamp")[:19]
+        assert explained == plain
+        for match in explanation["matches"]:
+            assert text[match["start"]:match["end"]].lower() == match["phrase"]
+        assert {"shocking", "according to"} <= {match["phrase"] for match in explanation["matches"]}
+        contributions = {c["feature"]: c for c in explanation["contributions"]}
+        assert contributions["fake_indicators"]["score"] == contributions["fake_indicators"]["value"] * 15
+        assert contributions["exclamation_count"] == {"feature": "exclamation_count", "value": 3, "score": 30, "favours": "FAKE"}
+        assert contributions["real_indicators"]["favours"] == "REAL"
+
     def test_predict_with_text_too_short(self):
         """Test prediction with text shorter than minimum"""
         response = client.post(
@@ -113,6 +176,427 @@ class TestPredictionEndpoint:
         )
         assert response.status_code == 422
 
+    def test_predict_rejects_non_http_url(self):
+        """Test that a URL that cannot be fetched over http(s) is rejected"""
+        response = client.post(
+            "/api/predict",
+            json={"url": "ftp://example.com/article"}
+        )
+        assert response.status_code == 422
+
+
+class TestBatchPredictionEndpoint:
+    """Test batch prediction endpoint"""
+
+    def test_batch_predict_returns_result_per_text(self):
+        """Test that every text in the batch gets a result"""
+        response = client.post(
+            "/api/predict/batch",
+            json={"texts": [
+                "This is a legitimate news article with factual information.",
+                "Breaking news about shocking developments in technology!"
+            ]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert data["succeeded"] == 2
+        assert [item["index"] for item in data["results"]] == [0, 1]
+        for item in data["results"]:
+            assert item["prediction"] in ["REAL", "FAKE"]
+            assert item["sentiment"] in ["positive", "negative", "neutral"]
+            assert 0 <= float(item["confidence"]) <= 100
+
+    def test_batch_predict_reports_invalid_items(self):
+        """Test that one invalid text does not fail the batch"""
+        response = client.post(
+            "/api/predict/batch",
+            json={"texts": ["Short text", "This is a legitimate news article with factual information."]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["failed"] == 1
+        assert data["results"][0]["error"] is not None
+        assert data["results"][0]["prediction"] is None
+        assert data["results"][1]["prediction"] in ["REAL", "FAKE"]
+
+    def test_batch_predict_reports_non_string_items(self):
+        """Test that null and non-string items fail alone, like invalid texts"""
+        response = client.post(
+            "/api/predict/batch",
+            json={"texts": ["This is a legitimate news article with factual information.", None, 42, "short"]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["total"], data["succeeded"], data["failed"]) == (4, 1, 3)
+        assert data["results"][0]["prediction"] in ["REAL", "FAKE"]
+        assert data["results"][1]["error"] == data["results"][2]["error"] == "Text must be a string"
+        assert data["results"][3]["error"]
+
+    def test_batch_predict_rejects_empty_batch(self):
+        """Test that an empty batch is a validation error"""
+        response = client.post("/api/predict/batch", json={"texts": []})
+        assert response.status_code == 422
+
+    def test_batch_predict_rejects_oversized_batch(self):
+        """Test that batches above the configured maximum are rejected"""
+        texts = ["This is a legitimate news article with factual information."] * (BATCH_MAX_SIZE + 1)
+        response = client.post("/api/predict/batch", json={"texts": texts})
+        assert response.status_code == 422
+
+    def test_batch_features_match_single_features(self):
+        """Test that vectorized features agree with the per-text extractor"""
+        texts = [
+            "BREAKING!!! You won't believe this   secret cover-up?",
+            "According to the official report, the data shows growth.",
+            "Ünïcode ÀRTICLE with\ttabs\u00a0and non-breaking spaces!",
+            "",
+        ]
+        batch = detector._extract_features_batch(texts)
+        assert batch.dtype == FEATURE_RECORD
+        for i, text in enumerate(texts):
+            single = detector._extract_features(text)
+            assert single.dtype == FEATURE_RECORD
+            for name in FEATURE_RECORD.names:
+                assert batch[name][i] == pytest.approx(single[name]), name
+
+    def test_explanations_agree_with_predictions(self):
+        """Test that explaining a batch leaves its predictions unchanged"""
+        texts = ["Shocking!!! You won't believe this", "According to the official report, growth was steady"]
+        explained = detector.predict_many(texts, explain=True)
+        for plain, result in zip(detector.predict_many(texts), explained):
+            assert result.pop("explanation")["matches"]
+            assert result["prediction"] == plain["prediction"] and result["confidence"] == plain["confidence"]
+        assert detector.predict(texts[0], explain=True)["explanation"] == detector.predict_many(texts, explain=True)[0]["explanation"]
+
+    def test_features_match_reference_extractor(self):
+        """Test that the single-pass extractor agrees with plain str methods"""
+        for text in ["BREAKING!!! You won't   believe this?", " Ünïcode\tÀRTICLE.\u00a0Done! ", "", "   "]:
+            words = text.split()
+            features = detector._extract_features(text)
+            assert features['word_count'] == len(words)
+            assert features['avg_word_length'] == pytest.approx(np.mean([len(w) for w in words]) if words else 0)
+            assert features['sentence_count'] == text.count('.') + text.count('!') + text.count('?')
+            assert features['uppercase_ratio'] == pytest.approx(sum(c.isupper() for c in text) / len(text) if text else 0)
+            assert features['punctuation_count'] == text.count('!') + text.count('?')
+            assert features['exclamation_count'] == text.count('!')
+
+
+class TestStreamingPredictionEndpoint:
+    """Test NDJSON streaming bulk scoring"""
+
+    def test_stream_scores_every_record_in_order(self):
+        """Test that each input line produces a result line, plus a summary"""
+        lines = [
+            json.dumps({"id": f"doc-{i}", "text": f"Stream record {i}: the official report shows growth."})
+            for i in range(150)
+        ]
+        lines.insert(2, "not json")
+        lines.insert(4, json.dumps({"id": "short", "text": "Short text"}))
+        body = ("\n".join(lines) + "\n").encode()
+        response = client.post(
+            "/api/predict/stream",
+            content=(body[i:i + 500] for i in range(0, len(body), 500)),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert len(results) == 153
+        assert [result["line"] for result in results[:-1]] == list(range(1, 153))
+        assert "error" in results[2]
+        assert results[4]["id"] == "short" and "error" in results[4]
+        assert results[0]["id"] == "doc-0"
+        assert results[0]["prediction"] in ["REAL", "FAKE"]
+        assert results[-1] == {"done": True, "total": 152, "succeeded": 150, "failed": 2}
+
+    def test_stream_skips_blank_lines(self):
+        """Test that empty lines are ignored"""
+        body = "\n\n" + json.dumps({"id": 1, "text": "A single streamed article about research data."}) + "\n\n"
+        response = client.post("/api/predict/stream", content=body.encode())
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert results[-1]["total"] == 1
+        assert results[0]["id"] == 1
+
+
+class TestLongDocumentEndpoint:
+    """Test sliding-window scoring of long documents"""
+
+    LONG_TEXT = (
+        "The official report, according to the ministry, shows the data on growth. "
+        "SHOCKING!!! You won't believe this secret miracle cure! "
+    ) * 120
+
+    def test_long_document_returns_verdict_and_windows(self):
+        """Test that a text over 5000 characters is scored window by window"""
+        response = client.post("/api/predict/long", json={"text": self.LONG_TEXT})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["prediction"] in ["REAL", "FAKE"]
+        assert 50 <= float(data["confidence"]) <= 99
+        assert data["window_count"] == len(data["windows"]) > 1
+        assert data["windows"][0]["start"] == 0
+        assert data["windows"][-1]["end"] == len(self.LONG_TEXT.strip())
+        for window in data["windows"]:
+            assert window["end"] - window["start"] <= data["window_chars"]
+        # Windows overlap by half
+        assert data["windows"][1]["start"] < data["windows"][0]["end"]
+
+    def test_long_document_limits(self):
+        """Test that the long-document text and window size are validated"""
+        assert client.post("/api/predict/long", json={"text": "Too short"}).status_code == 422
+        response = client.post("/api/predict/long", json={"text": self.LONG_TEXT, "window_chars": 50})
+        assert response.status_code == 422
+
+    def test_combined_counts_match_full_text(self):
+        """Test that features combined from windows equal a scan of the whole text"""
+        result = detector.predict_long(self.LONG_TEXT, window_chars=600)
+        features = result["features"]
+        expected = detector._extract_features(self.LONG_TEXT)
+        for name in FEATURE_RECORD.names:
+            assert features[name] == pytest.approx(expected[name]), name
+        for name, value in detector.matcher.count(self.LONG_TEXT.lower()).items():
+            assert features[name] == value, name
+
+    def test_phrase_across_window_cut_is_found(self):
+        """Test that a phrase split by a segment cut still counts"""
+        text = "x " * 48 + "you won't believe this" + " y" * 200
+        result = detector.predict_long(text, window_chars=200)
+        assert result["features"]["fake_indicators"] == detector.matcher.count(text.lower())["fake_indicators"] > 0
+
+    def test_short_document_matches_predict(self):
+        """Test that a text within one window gets the same answer as /api/predict"""
+        text = "According to the official report, the data shows growth!"
+        result = detector.predict_long(text)
+        single = detector.predict(text)
+        assert len(result["windows"]) == 1
+        assert result["prediction"] == single["prediction"]
+        assert result["windows"][0]["confidence"] == single["confidence"]
+
+
+class TestPredictionCache:
+    """Test prediction caching on the predict endpoints"""
+
+    def test_repeated_text_hits_cache(self):
+        """Test that a repeated text is served from the cache with the same answer"""
+        text = "Cache test: according to the official report, the data shows growth."
+        first = client.post("/api/predict", json={"text": text}).json()
+        hits = prediction_cache.hits
+        second = client.post("/api/predict", json={"text": "  " + text + "\n"}).json()
+        assert prediction_cache.hits == hits + 1
+        for field in ["prediction", "confidence", "sentiment"]:
+            assert first[field] == second[field]
+
+    def test_uncached_prediction_counts_one_miss(self):
+        """Test that a cache miss on /api/predict is counted once, and the repeat as one hit"""
+        text = "Cache test: a text that has not been scored before, counted exactly once."
+        hits, misses = prediction_cache.hits, prediction_cache.misses
+        client.post("/api/predict", json={"text": text})
+        assert (prediction_cache.hits, prediction_cache.misses) == (hits, misses + 1)
+        client.post("/api/predict", json={"text": text})
+        assert (prediction_cache.hits, prediction_cache.misses) == (hits + 1, misses + 1)
+
+    def test_detector_is_deterministic(self):
+        """Test that scoring the same text twice gives the same result"""
+        text = "Shocking secret exposed! Doctors hate this one weird trick."
+        first = detector.predict(text)
+        second = detector.predict(text)
+        batch = detector.predict_many([text])[0]
+        assert first["confidence"] == second["confidence"] == batch["confidence"]
+        assert first["prediction"] == second["prediction"] == batch["prediction"]
+
+    def test_batch_uses_cache(self):
+        """Test that batch predictions are shared with the single-text cache"""
+        text = "Batch cache test: a study shows the research data is sound."
+        single = client.post("/api/predict", json={"text": text}).json()
+        hits = prediction_cache.hits
+        batch = client.post("/api/predict/batch", json={"texts": [text]}).json()
+        assert prediction_cache.hits == hits + 1
+        assert batch["results"][0]["confidence"] == single["confidence"]
+
+    def test_stats_reports_cache_counters(self):
+        """Test that cache counters are exposed on the stats endpoint"""
+        data = client.get("/api/stats").json()
+        for field in ["size", "hits", "misses", "evictions", "hit_rate"]:
+            assert field in data["cache"]
+
+
+@pytest.fixture
+def api_keys():
+    """Register the API keys the rate limiting tests send"""
+    keys = {"crawler", "other", "customer"}
+    API_KEYS.update(keys)
+    yield keys
+    API_KEYS.difference_update(keys)
+
+
+class TestLoadShedding:
+    """Test load shedding when the scoring executor is saturated"""
+
+    def test_saturated_executor_returns_503(self, monkeypatch):
+        """Test that requests are rejected with Retry-After instead of queueing"""
+        monkeypatch.setattr(scoring_executor, "max_in_flight", 0)
+        response = client.post(
+            "/api/predict",
+            json={"text": "Load shedding test: this article has never been scored before."}
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(scoring_executor.retry_after)
+
+    def test_stats_reports_executor(self):
+        """Test that executor state is exposed on the stats endpoint"""
+        data = client.get("/api/stats").json()
+        assert data["executor"]["mode"] in ["inline", "thread", "process"]
+        assert data["executor"]["in_flight"] >= 0
+
+    def test_client_over_rate_limit_gets_429(self, monkeypatch, api_keys):
+        """Test that a client exhausting its bucket is rejected before scoring, others are not"""
+        monkeypatch.setitem(rate_limiters, KEYED, TokenBucketLimiter(rate=0.01, burst=2))
+        payload = {"text": "Rate limit test: a crawler keeps sending this same article."}
+        headers = {"X-API-Key": "crawler"}
+        first = client.post("/api/predict", json=payload, headers=headers)
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Limit"] == "2"
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert client.post("/api/predict", json=payload, headers=headers).status_code == 200
+        limited = client.post("/api/predict", json=payload, headers=headers)
+        assert limited.status_code == 429
+        assert int(limited.headers["Retry-After"]) >= 1
+        assert limited.json()["status_code"] == 429
+        # Another key has its own bucket
+        assert client.post("/api/predict", json=payload, headers={"X-API-Key": "other"}).status_code == 200
+        # Monitoring is never limited
+        assert client.get("/api/health", headers=headers).status_code == 200
+
+    def test_unknown_keys_share_the_address_bucket(self, monkeypatch):
+        """Test that sending a different made-up key per request does not escape the per-IP limit"""
+        monkeypatch.setitem(rate_limiters, ANONYMOUS, TokenBucketLimiter(rate=0.01, burst=2))
+        payload = {"text": "Rate limit test: a crawler invents a new API key for every request."}
+        codes = [
+            client.post("/api/predict", json=payload, headers={"X-API-Key": f"random-{i}"}).status_code
+            for i in range(5)
+        ]
+        assert codes == [200, 200, 429, 429, 429]
+
+    def test_anonymous_shed_before_keyed(self, monkeypatch, api_keys):
+        """Test that a standing queue delay sheds anonymous clients first"""
+        monkeypatch.setattr(load_shedder, "delay", load_shedder.target * 1.5)
+        monkeypatch.setattr(load_shedder, "_interval_start", float("inf"))
+        payload = {"text": "Shedding test: this article arrives while the scoring queue is long."}
+        anonymous = client.post("/api/predict", json=payload)
+        assert anonymous.status_code == 503
+        assert "Retry-After" in anonymous.headers
+        assert client.post("/api/predict", json=payload, headers={"X-API-Key": "customer"}).status_code == 200
+        data = fresh_stats()["rate_limiting"]
+        assert data["load_shedding"]["shedding"] == ["anonymous"]
+        assert data["load_shedding"]["shed"]["anonymous"] >= 1
+
+
+class TestLatencyMetrics:
+    """Test latency histograms on the monitoring endpoints"""
+
+    def test_stats_reports_stage_latencies(self):
+        """Test that a prediction records every stage"""
+        client.post(
+            "/api/predict",
+            json={"text": "Latency test: exclusive report on a shocking new miracle cure!"}
+        )
+        data = client.get("/api/stats").json()
+        for stage in ["validation", "extract_features", "classify", "serialization"]:
+            assert data["latency"]["stages"][stage]["count"] >= 1
+        assert data["latency"]["requests"]["/api/predict"]["p99_ms"] >= 0
+        assert data["avg_latency_ms"] > 0
+
+    def test_stats_reports_batching(self):
+        """Test that micro-batching of single predictions is reported"""
+        client.post(
+            "/api/predict",
+            json={"text": "Batching test: the committee published its annual budget review."}
+        )
+        batching = client.get("/api/stats").json()["batching"]
+        assert batching["batches"] >= 1
+        assert batching["batch_size"]["count"] >= 1
+        assert batching["queue_wait"]["count"] >= 1
+
+    def test_near_duplicate_reuses_verdict(self):
+        """Test that a lightly edited rewrite is answered from the near-duplicate index"""
+        story = (
+            "Near-duplicate test: regional officials announced that the river bridge will close "
+            "for repairs starting next month, with traffic diverted through the northern bypass "
+            "while engineers replace the supports, and buses will run on a temporary timetable "
+            "until the work is finished late in the autumn according to the transport department"
+        )
+        before = fresh_stats()["near_duplicates"]
+        first = client.post("/api/predict", json={"text": story}).json()
+        second = client.post("/api/predict", json={"text": story.replace("next month", "next week")}).json()
+        after = fresh_stats()["near_duplicates"]
+        assert second["prediction"] == first["prediction"]
+        assert second["confidence"] == first["confidence"]
+        assert after["short_circuits"] == before["short_circuits"] + 1
+        assert after["size"] >= 1
+        assert after["lookup_latency"]["count"] >= 2
+
+    def test_near_duplicate_with_other_emphasis_is_scored(self):
+        """Test that a shouted copy of a sober text gets its own verdict rather than the stored one"""
+        sober = (
+            "Emphasis test: according to the ministry, the bridge on the northern road "
+            "will be repaired over the coming months by the regional council"
+        )
+        shouted = sober.upper() + "!!!!!!"
+        assert client.post("/api/predict", json={"text": sober}).json()["prediction"] == "REAL"
+        response = client.post("/api/predict", json={"text": shouted}).json()
+        assert response["prediction"] == detector.predict(shouted)["prediction"] == "FAKE"
+        assert response["confidence"] == str(detector.predict(shouted)["confidence"])
+
+    def test_metrics_endpoint_prometheus_format(self):
+        """Test that /metrics serves Prometheus text"""
+        client.get("/api/health")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE fakeguard_request_duration_seconds histogram" in response.text
+        assert 'fakeguard_request_duration_seconds_count{path="/api/health"}' in response.text
+
+
+class TestHistoryEndpoints:
+    """Test prediction history queries"""
+
+    def test_predictions_recorded_and_aggregated(self, monkeypatch, tmp_path):
+        """Test that served predictions are stored and counted per verdict per bucket"""
+        import main
+        from store import PredictionStore, text_hash
+
+        store = PredictionStore(str(tmp_path / "predictions.db"))
+        monkeypatch.setattr(main, "prediction_store", store)
+        text = "Shocking!!! You won't believe this secret cover-up"
+        client.post("/api/predict", json={"text": text})
+        client.post("/api/predict/batch", json={"texts": [text, "According to the official report, growth was steady"]})
+        store.stop()
+
+        response = client.get("/api/history/predictions", params={"text_hash": text_hash(text)})
+        assert response.status_code == 200
+        records = response.json()["predictions"]
+        assert sorted(r["endpoint"] for r in records) == ["batch", "predict"]
+        assert {r["prediction"] for r in records} == {"FAKE"}
+
+        now = time.time()
+        data = client.get("/api/history/aggregates", params={"start": now - 3600, "end": now + 1, "bucket": 60}).json()
+        assert data["bucket_seconds"] == 60 and len(data["buckets"]) in (60, 61)
+        totals = {verdict: sum(b["counts"][verdict] for b in data["buckets"]) for verdict in ("FAKE", "REAL")}
+        assert totals == {"FAKE": 2, "REAL": 1}
+
+    def test_invalid_history_queries(self, monkeypatch, tmp_path):
+        """Test that unusable query parameters get 422 and a disabled store 404"""
+        import main
+        from store import PredictionStore
+
+        monkeypatch.setattr(main, "prediction_store", PredictionStore(str(tmp_path / "predictions.db")))
+        assert client.get("/api/history/aggregates", params={"bucket": 90}).status_code == 422
+        assert client.get("/api/history/predictions", params={"verdict": "MAYBE"}).status_code == 422
+        assert client.get("/api/history/predictions", params={"text_hash": "xyz"}).status_code == 422
+        monkeypatch.setattr(main, "prediction_store", PredictionStore(None))
+        assert client.get("/api/history/aggregates").status_code == 404
+
 
 class TestStatsEndpoint:
     """Test statistics endpoint"""
@@ -152,6 +636,22 @@ class TestStatsEndpoint:
         data = response.json()
         assert float(data["avg_latency_ms"]) >= 0
 
+    def test_stats_shared_between_pollers(self, monkeypatch):
+        """Test that pollers within the interval get the same computed stats, revalidated by ETag"""
+        # Freeze the cache clock so the polls stay inside the interval however slow the run is
+        now = response_cache.clock()
+        monkeypatch.setattr(response_cache, "clock", lambda: now)
+        fresh_stats()
+        builds = response_cache.builds
+        first = client.get("/api/stats")
+        client.post("/api/predict", json={"text": "Stats cache test: this prediction lands between two polls."})
+        second = client.get("/api/stats")
+        assert response_cache.builds == builds
+        assert second.content == first.content
+        revalidated = client.get("/api/stats", headers={"If-None-Match": first.headers["ETag"]})
+        assert revalidated.status_code == 304
+        assert fresh_stats()["total_predictions"] > first.json()["total_predictions"]
+
 
 class TestModelInfoEndpoint:
     """Test model information endpoint"""
@@ -184,6 +684,51 @@ class TestModelInfoEndpoint:
             value = float(data[metric])
             assert 0 <= value <= 1, f"{metric} should be between 0 and 1"
 
+    def test_model_info_only_reports_backend_details(self):
+        """Test that sizes and counts come from the active backend, not placeholders"""
+        data = client.get("/api/model-info").json()
+        assert data["features_extracted"] == data["backend"]["features_extracted"]
+        assert "ensemble_models" not in data
+        assert "model_size_mb" not in data
+
+    def test_model_info_not_modified(self):
+        """Test that a client holding the current model info gets 304"""
+        first = client.get("/api/model-info")
+        assert first.headers["Cache-Control"] == "no-cache"
+        response = client.get("/api/model-info", headers={"If-None-Match": first.headers["ETag"]})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_promote_without_candidate_conflicts(self, monkeypatch):
+        """Test that promoting with no shadow candidate is rejected"""
+        import main
+
+        monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+        response = client.post("/api/model/promote", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 409
+        registry = client.get("/api/stats").json()["model_registry"]
+        assert registry["active_version"] == detector.model_version
+        assert registry["candidate_version"] is None
+
+
+    @pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+    def test_promote_requires_admin_token(self, monkeypatch, headers):
+        """Test that promotion without the admin token is refused before touching the registry"""
+        import main
+
+        monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(main.model_registry, "promote", lambda: pytest.fail("promoted without a token"))
+        response = client.post("/api/model/promote", headers=headers)
+        assert response.status_code == 401
+
+    def test_promote_disabled_without_admin_token(self, monkeypatch):
+        """Test that promotion is refused when no admin token is configured"""
+        import main
+
+        monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+        response = client.post("/api/model/promote", headers={"X-Admin-Token": ""})
+        assert response.status_code == 403
+
 
 class TestRootEndpoint:
     """Test root endpoint"""
@@ -199,6 +744,12 @@ class TestRootEndpoint:
         data = response.json()
         assert "message" in data or "title" in data
 
+    def test_root_not_modified(self):
+        """Test that the pre-encoded root response is revalidated with its ETag"""
+        etag = client.get("/").headers["ETag"]
+        assert client.get("/", headers={"If-None-Match": f'W/{etag}'}).status_code == 304
+        assert client.get("/", headers={"If-None-Match": '"other"'}).status_code == 200
+
 
 class TestErrorHandling:
     """Test error handling"""
@@ -0,0 +1,69 @@
+import pytest
+from audit import PredictionAuditLog, read_records
+
+
+def write(sink, count, endpoint="predict"):
+    for i in range(count):
+        sink.record(endpoint, "FAKE" if i % 2 else "REAL", 70.5, "neutral", 100 + i)
+
+
+class TestPredictionAuditLog:
+    """Test the buffered prediction audit sink"""
+
+    @pytest.mark.parametrize("fmt", ["jsonl", "binary"])
+    def test_records_round_trip(self, tmp_path, fmt):
+        """Test that buffered records are written and decode back in either format"""
+        sink = PredictionAuditLog(str(tmp_path), fmt=fmt)
+        write(sink, 5, endpoint="batch")
+        sink.stop()
+        records = list(read_records(sink.path))
+        assert len(records) == 5
+        assert [r["prediction"] for r in records] == ["REAL", "FAKE", "REAL", "FAKE", "REAL"]
+        assert records[4]["text_length"] == 104
+        assert records[0]["endpoint"] == "batch"
+        assert records[0]["confidence"] == 70.5
+        assert sink.stats()["written"] == 5
+
+    def test_unknown_labels_are_kept(self, tmp_path):
+        """Test that a label without a binary code is written as unknown instead of failing the batch"""
+        sink = PredictionAuditLog(str(tmp_path), fmt="binary")
+        sink.record("webhook", "UNSURE", 50.0, "mixed", 42)
+        sink.record("predict", "FAKE", 90.0, "negative", 43)
+        sink.stop()
+        records = list(read_records(sink.path))
+        assert [(r["endpoint"], r["prediction"], r["sentiment"]) for r in records] == [
+            ("unknown", "unknown", "unknown"), ("predict", "FAKE", "negative"),
+        ]
+        assert sink.failed == 0
+
+    def test_overflow_drops_instead_of_blocking(self, tmp_path):
+        """Test that records beyond the buffer capacity are counted as dropped"""
+        sink = PredictionAuditLog(str(tmp_path), capacity=10, flush_seconds=60)
+        # Hold the writer off so the buffer can only fill up
+        sink._thread = object()
+        write(sink, 25)
+        assert sink.stats()["buffered"] == 10
+        assert sink.dropped == 15
+
+    def test_rotates_files(self, tmp_path):
+        """Test that full files are rotated into numbered backups"""
+        sink = PredictionAuditLog(str(tmp_path), max_file_bytes=200, backups=2, flush_seconds=60)
+        sink._thread = object()
+        for _ in range(5):
+            write(sink, 3)
+            sink.flush()
+        sink._file.close()
+        backups = sorted(p.name for p in tmp_path.iterdir() if p.name != sink.path.name)
+        assert backups == [f"{sink.path.name}.1", f"{sink.path.name}.2"]
+        assert sink.rotations >= 2
+
+    def test_disabled_without_directory(self):
+        """Test that the sink is a no-op without a directory"""
+        sink = PredictionAuditLog(None)
+        write(sink, 3)
+        assert sink.stats() == dict(sink.stats(), enabled=False, buffered=0, written=0)
+
+    def test_unknown_format_rejected(self, tmp_path):
+        """Test that an unsupported format raises"""
+        with pytest.raises(ValueError):
+            PredictionAuditLog(str(tmp_path), fmt="xml")
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pytest
+
+from backends import (
+    HashedTfidfBackend, ModelBackend, create_backend, hash_features, load_array,
+    save_artifact, train_linear_model,
+)
+from detector import FakeNewsDetector
+
+FAKE = [
+    "Shocking secret cure they don't want you to know about, click now!",
+    "You won't believe this miracle trick doctors hate, shocking secret revealed",
+    "Unbelievable conspiracy exposed, the shocking truth they hide from you",
+    "Miracle weight loss secret, shocking results you won't believe",
+]
+REAL = [
+    "According to the official report, the data shows steady economic growth.",
+    "The ministry published quarterly figures confirmed by independent analysts.",
+    "Researchers at the university reported the study results in a journal.",
+    "Officials said the committee will review the budget proposal next week.",
+]
+
+
+@pytest.fixture(scope="module")
+def artifact(tmp_path_factory):
+    weights, idf, bias = train_linear_model(FAKE + REAL, [1] * len(FAKE) + [0] * len(REAL), n_features=2 ** 12)
+    path = tmp_path_factory.mktemp("model") / "tfidf.npz"
+    save_artifact(path, weights, idf, bias, {"version": "tfidf-test"})
+    return path
+
+
+class TestModelBackends:
+    """Test the backend interface and the hashed TF-IDF backend"""
+
+    def test_detector_implements_interface(self):
+        """Test that the heuristic detector is a backend that can be rebuilt from its spec"""
+        detector = FakeNewsDetector()
+        assert isinstance(detector, ModelBackend)
+        name, options = detector.spec
+        assert isinstance(create_backend(name, **options), FakeNewsDetector)
+
+    def test_unknown_backend_rejected(self):
+        """Test that an unknown backend name raises"""
+        with pytest.raises(ValueError):
+            create_backend("svm")
+
+    def test_hash_features_are_stable(self):
+        """Test that hashing merges repeated n-grams and does not depend on the process"""
+        rows, columns, counts = hash_features(["spam spam spam"], 1024)
+        # "spam" and "spam spam"
+        assert len(columns) == 2
+        assert sorted(np.abs(counts).tolist()) == [2.0, 3.0]
+
+    def test_weights_load_lazily_and_memory_mapped(self, artifact):
+        """Test that weights are only mapped on first use, straight from the archive"""
+        backend = HashedTfidfBackend(artifact)
+        assert backend.model_version == "tfidf-test"
+        assert backend._weights is None
+        backend.predict(REAL[0])
+        assert isinstance(backend._weights, np.memmap)
+        with np.load(artifact) as archive:
+            assert np.array_equal(backend._weights, archive["weights"])
+
+    def test_directory_artifact(self, artifact, tmp_path):
+        """Test that a directory of .npy files is loaded like an archive"""
+        with np.load(artifact) as archive:
+            for name in ("weights", "idf"):
+                np.save(tmp_path / f"{name}.npy", archive[name])
+            (tmp_path / "meta.json").write_text(str(archive["meta"]))
+        assert isinstance(load_array(tmp_path, "weights"), np.memmap)
+        backend = HashedTfidfBackend(tmp_path)
+        assert backend.predict(FAKE[0])["prediction"] == "FAKE"
+
+    def test_predictions_follow_training(self, artifact):
+        """Test that the trained model separates its training examples"""
+        backend = HashedTfidfBackend(artifact)
+        results = backend.predict_many(FAKE + REAL)
+        assert [r["prediction"] for r in results] == ["FAKE"] * len(FAKE) + ["REAL"] * len(REAL)
+        for result in results:
+            assert 50 <= result["confidence"] <= 99
+            assert result["sentiment"] in ("positive", "negative", "neutral")
+            assert set(result["timings"]) == {"extract_features", "classify"}
+
+    def test_single_and_batch_agree(self, artifact):
+        """Test that predict and predict_many give the same scores"""
+        backend = HashedTfidfBackend(artifact)
+        single = backend.predict(FAKE[1])
+        batch = backend.predict_many([REAL[0], FAKE[1]])[1]
+        assert single["confidence"] == batch["confidence"]
+        assert single["features"] == batch["features"]
+
+    def test_explanation_splits_logit(self, artifact):
+        """Test that the explained contributions add up to the model's probability"""
+        backend = HashedTfidfBackend(artifact)
+        result = backend.predict(FAKE[0], explain=True)
+        logit = sum(c["score"] for c in result["explanation"]["contributions"])
+        assert 100 / (1 + np.exp(-logit)) == pytest.approx(result["features"]["fake_probability"], abs=0.1)
+        assert "explanation" not in backend.predict(FAKE[0])
+
+    def test_describe_reports_artifact(self, artifact):
+        """Test that describe exposes the model details"""
+        info = HashedTfidfBackend(artifact).describe()
+        assert info["backend"] == "tfidf"
+        assert info["features"] == info["features_extracted"] == 2 ** 12
+        assert "model_size_mb" in info
+        assert json.dumps(info)
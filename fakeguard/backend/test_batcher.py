@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from batcher import MicroBatcher
+from metrics import LatencyRegistry
+
+
+class RecordingScorer:
+    """Scorer that records the batches it is called with"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("scoring failed")
+        return [{"text": text} for text in texts]
+
+
+class TestMicroBatcher:
+    """Test coalescing of concurrent predictions"""
+
+    def test_concurrent_submits_share_a_batch(self):
+        """Test that concurrent texts are scored together and get their own results"""
+        scorer = RecordingScorer()
+        batcher = MicroBatcher(scorer, max_batch_size=32, max_wait_ms=5)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(f"text {i}") for i in range(10)))
+
+        results = asyncio.run(run())
+        assert [r["text"] for r in results] == [f"text {i}" for i in range(10)]
+        assert len(scorer.batches) == 1
+
+    def test_full_batch_flushes_without_waiting(self):
+        """Test that reaching the size limit flushes immediately and splits the rest"""
+        scorer = RecordingScorer()
+        batcher = MicroBatcher(scorer, max_batch_size=4, max_wait_ms=10_000)
+
+        async def run():
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit(str(i)) for i in range(8))), 1)
+
+        asyncio.run(run())
+        assert [len(batch) for batch in scorer.batches] == [4, 4]
+
+    def test_lone_request_flushed_after_max_wait(self):
+        """Test that a single text is scored once the wait expires"""
+        scorer = RecordingScorer()
+        batcher = MicroBatcher(scorer, max_batch_size=32, max_wait_ms=1)
+        assert asyncio.run(batcher.submit("alone")) == {"text": "alone"}
+        assert scorer.batches == [["alone"]]
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed batch raises in each waiting request"""
+        batcher = MicroBatcher(RecordingScorer(fail=True), max_batch_size=32, max_wait_ms=1)
+
+        async def run():
+            return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+
+    def test_histograms_recorded(self):
+        """Test that batch size and queue wait are recorded per batch and per text"""
+        registry = LatencyRegistry()
+        batcher = MicroBatcher(RecordingScorer(), max_batch_size=32, max_wait_ms=1, registry=registry)
+
+        async def run():
+            await asyncio.gather(*(batcher.submit(str(i)) for i in range(3)))
+
+        asyncio.run(run())
+        stats = batcher.stats()
+        assert stats["batches"] == 1
+        assert stats["batch_size"]["count"] == 1
+        assert 2 <= stats["batch_size"]["p50"] <= 4
+        assert stats["queue_wait"]["count"] == 3
+        assert 'fakeguard_batch_size_bucket{endpoint="predict",le="4"} 1' in registry.render_prometheus()
+
+    def test_size_one_disables_batching(self):
+        """Test that max_batch_size 1 scores each text on its own"""
+        scorer = RecordingScorer()
+        batcher = MicroBatcher(scorer, max_batch_size=1)
+
+        async def run():
+            await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+        asyncio.run(run())
+        assert scorer.batches == [["a"], ["b"]]
+
+    def test_invalid_size_rejected(self):
+        """Test that a batch size below one raises"""
+        with pytest.raises(ValueError):
+            MicroBatcher(RecordingScorer(), max_batch_size=0)
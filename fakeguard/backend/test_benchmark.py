@@ -0,0 +1,68 @@
+import json
+
+from benchmark import compare, main, run_encoding, run_load, run_micro, synthetic_texts
+
+
+class TestBenchmark:
+    """Test the benchmark suite on tiny runs"""
+
+    def test_synthetic_texts_have_exact_length(self):
+        """Test that synthetic texts match the requested lengths and are reproducible"""
+        for length in (20, 500, 5000):
+            texts = synthetic_texts(length, 4)
+            assert all(len(text) == length for text in texts)
+            assert texts == synthetic_texts(length, 4)
+
+    def test_micro_benchmarks(self):
+        """Test that every stage is timed for every length"""
+        results = run_micro(iterations=5, lengths=(20, 5000))
+        assert set(results) == {"extract_features", "classify", "predict"}
+        for stage in results.values():
+            assert set(stage) == {"20", "5000"}
+            assert stage["20"]["p50_us"] > 0
+
+    def test_encoding_benchmark(self):
+        """Test that both response encoders are timed"""
+        results = run_encoding(iterations=5)
+        assert set(results) == {"fast", "pydantic"}
+        assert results["fast"]["p50_us"] > 0
+
+    def test_load_test_reports_throughput(self):
+        """Test that the in-process load test drives /api/predict"""
+        results = run_load(concurrency_levels=(2,), duration=0.3)
+        assert results["2"]["requests"] > 0
+        assert results["2"]["errors"] == 0
+        assert results["2"]["rps"] > 0
+        assert results["2"]["p99_ms"] >= results["2"]["p50_ms"]
+
+    def test_load_test_at_maximum_text_length(self):
+        """Test that load texts of the maximum length stay within the API limit"""
+        results = run_load(concurrency_levels=(2,), duration=0.3, text_length=5000)
+        assert results["2"]["requests"] > 0
+        assert results["2"]["errors"] == 0
+
+    def test_load_test_bypasses_near_duplicates(self):
+        """Test that the suffix-numbered load texts are scored rather than matched as near-duplicates"""
+        from main import near_duplicates
+
+        before = near_duplicates.stats()["lookups"]
+        run_load(concurrency_levels=(2,), duration=0.3)
+        assert near_duplicates.stats()["lookups"] == before
+        assert near_duplicates.capacity
+
+    def test_compare_flags_regressions(self):
+        """Test that only changes in the bad direction beyond the threshold are flagged"""
+        baseline = {"micro": {"predict": {"20": {"p50_us": 100.0}}}, "load": {"8": {"rps": 1000.0, "p99_ms": 10.0}}}
+        current = {"micro": {"predict": {"20": {"p50_us": 105.0}}}, "load": {"8": {"rps": 800.0, "p99_ms": 5.0}}}
+        rows = {row["metric"]: row for row in compare(baseline, current, threshold=10)}
+        assert not rows["micro.predict.20.p50_us"]["regression"]
+        assert rows["load.8.rps"]["regression"]
+        assert not rows["load.8.p99_ms"]["regression"]
+
+    def test_compare_command_exit_code(self, tmp_path):
+        """Test that the compare command fails when there are regressions"""
+        baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+        baseline.write_text(json.dumps({"load": {"1": {"rps": 100.0}}}))
+        current.write_text(json.dumps({"load": {"1": {"rps": 50.0}}}))
+        assert main(["compare", str(baseline), str(current)]) == 1
+        assert main(["compare", str(baseline), str(baseline)]) == 0
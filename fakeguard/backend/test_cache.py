@@ -0,0 +1,50 @@
+import time
+
+from cache import PredictionCache, normalize_text
+
+
+class TestPredictionCache:
+    """Test the LRU/TTL prediction cache"""
+
+    def test_get_returns_stored_value(self):
+        """Test that a stored value is returned and counted as a hit"""
+        cache = PredictionCache(max_entries=10, ttl_seconds=60)
+        cache.put("a", {"prediction": "REAL"})
+        assert cache.get("a") == {"prediction": "REAL"}
+        assert cache.get("b") is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the entry not used for longest is evicted first"""
+        cache = PredictionCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", {})
+        cache.put("b", {})
+        cache.get("a")
+        cache.put("c", {})
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.evictions == 1
+
+    def test_expired_entries_are_dropped(self):
+        """Test that entries past their TTL are treated as misses"""
+        cache = PredictionCache(max_entries=10, ttl_seconds=0.01)
+        cache.put("a", {})
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert cache.stats()["size"] == 0
+
+    def test_zero_size_disables_cache(self):
+        """Test that a cache with no capacity never stores anything"""
+        cache = PredictionCache(max_entries=0)
+        cache.put("a", {})
+        assert cache.get("a") is None
+
+    def test_key_depends_on_model_version(self):
+        """Test that a new model version does not reuse old verdicts"""
+        assert PredictionCache.make_key("text", "1.0.0") != PredictionCache.make_key("text", "1.1.0")
+
+    def test_normalize_text(self):
+        """Test that whitespace padding and Unicode composition are normalized"""
+        assert normalize_text("  Cafe\u0301 news \n") == "Caf\u00e9 news"
@@ -0,0 +1,63 @@
+import multiprocessing
+import threading
+
+import pytest
+from counters import SharedCounters, fcntl
+
+NAMES = ("total_predictions", "total_errors")
+
+
+def _increment_in_child(path):
+    counters = SharedCounters(NAMES, path=path)
+    for _ in range(100):
+        counters.increment("total_predictions")
+    counters.increment("total_errors", 5)
+
+
+class TestSharedCounters:
+    """Test the cluster-wide stats counters"""
+
+    def test_in_memory_counters(self):
+        """Test that counters work without a backing file"""
+        counters = SharedCounters(NAMES)
+        counters.increment("total_predictions")
+        counters.increment("total_predictions", 2)
+        assert counters.totals() == {"total_predictions": 3, "total_errors": 0}
+
+    def test_threads_do_not_lose_increments(self, tmp_path):
+        """Test that each thread writes its own slot and totals add up"""
+        counters = SharedCounters(NAMES, path=str(tmp_path / "stats.bin"))
+
+        def record():
+            for _ in range(1000):
+                counters.increment("total_predictions")
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counters.totals()["total_predictions"] == 4000
+
+    @pytest.mark.skipif(fcntl is None, reason="shared counters need fcntl")
+    def test_totals_aggregate_across_processes(self, tmp_path):
+        """Test that increments from other worker processes are visible"""
+        path = str(tmp_path / "stats.bin")
+        counters = SharedCounters(NAMES, path=path)
+        counters.increment("total_predictions")
+        workers = [multiprocessing.Process(target=_increment_in_child, args=(path,)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert counters.totals() == {"total_predictions": 201, "total_errors": 10}
+
+    @pytest.mark.skipif(fcntl is None, reason="shared counters need fcntl")
+    def test_file_from_previous_run_is_reset(self, tmp_path):
+        """Test that a counter file with only dead owners starts from zero"""
+        path = str(tmp_path / "stats.bin")
+        worker = multiprocessing.Process(target=_increment_in_child, args=(path,))
+        worker.start()
+        worker.join()
+        counters = SharedCounters(NAMES, path=path)
+        assert counters.totals() == {"total_predictions": 0, "total_errors": 0}
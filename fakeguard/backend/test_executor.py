@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from detector import FakeNewsDetector
+from executor import ScoringExecutor, ExecutorSaturated
+
+TEXT = "According to the official report, the study shows steady growth."
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return FakeNewsDetector()
+
+
+class TestScoringExecutor:
+    """Test the scoring execution modes"""
+
+    @pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+    def test_modes_agree_with_detector(self, detector, mode):
+        """Test that every mode returns the detector's own answer"""
+        executor = ScoringExecutor(detector, mode=mode, workers=2)
+        try:
+            executor.start()
+            result = asyncio.run(executor.run("predict", TEXT))
+            batch = asyncio.run(executor.run("predict_many", [TEXT]))
+        finally:
+            executor.shutdown()
+        expected = detector.predict(TEXT)
+        assert result["prediction"] == expected["prediction"]
+        assert result["confidence"] == expected["confidence"]
+        assert batch[0]["confidence"] == expected["confidence"]
+        assert executor.in_flight == 0
+
+    @pytest.mark.parametrize("mode", ["inline", "process"])
+    def test_backend_override(self, detector, mode, tmp_path):
+        """Test that a call can be scored by another backend, built in the worker on first use"""
+        from backends import HashedTfidfBackend, save_artifact, train_linear_model
+
+        weights, idf, bias = train_linear_model([TEXT, "Shocking secret cure!"], [0, 1], n_features=2 ** 10)
+        save_artifact(tmp_path / "model.npz", weights, idf, bias, {"version": "override"})
+        backend = HashedTfidfBackend(tmp_path / "model.npz")
+        executor = ScoringExecutor(detector, mode=mode, workers=1)
+        try:
+            result = asyncio.run(executor.run("predict", TEXT, backend=backend))
+            default = asyncio.run(executor.run("predict", TEXT))
+        finally:
+            executor.shutdown()
+        assert result["confidence"] == backend.predict(TEXT)["confidence"]
+        assert "hashed_features" in result["features"]
+        assert default["confidence"] == detector.predict(TEXT)["confidence"]
+
+    def test_queue_wait_reported(self, detector):
+        """Test that calls queued behind a busy worker report their wait"""
+        waits = []
+        executor = ScoringExecutor(detector, mode="thread", workers=1, on_queue_wait=waits.append)
+
+        async def burst():
+            await asyncio.gather(*(executor.run("predict_many", [TEXT] * 200) for _ in range(4)))
+
+        try:
+            asyncio.run(burst())
+        finally:
+            executor.shutdown()
+        assert len(waits) == 4
+        assert min(waits) >= 0
+        # With a single worker, the last call waited for the three before it
+        assert max(waits) > min(waits)
+
+    def test_saturated_executor_rejects(self, detector):
+        """Test that calls beyond the in-flight limit are shed immediately"""
+        executor = ScoringExecutor(detector, mode="inline", max_in_flight=0)
+        with pytest.raises(ExecutorSaturated):
+            asyncio.run(executor.run("predict", TEXT))
+        assert executor.stats()["rejected"] == 1
+
+    def test_unknown_mode_rejected(self, detector):
+        """Test that an invalid mode is a configuration error"""
+        with pytest.raises(ValueError):
+            ScoringExecutor(detector, mode="gpu")
@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fetcher import FetchError, PageCache, TextExtractor, URLFetcher, _is_public
+
+ARTICLE = (
+    "<html><head><title>Budget review</title><script>var tracking = 1;</script>"
+    "<style>p { color: red; }</style></head><body>"
+    "<p>The committee published its annual budget review on Monday.</p>"
+    "<div>Officials said the figures were confirmed by independent auditors.</div>"
+    "</body></html>"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves canned pages and counts requests per path"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests[self.path] = server.requests.get(self.path, 0) + 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(0.1)
+            if self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            if self.path == "/redirect":
+                self.send_response(302)
+                self.send_header("Location", "/cached")
+                self.end_headers()
+                return
+            if self.path == "/missing":
+                self.send_error(404)
+                return
+            content_type = "application/pdf" if self.path == "/pdf" else "text/html; charset=utf-8"
+            body = (ARTICLE * 200 if self.path == "/large" else ARTICLE).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if self.path == "/etag":
+                self.send_header("ETag", '"v1"')
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.requests = {}
+    server.active = 0
+    server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def fetch(fetcher, *urls):
+    async def run():
+        try:
+            return await asyncio.gather(*(fetcher.fetch_text(u) for u in urls))
+        finally:
+            await fetcher.aclose()
+    return asyncio.run(run())
+
+
+class TestTextExtractor:
+    """Test streaming HTML-to-text extraction"""
+
+    def test_drops_scripts_and_keeps_blocks(self):
+        """Test that non-content elements are removed and blocks become lines"""
+        extractor = TextExtractor()
+        # Fed in small pieces, as it would arrive from the network
+        for i in range(0, len(ARTICLE), 7):
+            extractor.feed(ARTICLE[i:i + 7])
+        extractor.close()
+        text = extractor.text()
+        assert "tracking" not in text and "color" not in text
+        assert text.splitlines() == [
+            "Budget review",
+            "The committee published its annual budget review on Monday.",
+            "Officials said the figures were confirmed by independent auditors.",
+        ]
+
+    def test_stops_at_max_chars(self):
+        """Test that extraction is bounded"""
+        extractor = TextExtractor(max_chars=50)
+        extractor.feed(ARTICLE * 10)
+        assert extractor.full
+        assert len(extractor.text()) <= 50
+
+
+class TestURLFetcher:
+    """Test the pooled fetcher and page cache against a local stub server"""
+
+    def test_fetches_and_caches_page(self, stub_server, tmp_path):
+        """Test that a repeated URL is served from the page cache without a request"""
+        fetcher = URLFetcher(str(tmp_path), allow_private=True)
+        first, = fetch(fetcher, url(stub_server, "/cached"))
+        second, = fetch(fetcher, url(stub_server, "/cached"))
+        assert "annual budget review" in first
+        assert first == second
+        assert stub_server.requests["/cached"] == 1
+        assert fetcher.stats()["cache_hits"] == 1
+
+    def test_revalidates_with_etag(self, stub_server, tmp_path):
+        """Test that a stale page is revalidated and a 304 reuses the cached text"""
+        fetcher = URLFetcher(str(tmp_path), allow_private=True)
+        first, = fetch(fetcher, url(stub_server, "/etag"))
+        second, = fetch(fetcher, url(stub_server, "/etag"))
+        assert first == second
+        assert stub_server.requests["/etag"] == 2
+        assert fetcher.stats()["revalidated"] == 1
+
+    def test_concurrent_requests_share_one_fetch(self, stub_server, tmp_path):
+        """Test that concurrent requests for one URL make a single upstream request"""
+        fetcher = URLFetcher(str(tmp_path), allow_private=True)
+        texts = fetch(fetcher, *[url(stub_server, "/slow-shared")] * 5)
+        assert len(set(texts)) == 1
+        assert stub_server.requests["/slow-shared"] == 1
+
+    def test_per_host_concurrency_cap(self, stub_server, tmp_path):
+        """Test that no more than per_host_limit requests hit one host at once"""
+        stub_server.max_active = 0
+        fetcher = URLFetcher(str(tmp_path), per_host_limit=2, allow_private=True)
+        fetch(fetcher, *[url(stub_server, f"/slow-{i}") for i in range(6)])
+        # Under load the two permitted requests do not always overlap
+        assert 1 <= stub_server.max_active <= 2
+        # Semaphores of hosts with nothing in flight are dropped
+        assert fetcher._host_limits == {}
+
+    def test_rejects_oversized_page(self, stub_server, tmp_path):
+        """Test that bodies over the size limit are rejected"""
+        fetcher = URLFetcher(str(tmp_path), max_bytes=1024, allow_private=True)
+        with pytest.raises(FetchError) as error:
+            fetch(fetcher, url(stub_server, "/large"))
+        assert error.value.status_code == 422
+
+    @pytest.mark.parametrize("path,status", [("/missing", 502), ("/pdf", 422)])
+    def test_upstream_errors(self, stub_server, tmp_path, path, status):
+        """Test that failed or unusable responses map to API errors"""
+        with pytest.raises(FetchError) as error:
+            fetch(URLFetcher(str(tmp_path), allow_private=True), url(stub_server, path))
+        assert error.value.status_code == status
+
+    def test_rejects_non_http_urls(self, tmp_path):
+        """Test that only absolute http(s) URLs are accepted"""
+        with pytest.raises(FetchError):
+            fetch(URLFetcher(str(tmp_path), allow_private=True), "file:///etc/passwd")
+
+    def test_rejects_private_hosts_by_default(self, stub_server, tmp_path):
+        """Test that loopback and link-local targets are refused before any request is made"""
+        before = dict(stub_server.requests)
+        for target in (url(stub_server, "/cached"), "http://169.254.169.254/latest/meta-data/"):
+            with pytest.raises(FetchError) as error:
+                fetch(URLFetcher(str(tmp_path)), target)
+            assert error.value.status_code == 422
+        assert stub_server.requests == before
+
+    def test_checks_every_redirect_hop(self, stub_server, tmp_path):
+        """Test that the host check runs for the redirect target as well"""
+        fetcher = URLFetcher(str(tmp_path), allow_private=True)
+        checked = []
+
+        async def check_host(request):
+            checked.append(request.url.path)
+        fetcher._check_host = check_host
+        text, = fetch(fetcher, url(stub_server, "/redirect"))
+        assert "annual budget review" in text
+        assert checked == ["/redirect", "/cached"]
+
+
+@pytest.mark.parametrize("address,public", [
+    ("93.184.216.34", True),
+    ("2606:2800:220:1:248:1893:25c8:1946", True),
+    ("127.0.0.1", False),
+    ("10.0.0.8", False),
+    ("192.168.1.1", False),
+    ("169.254.169.254", False),
+    ("::1", False),
+    ("fe80::1%eth0", False),
+    ("::ffff:127.0.0.1", False),
+    ("0.0.0.0", False),
+])
+def test_is_public(address, public):
+    """Test which resolved addresses the fetcher may connect to"""
+    assert _is_public(address) is public
+
+
+def test_page_cache_is_bounded(tmp_path):
+    """Test that the page cache prunes the oldest entries once over its cap"""
+    cache = PageCache(str(tmp_path), max_entries=10)
+    for i in range(11):
+        cache.put(f"https://example.com/{i}", {"text": str(i), "expires_at": 0})
+    assert len(list(tmp_path.glob("*.json"))) == 9
+    assert cache.get("https://example.com/10")["text"] == "10"
+    # Rewriting an existing entry does not count as a new one
+    cache.put("https://example.com/10", {"text": "again", "expires_at": 0})
+    assert len(list(tmp_path.glob("*.json"))) == 9
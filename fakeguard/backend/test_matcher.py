@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from matcher import PhraseMatcher, load_lexicons
+from detector import FakeNewsDetector
+
+LEXICONS = {
+    "fake": ["breaking", "you won't believe", "secret", "cover-up"],
+    "real": ["report", "reported", "rep", "data", "according to"],
+    "positive": ["good", "best"],
+}
+
+TEXTS = [
+    "breaking: the reported data is a secret cover-up",
+    "according to the metadata, nothing good happened",
+    "you won't believe this best-kept secret report",
+    "nothing to see here",
+    "",
+]
+
+
+def substring_counts(text):
+    """Reference counts using one substring check per phrase"""
+    return {category: sum(1 for p in phrases if p in text) for category, phrases in LEXICONS.items()}
+
+
+class TestPhraseMatcher:
+    """Test the single-pass phrase matcher"""
+
+    def test_count_matches_substring_checks(self):
+        """Test that counts agree with a per-phrase substring scan"""
+        matcher = PhraseMatcher(LEXICONS)
+        for text in TEXTS:
+            assert matcher.count(text) == substring_counts(text)
+
+    def test_overlapping_and_prefix_phrases_are_counted(self):
+        """Test that phrases nested inside longer matches are still found"""
+        matcher = PhraseMatcher(LEXICONS)
+        assert matcher.count("reported")["real"] == 3
+
+    def test_count_many_matches_count(self):
+        """Test that the batched path returns the same counts per text"""
+        matcher = PhraseMatcher(LEXICONS)
+        counts = matcher.count_many(TEXTS)
+        for i, text in enumerate(TEXTS):
+            assert {category: int(counts[category][i]) for category in LEXICONS} == matcher.count(text)
+
+    def test_spans_locate_every_phrase(self):
+        """Test that match spans cover prefix phrases and point at the phrase in each text"""
+        matcher = PhraseMatcher(LEXICONS)
+        matches = [[] for _ in TEXTS]
+        found = matcher.found_many(TEXTS, matches)
+        for text, phrases, text_matches in zip(TEXTS, found, matches):
+            spans = matcher.spans(text_matches)
+            assert {span["phrase"] for span in spans} == {matcher.phrases[i] for i in phrases}
+            for span in spans:
+                assert text[span["start"]:span["end"]] == span["phrase"]
+        spans = matcher.spans(matches[0])
+        assert [(s["phrase"], s["start"]) for s in spans[1:4]] == [("rep", 14), ("report", 14), ("reported", 14)]
+        assert spans[0]["categories"] == ["fake"]
+
+    def test_spans_map_offsets_to_original_text(self):
+        """Test that offsets index the original text when lowercasing changes its length"""
+        matcher = PhraseMatcher(LEXICONS)
+        text = "İİ SECRET data"
+        matches = [[]]
+        matcher.found_many([text.lower()], matches)
+        spans = matcher.spans(matches[0], text)
+        assert [text[s["start"]:s["end"]].lower() for s in spans] == ["secret", "data"]
+
+    def test_empty_lexicon_counts_zero(self):
+        """Test that an empty lexicon never matches"""
+        matcher = PhraseMatcher({"fake": []})
+        assert matcher.count("breaking news") == {"fake": 0}
+
+    def test_newline_phrases_rejected(self):
+        """Test that phrases spanning lines are rejected"""
+        with pytest.raises(ValueError):
+            PhraseMatcher({"fake": ["line\nbreak"]})
+
+
+class TestLexiconLoading:
+    """Test loading lexicons from a config file"""
+
+    def test_default_lexicons_have_detector_categories(self):
+        """Test that the bundled lexicon file covers every detector category"""
+        lexicons = load_lexicons()
+        for category in FakeNewsDetector.LEXICON_CATEGORIES:
+            assert lexicons[category]
+
+    def test_detector_uses_custom_lexicon_file(self, tmp_path):
+        """Test that the detector scores with phrases from a custom file"""
+        path = tmp_path / "lexicons.json"
+        path.write_text(json.dumps({
+            "fake_indicators": ["flat earth"],
+            "real_indicators": [],
+            "positive_words": [],
+            "negative_words": [],
+        }))
+        detector = FakeNewsDetector(lexicon_path=str(path))
+        assert detector.matcher.count("the flat earth society")["fake_indicators"] == 1
+
+    def test_detector_rejects_incomplete_lexicon_file(self, tmp_path):
+        """Test that missing categories are reported at startup"""
+        path = tmp_path / "lexicons.json"
+        path.write_text(json.dumps({"fake_indicators": ["flat earth"]}))
+        with pytest.raises(ValueError):
+            FakeNewsDetector(lexicon_path=str(path))
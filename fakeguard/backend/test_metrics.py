@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+from metrics import LatencyHistogram, LatencyRegistry
+
+
+class TestLatencyHistogram:
+    """Test the rolling-window latency histogram"""
+
+    def test_quantiles_fall_in_expected_buckets(self):
+        """Test that percentiles land in the buckets of the recorded values"""
+        histogram = LatencyHistogram(buckets=(0.001, 0.01, 0.1, 1.0))
+        for _ in range(90):
+            histogram.observe(0.005)
+        for _ in range(10):
+            histogram.observe(0.5)
+        summary = histogram.summary()
+        assert summary["count"] == 100
+        assert 1 < summary["p50_ms"] <= 10
+        assert 100 < summary["p99_ms"] <= 1000
+        assert summary["mean_ms"] == pytest.approx(54.5)
+
+    def test_values_beyond_last_bucket_report_last_bound(self):
+        """Test that overflow values are clamped to the largest bucket"""
+        histogram = LatencyHistogram(buckets=(0.001, 0.01))
+        histogram.observe(30.0)
+        assert histogram.summary()["p99_ms"] == 10.0
+
+    def test_empty_histogram_summary(self):
+        """Test that an empty histogram reports zeros"""
+        summary = LatencyHistogram().summary()
+        assert summary["count"] == 0
+        assert summary["p50_ms"] == 0.0
+
+    def test_threads_record_without_losing_counts(self):
+        """Test that concurrent writers each keep their own counts"""
+        histogram = LatencyHistogram()
+
+        def record():
+            for _ in range(1000):
+                histogram.observe(0.002)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert histogram.summary()["count"] == 4000
+        assert sum(histogram.cumulative()[0]) == 4000
+
+
+class TestPrometheusRendering:
+    """Test Prometheus text exposition"""
+
+    def test_render_includes_buckets_and_counters(self):
+        """Test that histograms are rendered as cumulative buckets"""
+        registry = LatencyRegistry()
+        registry.histogram("stage", "classify").observe(0.0003)
+        registry.histogram("stage", "classify").observe(0.2)
+        text = registry.render_prometheus({"fakeguard_predictions_total": ("Predictions", "counter", 2)})
+        assert "fakeguard_predictions_total 2" in text
+        assert 'fakeguard_stage_duration_seconds_bucket{stage="classify",le="0.0005"} 1' in text
+        assert 'fakeguard_stage_duration_seconds_bucket{stage="classify",le="+Inf"} 2' in text
+        assert 'fakeguard_stage_duration_seconds_count{stage="classify"} 2' in text
@@ -0,0 +1,119 @@
+import pytest
+from neardup import NearDuplicateIndex
+
+STORY = (
+    "Officials confirmed on Tuesday that the city council approved the new budget "
+    "for public schools after a long debate, allocating additional funds to teacher "
+    "salaries, classroom repairs and after-school programs across every district. "
+    "The mayor said the plan would be reviewed again next spring once enrollment "
+    "figures are published, and parents will be invited to comment at open meetings "
+    "held in libraries and community centers throughout the summer months"
+)
+REWRITE = STORY.replace("Tuesday", "Wednesday")
+UNRELATED = (
+    "Scientists shocked as miracle cure discovered that doctors do not want you to know, "
+    "share this before it gets deleted by the mainstream media conspiracy tonight"
+)
+VERDICT = {"prediction": "REAL", "confidence": 81.4, "sentiment": "neutral"}
+
+
+def add(index, text, verdict=VERDICT):
+    index.insert(index.signature(text), verdict)
+
+
+class TestNearDuplicateIndex:
+    """Test the MinHash/LSH near-duplicate index"""
+
+    def test_rewrite_reuses_verdict(self):
+        """Test that a lightly edited text takes over the stored verdict"""
+        index = NearDuplicateIndex(capacity=100)
+        add(index, STORY)
+        match = index.lookup(index.signature(REWRITE))
+        assert match is not None
+        assert {k: match[k] for k in VERDICT} == VERDICT
+        assert 0.8 <= match["similarity"] < 1.0
+
+    def test_different_emphasis_misses(self):
+        """Test that capitals and exclamation marks, which shingles ignore, prevent reuse"""
+        index = NearDuplicateIndex(capacity=100)
+        add(index, STORY)
+        assert index.lookup(index.signature(STORY.upper())) is None
+        assert index.lookup(index.signature(STORY + "!!!!!!")) is None
+        assert index.lookup(index.signature(STORY + ".")) is not None
+
+    def test_unrelated_text_misses(self):
+        """Test that a different story is not matched"""
+        index = NearDuplicateIndex(capacity=100)
+        add(index, STORY)
+        assert index.lookup(index.signature(UNRELATED)) is None
+        assert index.lookup(index.signature("")) is None
+
+    def test_threshold_is_respected(self):
+        """Test that candidates below the Jaccard threshold are rejected"""
+        index = NearDuplicateIndex(capacity=100, threshold=1.0)
+        add(index, STORY)
+        assert index.lookup(index.signature(REWRITE)) is None
+        assert index.lookup(index.signature(STORY))["similarity"] == 1.0
+
+    def test_oldest_entry_replaced_when_full(self):
+        """Test that the index stays bounded and forgets its oldest entries"""
+        index = NearDuplicateIndex(capacity=2)
+        add(index, STORY)
+        add(index, UNRELATED, dict(VERDICT, prediction="FAKE"))
+        add(index, "a completely different third article about football results this weekend")
+        assert index.size == 2
+        assert index.lookup(index.signature(STORY)) is None
+        assert index.lookup(index.signature(UNRELATED))["prediction"] == "FAKE"
+
+    def test_stats_report_short_circuits(self):
+        """Test that lookups, short-circuits and lookup latency are reported"""
+        index = NearDuplicateIndex(capacity=100)
+        add(index, STORY)
+        index.lookup_many([REWRITE, UNRELATED])
+        stats = index.stats()
+        assert stats["size"] == 1
+        assert stats["lookups"] == 2
+        assert stats["short_circuits"] == 1
+        assert stats["short_circuit_rate"] == 50.0
+        assert stats["lookup_latency"]["count"] == 2
+
+    def test_persisted_index_survives_reopen(self, tmp_path):
+        """Test that a file-backed index is reloaded and shared between instances"""
+        path = str(tmp_path / "neardup.idx")
+        first = NearDuplicateIndex(capacity=100, path=path, model_version="1.0.0")
+        add(first, STORY)
+        second = NearDuplicateIndex(capacity=100, path=path, model_version="1.0.0")
+        assert second.size == 1
+        assert second.lookup(second.signature(REWRITE))["prediction"] == "REAL"
+        # Entries added by another instance are picked up on the next lookup
+        add(second, UNRELATED, dict(VERDICT, prediction="FAKE"))
+        assert first.lookup(first.signature(UNRELATED))["prediction"] == "FAKE"
+
+    def test_persisted_index_reset_for_new_model_version(self, tmp_path):
+        """Test that verdicts from another model version are discarded"""
+        path = str(tmp_path / "neardup.idx")
+        add(NearDuplicateIndex(capacity=100, path=path, model_version="1.0.0"), STORY)
+        index = NearDuplicateIndex(capacity=100, path=path, model_version="2.0.0")
+        assert index.size == 0
+        assert index.lookup(index.signature(STORY)) is None
+
+    def test_model_swap_starts_over(self, tmp_path):
+        """Test that verdicts of a replaced model are neither reused nor extended by old workers"""
+        path = str(tmp_path / "neardup.idx")
+        swapped = NearDuplicateIndex(capacity=100, path=path, model_version="1.0.0")
+        lagging = NearDuplicateIndex(capacity=100, path=path, model_version="1.0.0")
+        add(swapped, STORY)
+        swapped.set_model_version("2.0.0")
+        assert swapped.lookup(swapped.signature(STORY)) is None
+        # A worker that has not swapped yet skips the index instead of mixing versions
+        add(lagging, UNRELATED)
+        assert lagging.lookup(lagging.signature(STORY)) is None
+        assert swapped.size == 0
+        lagging.set_model_version("2.0.0")
+        add(lagging, STORY)
+        assert swapped.lookup(swapped.signature(REWRITE))["prediction"] == "REAL"
+
+    def test_bands_must_divide_permutations(self):
+        """Test that an uneven band split is rejected"""
+        with pytest.raises(ValueError):
+            NearDuplicateIndex(num_perm=100, bands=16)
@@ -0,0 +1,131 @@
+import pytest
+
+from ratelimit import ANONYMOUS, KEYED, PREMIUM, LoadShedder, TokenBucketLimiter, client_identity
+
+
+class Clock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+class TestTokenBucketLimiter:
+    """Test per-client token buckets"""
+
+    def test_burst_then_refill(self, clock):
+        """Test that a client gets its burst, then tokens at the configured rate"""
+        limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+        assert [limiter.acquire("a")[0] for _ in range(4)] == [True, True, True, False]
+        allowed, wait = limiter.acquire("a")
+        assert not allowed and wait == pytest.approx(0.5)
+        clock.now += 0.5
+        assert limiter.acquire("a") == (True, 0.0)
+        # Refill is capped at the burst
+        clock.now += 60
+        assert [limiter.acquire("a")[0] for _ in range(4)] == [True, True, True, False]
+        assert limiter.stats()["limited"] == 3
+
+    def test_clients_are_independent(self, clock):
+        """Test that one client's usage does not affect another's"""
+        limiter = TokenBucketLimiter(rate=1, burst=1, clock=clock)
+        assert limiter.acquire("a")[0]
+        assert not limiter.acquire("a")[0]
+        assert limiter.acquire("b")[0]
+
+    def test_idle_clients_evicted(self, clock):
+        """Test that clients idle for longer than idle_seconds are dropped"""
+        limiter = TokenBucketLimiter(rate=1, burst=1, idle_seconds=10, clock=clock)
+        limiter.acquire("a")
+        clock.now += 5
+        limiter.acquire("b")
+        clock.now += 6
+        limiter.acquire("c")
+        assert len(limiter) == 2
+        assert limiter.stats()["evicted"] == 1
+
+    def test_max_clients_bounds_memory(self, clock):
+        """Test that the least recently seen client is dropped beyond max_clients"""
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_clients=3, clock=clock)
+        for key in ["a", "b", "c"]:
+            limiter.acquire(key)
+        clock.now += 1
+        limiter.acquire("a")
+        limiter.acquire("d")
+        assert len(limiter) == 3
+        assert "b" not in limiter._buckets and "a" in limiter._buckets
+
+    def test_zero_rate_disables(self, clock):
+        """Test that a rate of 0 admits everything without tracking clients"""
+        limiter = TokenBucketLimiter(rate=0, burst=1, clock=clock)
+        assert all(limiter.acquire("a")[0] for _ in range(100))
+        assert len(limiter) == 0
+
+
+class TestLoadShedder:
+    """Test priority-aware shedding on queue delay"""
+
+    def run_interval(self, shedder, clock, delays):
+        for delay in delays:
+            shedder.observe(delay)
+        clock.now += shedder.interval
+
+    def test_standing_delay_sheds_by_priority(self, clock):
+        """Test that anonymous traffic is shed first and premium never"""
+        shedder = LoadShedder(target_ms=50, interval_ms=100, clock=clock)
+        self.run_interval(shedder, clock, [0.08, 0.09])
+        assert not shedder.admit(ANONYMOUS)
+        assert shedder.admit(KEYED)
+        assert shedder.admit(PREMIUM)
+        self.run_interval(shedder, clock, [0.2, 0.3])
+        assert not shedder.admit(KEYED)
+        assert shedder.admit(PREMIUM)
+        assert shedder.stats()["shed"] == {ANONYMOUS: 1, KEYED: 1, PREMIUM: 0}
+
+    def test_draining_burst_not_shed(self, clock):
+        """Test that an interval in which some call did not wait does not count as a standing queue"""
+        shedder = LoadShedder(target_ms=50, interval_ms=100, clock=clock)
+        self.run_interval(shedder, clock, [0.5, 0.001, 0.3])
+        assert shedder.admit(ANONYMOUS)
+
+    def test_recovers_without_samples(self, clock):
+        """Test that the delay resets once an interval passes without queueing samples"""
+        shedder = LoadShedder(target_ms=50, interval_ms=100, clock=clock)
+        self.run_interval(shedder, clock, [0.2])
+        assert not shedder.admit(ANONYMOUS)
+        clock.now += shedder.interval
+        assert shedder.admit(ANONYMOUS)
+        assert shedder.stats()["queue_delay_ms"] == 0
+
+
+class TestClientIdentity:
+    """Test how requests map to tiers and buckets"""
+
+    def scope(self, headers=(), client=("10.0.0.1", 1234)):
+        return {"headers": [(name.encode(), value.encode()) for name, value in headers], "client": client}
+
+    def test_tiers(self):
+        """Test anonymous, keyed and premium clients"""
+        assert client_identity(self.scope()) == (ANONYMOUS, "ip:10.0.0.1")
+        assert client_identity(self.scope([("x-api-key", "abc")]), api_keys={"abc"}) == (KEYED, "key:abc")
+        assert client_identity(self.scope([("x-api-key", "vip")]), premium_keys={"vip"}) == (PREMIUM, "key:vip")
+
+    def test_unknown_key_limited_by_address(self):
+        """Test that a key outside the configured sets does not get a bucket of its own"""
+        for key in ("random-1", "random-2"):
+            scope = self.scope([("x-api-key", key)])
+            assert client_identity(scope, api_keys={"abc"}, premium_keys={"vip"}) == (ANONYMOUS, "ip:10.0.0.1")
+
+    def test_forwarded_for_only_when_trusted(self):
+        """Test that X-Forwarded-For is ignored unless the proxy is trusted"""
+        scope = self.scope([("x-forwarded-for", "203.0.113.7, 10.0.0.2")])
+        assert client_identity(scope) == (ANONYMOUS, "ip:10.0.0.1")
+        assert client_identity(scope, trust_forwarded=True) == (ANONYMOUS, "ip:203.0.113.7")
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from backends import save_artifact, train_linear_model
+from detector import FakeNewsDetector
+from registry import ModelRegistry, find_artifacts
+
+FAKE = [
+    "Shocking secret cure they don't want you to know about, click now!",
+    "You won't believe this miracle trick doctors hate, shocking secret revealed",
+]
+REAL = [
+    "According to the official report, the data shows steady economic growth.",
+    "Researchers at the university reported the study results in a journal.",
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    return train_linear_model(FAKE + REAL, [1] * len(FAKE) + [0] * len(REAL), n_features=2 ** 10)
+
+
+def publish(directory, name, version, model, age=0):
+    """Write an artifact the way a deployment would: temporary name, then rename"""
+    weights, idf, bias = model
+    temporary = directory / f".{name}"
+    save_artifact(temporary, weights, idf, bias, {"version": version})
+    path = directory / name
+    os.replace(temporary, path)
+    stamp = 1_700_000_000 + age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+class TestModelRegistry:
+    """Test hot reload and shadow scoring of model artifacts"""
+
+    def test_default_without_artifacts(self, tmp_path):
+        """Test that the default backend is used until an artifact appears"""
+        registry = ModelRegistry(str(tmp_path), default=FakeNewsDetector)
+        assert isinstance(registry.active, FakeNewsDetector)
+        assert registry.check() is False
+
+    def test_loads_newest_artifact(self, tmp_path, model):
+        """Test that the newest artifact is active at construction"""
+        publish(tmp_path, "a.npz", "v1", model, age=0)
+        publish(tmp_path, "b.npz", "v2", model, age=10)
+        (tmp_path / "c.npz.tmp").write_bytes(b"partial")
+        assert [p.name for p in find_artifacts(tmp_path)] == ["a.npz", "b.npz"]
+        registry = ModelRegistry(str(tmp_path))
+        assert registry.active.model_version == "v2"
+
+    def test_new_artifact_swapped_in(self, tmp_path, model):
+        """Test that a newly published artifact replaces the active model and notifies listeners"""
+        publish(tmp_path, "a.npz", "v1", model, age=0)
+        registry = ModelRegistry(str(tmp_path))
+        previous = registry.active
+        swapped = []
+        registry.add_listener(swapped.append)
+        publish(tmp_path, "b.npz", "v2", model, age=10)
+        assert registry.check() is True
+        assert registry.active.model_version == "v2"
+        assert swapped == [registry.active]
+        # A request still holding the previous model can finish with it
+        assert previous.predict(REAL[0])["prediction"] in ("REAL", "FAKE")
+        assert registry.stats()["swaps"] == 1
+
+    def test_broken_artifact_keeps_active_model(self, tmp_path, model):
+        """Test that a failed load is reported once and leaves the active model in place"""
+        publish(tmp_path, "a.npz", "v1", model, age=0)
+        registry = ModelRegistry(str(tmp_path))
+        broken = tmp_path / "b.npz"
+        broken.write_bytes(b"not a model")
+        os.utime(broken, (1_700_000_010, 1_700_000_010))
+        assert registry.check() is False
+        assert registry.check() is False
+        stats = registry.stats()
+        assert stats["active_version"] == "v1"
+        assert stats["failures"] == 1
+        assert "b.npz" in stats["last_error"]
+
+    def test_shadow_candidate_until_promoted(self, tmp_path, model):
+        """Test that in shadow mode a new artifact is compared, not served, until promoted"""
+        publish(tmp_path, "a.npz", "v1", model, age=0)
+        registry = ModelRegistry(str(tmp_path), shadow_fraction=1.0)
+        publish(tmp_path, "b.npz", "v2", model, age=10)
+        registry.check()
+        assert registry.active.model_version == "v1"
+        candidate = registry.candidate
+        assert candidate.model_version == "v2"
+        assert registry.sample(3) == [0, 1, 2]
+
+        active = registry.active.predict_many(FAKE + REAL)
+        shadow = candidate.predict_many(FAKE + REAL)
+        registry.record_shadow(candidate, active, [0.001] * len(active), shadow)
+        registry.record_shadow(candidate, active[:1], [0.001], None)
+        summary = registry.stats()["shadow"]
+        assert summary["candidate_version"] == "v2"
+        assert summary["compared"] == 4
+        assert summary["skipped"] == 1
+        # Same weights, so the candidate agrees everywhere
+        assert summary["agreement_rate"] == 100.0
+        assert summary["active_mean_ms"] == 1.0
+
+        registry.promote()
+        assert registry.active is candidate
+        assert registry.candidate is None
+        assert registry.sample(3) == []
+        with pytest.raises(LookupError):
+            registry.promote()
@@ -0,0 +1,97 @@
+import json
+from datetime import datetime
+
+from responses import EncodedResponse, PredictionEncoder, ResponseCache, UTCTimestamp
+
+
+class Clock:
+    """Manually advanced wall clock"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestPredictionEncoder:
+    """Test the precompiled /api/predict encoder"""
+
+    def test_matches_json_encoding(self):
+        """Test that the encoded body is the JSON of the same fields"""
+        encoder = PredictionEncoder(UTCTimestamp(Clock(1_700_000_000.75)))
+        body = json.loads(encoder.encode("FAKE", 87.3, "negative"))
+        assert body == {
+            "prediction": "FAKE",
+            "confidence": "87.3",
+            "sentiment": "negative",
+            "timestamp": "2023-11-14T22:13:20",
+        }
+        assert list(body) == ["prediction", "confidence", "sentiment", "timestamp"]
+
+    def test_labels_are_escaped(self):
+        """Test that labels needing escapes still produce valid JSON"""
+        encoder = PredictionEncoder()
+        body = json.loads(encoder.encode('odd "label"', 50, "café\n"))
+        assert body["prediction"] == 'odd "label"'
+        assert body["sentiment"] == "café\n"
+        assert body["confidence"] == "50"
+
+    def test_response_is_json(self):
+        """Test that the ready-made response carries the JSON content type"""
+        response = PredictionEncoder().response("REAL", 64.0, "neutral")
+        assert response.media_type == "application/json"
+        assert json.loads(response.body)["confidence"] == "64.0"
+
+
+class TestUTCTimestamp:
+    """Test the per-second timestamp cache"""
+
+    def test_formatted_once_per_second(self):
+        """Test that the string is reused within a second and refreshed after it"""
+        clock = Clock(1_700_000_000.1)
+        timestamp = UTCTimestamp(clock)
+        first = timestamp()
+        clock.now += 0.5
+        assert timestamp() is first
+        clock.now += 0.5
+        assert timestamp() == b"2023-11-14T22:13:21"
+        assert datetime.fromisoformat(timestamp().decode())
+
+
+class TestResponseCache:
+    """Test the pre-encoded response cache of read-only endpoints"""
+
+    def test_rebuilt_when_key_changes(self):
+        """Test that a response is encoded once per key"""
+        cache = ResponseCache()
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"version": len(calls)}
+
+        first = cache.get("info", build, key="v1")
+        assert cache.get("info", build, key="v1") is first
+        second = cache.get("info", build, key="v2")
+        assert json.loads(second.body) == {"version": 2}
+        assert second.etag != first.etag
+        assert cache.stats() == {"entries": 1, "hits": 1, "builds": 2}
+
+    def test_rebuilt_after_max_age(self):
+        """Test that a response with a max age is shared until it expires"""
+        clock = Clock(100.0)
+        cache = ResponseCache(clock)
+        first = cache.get("stats", lambda: {"now": clock.now}, max_age=1.0)
+        clock.now += 0.9
+        assert cache.get("stats", lambda: {"now": clock.now}, max_age=1.0) is first
+        clock.now += 0.1
+        assert json.loads(cache.get("stats", lambda: {"now": clock.now}, max_age=1.0).body) == {"now": 101.0}
+
+    def test_conditional_response(self):
+        """Test that a matching If-None-Match gets an empty 304"""
+        encoded = EncodedResponse({"service": "FakeGuard API", "name": "café"})
+        assert json.loads(encoded.body)["name"] == "café"
+        assert encoded.response().status_code == 200
+        assert encoded.response(f'"x", {encoded.etag}').status_code == 304
+        assert encoded.response('"x"').body == encoded.body
@@ -0,0 +1,103 @@
+import csv
+import json
+import mmap
+
+import pytest
+from score_files import main, _record_boundary, pq
+
+TEXT = "According to the official report, the data shows steady growth."
+
+
+def run(tmp_path, *inputs, extra=()):
+    args = [str(path) for path in inputs] + ["--output-dir", str(tmp_path / "out"), "--workers", "2"]
+    assert main(args + ["--chunk-bytes", "256", *extra]) == 0
+
+
+class TestScoreFiles:
+    """Test the offline batch scorer"""
+
+    def test_scores_csv_with_multiline_fields(self, tmp_path):
+        """Test that quoted newlines do not split a CSV record"""
+        path = tmp_path / "articles.csv"
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "text"])
+            for i in range(40):
+                writer.writerow([f"a{i}", f'{TEXT}\nSecond "quoted" line {i}.'])
+            writer.writerow(["short", "Too short"])
+        run(tmp_path, path)
+        with open(tmp_path / "out" / "articles.scored.csv", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["id"] for row in rows] == [f"a{i}" for i in range(40)] + ["short"]
+        assert all(row["prediction"] in ("REAL", "FAKE") for row in rows[:40])
+        assert rows[40]["error"]
+
+    def test_scores_jsonl_directory(self, tmp_path):
+        """Test that a directory of JSONL files is scored file by file"""
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        for name in ("a", "b"):
+            lines = [json.dumps({"id": f"{name}{i}", "text": f"{TEXT} {i}"}) for i in range(30)]
+            (corpus / f"{name}.jsonl").write_text("\n".join(lines) + "\n")
+        run(tmp_path, corpus)
+        for name in ("a", "b"):
+            lines = (tmp_path / "out" / f"{name}.scored.jsonl").read_text().splitlines()
+            results = [json.loads(line) for line in lines]
+            assert [r["id"] for r in results] == [f"{name}{i}" for i in range(30)]
+
+    def test_resume_discards_output_after_checkpoint(self, tmp_path):
+        """Test that a rerun resumes from the checkpoint instead of rescoring"""
+        path = tmp_path / "articles.jsonl"
+        path.write_text("\n".join(json.dumps({"id": i, "text": f"{TEXT} {i}"}) for i in range(50)) + "\n")
+        run(tmp_path, path)
+        output = tmp_path / "out" / "articles.scored.jsonl"
+        checkpoint_path = tmp_path / "out" / "articles.scored.jsonl.checkpoint.json"
+        expected = output.read_text()
+
+        # Simulate a crash: the last chunk was written but never checkpointed
+        checkpoint = json.loads(checkpoint_path.read_text())
+        lines = expected.splitlines(keepends=True)
+        kept = "".join(lines[:20])
+        offset = len("".join(path.read_text().splitlines(keepends=True)[:20]).encode())
+        checkpoint.update(complete=False, input_offset=offset, output_size=len(kept.encode()), documents=20)
+        checkpoint_path.write_text(json.dumps(checkpoint))
+        with open(output, "a") as f:
+            f.write('{"partial":')
+
+        run(tmp_path, path)
+        assert output.read_text() == expected
+        assert json.loads(checkpoint_path.read_text())["documents"] == 50
+
+    def test_csv_boundary_skips_quoted_newlines(self, tmp_path):
+        """Test that record boundaries respect CSV quoting"""
+        path = tmp_path / "quoted.csv"
+        path.write_bytes(b'id,text\n1,"a\nb"\n2,c\n')
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            assert _record_boundary(mm, 8, 8, "csv") == 16
+            assert _record_boundary(mm, 8, 8, "jsonl") == 13
+
+    @pytest.mark.skipif(pq is None, reason="Parquet input needs pyarrow")
+    def test_scores_parquet_by_row_group(self, tmp_path):
+        """Test that each row group becomes a part file and a missing part is rescored on resume"""
+        import pyarrow as pa
+
+        path = tmp_path / "articles.parquet"
+        ids = [f"p{i}" for i in range(25)]
+        texts = [f"{TEXT} {i}" for i in range(24)] + ["Too short"]
+        pq.write_table(pa.table({"id": ids, "text": texts}), path, row_group_size=10)
+        run(tmp_path, path)
+
+        output = tmp_path / "out" / "articles.scored.parquet"
+        parts = sorted(output.glob("part-*.parquet"))
+        assert [part.name for part in parts] == ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"]
+        rows = [row for part in parts for row in pq.read_table(part).to_pylist()]
+        assert [row["id"] for row in rows] == ids
+        assert all(row["prediction"] in ("REAL", "FAKE") for row in rows[:24])
+        assert rows[24]["error"]
+
+        parts[1].unlink()
+        checkpoint = output.with_name(output.name + ".checkpoint.json")
+        state = json.loads(checkpoint.read_text())
+        checkpoint.write_text(json.dumps(dict(state, complete=False)))
+        run(tmp_path, path)
+        assert pq.read_table(parts[1]).column("id").to_pylist() == ids[10:20]
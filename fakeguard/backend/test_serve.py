@@ -0,0 +1,41 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from benchmark import _free_port
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork serving needs os.fork")
+
+
+class TestPreforkServer:
+    """Test the pre-fork launcher end to end"""
+
+    def test_workers_share_socket_and_stop_cleanly(self):
+        """Test that forked workers become ready on one port and exit on SIGTERM"""
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", "2", "--port", str(port), "--host", "127.0.0.1"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            pids = set()
+            deadline = time.monotonic() + 30
+            while len(pids) < 2 and time.monotonic() < deadline:
+                try:
+                    response = httpx.get(f"http://127.0.0.1:{port}/api/ready", timeout=1)
+                    if response.status_code == 200:
+                        pids.add(response.json()["pid"])
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            assert len(pids) == 2
+            assert process.pid not in pids
+        finally:
+            process.send_signal(signal.SIGTERM)
+            assert process.wait(timeout=30) == 0
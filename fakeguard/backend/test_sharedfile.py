@@ -0,0 +1,49 @@
+"""
+Tests for shared memory-mapped file setup
+"""
+import pytest
+from sharedfile import fcntl, file_lock, open_shared
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason="shared files need fcntl")
+
+
+class TestOpenShared:
+    """Test creating, reusing and resetting shared files"""
+
+    def test_creates_zeroed_file(self, tmp_path):
+        """Test that a new file gets the header followed by zeros"""
+        path = tmp_path / "shared.bin"
+        f, mapped = open_shared(str(path), 64, b"HEAD", lambda data: True)
+        try:
+            assert mapped[:4] == b"HEAD"
+            assert mapped[4:] == bytes(60)
+        finally:
+            mapped.close()
+            f.close()
+        assert path.stat().st_size == 64
+
+    def test_reuses_or_resets_existing_file(self, tmp_path):
+        """Test that contents survive only when the file is accepted"""
+        path = tmp_path / "shared.bin"
+        path.write_bytes(b"HEAD" + b"\x07" * 60)
+        for reusable, expected in ((True, b"\x07"), (False, b"\x00")):
+            f, mapped = open_shared(str(path), 64, b"HEAD", lambda data: reusable)
+            assert mapped[10:11] == expected
+            mapped.close()
+            f.close()
+
+    def test_wrong_size_is_reset(self, tmp_path):
+        """Test that a file of another size is reset without asking"""
+        path = tmp_path / "shared.bin"
+        path.write_bytes(b"HEAD" + b"\x07" * 10)
+        seen = []
+        f, mapped = open_shared(str(path), 64, b"HEAD", seen.append)
+        assert seen == []
+        assert mapped[4:] == bytes(60)
+        mapped.close()
+        f.close()
+
+    def test_file_lock_without_file(self):
+        """Test that the lock is a no-op for in-memory data"""
+        with file_lock(None):
+            pass
@@ -0,0 +1,87 @@
+"""
+Tests for the buffered prediction sink
+"""
+import time
+
+import pytest
+from sink import BufferedSink
+
+
+class ListSink(BufferedSink):
+    """Collects written batches in memory"""
+
+    def __init__(self, capacity=65536, flush_seconds=60, fail=None):
+        super().__init__(capacity, flush_seconds)
+        self.batches = []
+        self.fail = fail
+        self.closed = False
+
+    @property
+    def enabled(self):
+        return True
+
+    def _write(self, records):
+        if self.fail:
+            raise self.fail
+        self.batches.append(records)
+
+    def _close(self):
+        self.closed = True
+
+
+class TestBufferedSink:
+    """Test buffering, dropping and the writer thread"""
+
+    def test_drops_when_full(self):
+        """Test that records beyond capacity are dropped and counted"""
+        sink = ListSink(capacity=3)
+        sink._thread = object()  # keep the writer from draining the buffer
+        for i in range(5):
+            sink._append((i,))
+        assert sink.dropped == 2
+        sink.flush()
+        assert sink.batches == [[(0,), (1,), (2,)]]
+        assert sink.written == 3
+
+    def test_stop_writes_buffered_records(self):
+        """Test that stop flushes everything in one batch and closes the sink"""
+        sink = ListSink()
+        for i in range(10):
+            sink._append((i,))
+        sink.stop()
+        assert [record for batch in sink.batches for record in batch] == [(i,) for i in range(10)]
+        assert sink.written == 10
+        assert sink.closed
+
+    def test_write_errors_are_logged(self, caplog):
+        """Test that a failed write is logged and does not stop the writer thread"""
+        sink = ListSink(fail=OSError("disk full"))
+        sink._append((1,))
+        sink.stop()
+        assert sink.written == 0
+        assert sink.failed == 1
+        assert "write failed: disk full" in caplog.text
+        assert sink.closed
+
+    def test_unexpected_errors_keep_writer_running(self, caplog):
+        """Test that any exception is logged and counted, and later batches are still written"""
+        sink = ListSink(fail=ValueError("bad label"))
+        sink._append((1,))
+        sink._append((2,))
+        sink._wakeup.set()
+        deadline = time.monotonic() + 5
+        while sink.failed < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sink.failed == 2
+        assert sink._thread.is_alive()
+        sink.fail = None
+        sink._append((3,))
+        sink.stop()
+        assert sink.batches == [[(3,)]]
+        assert "ValueError: bad label" in caplog.text
+
+    def test_is_abstract(self):
+        """Test that a sink must say whether it is enabled and how it writes"""
+        with pytest.raises(TypeError):
+            BufferedSink()
+
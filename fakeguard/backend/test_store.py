@@ -0,0 +1,137 @@
+import sqlite3
+
+import pytest
+from store import PredictionStore, text_hash
+
+DAY = 86400
+# 2025-01-27 00:00:00 UTC
+MIDNIGHT = 1737936000
+
+
+class Clock:
+    """Manually set wall clock"""
+
+    def __init__(self):
+        self.now = MIDNIGHT
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = PredictionStore(str(tmp_path / "predictions.db"), flush_seconds=60, clock=clock)
+    yield store
+    store.stop()
+
+
+def write(store, clock, offsets, prediction="FAKE", text="some article text"):
+    for offset in offsets:
+        clock.now = MIDNIGHT + offset
+        store.record("predict", prediction, 80.5, "neutral", text, "1.0.0")
+
+
+class TestPredictionStore:
+    """Test the batched SQLite prediction store"""
+
+    def test_records_round_trip(self, store, clock):
+        """Test that buffered records are committed and read back newest first"""
+        write(store, clock, [10, 20], text="first text")
+        write(store, clock, [30], prediction="REAL", text="second text")
+        store.flush()
+        records = store.recent()
+        assert [r["prediction"] for r in records] == ["REAL", "FAKE", "FAKE"]
+        assert records[0] == {
+            "ts": MIDNIGHT + 30, "endpoint": "predict", "prediction": "REAL", "confidence": 80.5,
+            "sentiment": "neutral", "text_length": 11, "text_hash": text_hash("second text"), "model_version": "1.0.0",
+        }
+        assert store.stats()["written"] == 3
+
+    def test_filters(self, store, clock):
+        """Test filtering by time range, verdict and text hash"""
+        write(store, clock, [10, 20], text="first text")
+        write(store, clock, [30], prediction="REAL", text="second text")
+        store.flush()
+        assert [r["ts"] for r in store.recent(start=MIDNIGHT + 15, end=MIDNIGHT + 30)] == [MIDNIGHT + 20]
+        assert len(store.recent(prediction="FAKE")) == 2
+        assert [r["prediction"] for r in store.recent(text_hash=text_hash("second text"))] == ["REAL"]
+        assert len(store.recent(limit=1)) == 1
+
+    def test_aggregates_per_bucket(self, store, clock):
+        """Test counts per verdict per bucket, with empty buckets filled in"""
+        write(store, clock, [0, 59, 3600, 3 * 3600 + 1])
+        write(store, clock, [60, 7200], prediction="REAL")
+        store.flush()
+        buckets = store.aggregate(MIDNIGHT, MIDNIGHT + 4 * 3600, 3600)
+        assert buckets == [
+            {"start": MIDNIGHT, "counts": {"REAL": 1, "FAKE": 2}},
+            {"start": MIDNIGHT + 3600, "counts": {"REAL": 0, "FAKE": 1}},
+            {"start": MIDNIGHT + 7200, "counts": {"REAL": 1, "FAKE": 0}},
+            {"start": MIDNIGHT + 3 * 3600, "counts": {"REAL": 0, "FAKE": 1}},
+        ]
+        # Minute rollups summed into 2-minute buckets
+        assert store.aggregate(MIDNIGHT, MIDNIGHT + 120, 120) == [{"start": MIDNIGHT, "counts": {"REAL": 1, "FAKE": 2}}]
+        assert store.aggregate(MIDNIGHT - DAY, MIDNIGHT + DAY, DAY)[1]["counts"] == {"REAL": 2, "FAKE": 4}
+
+    def test_aggregates_read_rollups_not_predictions(self, store, clock):
+        """Test that aggregates are answered without scanning stored predictions"""
+        write(store, clock, [0, 30, 90])
+        store.flush()
+        with sqlite3.connect(store.path) as connection:
+            connection.execute("DELETE FROM predictions")
+        assert store.aggregate(MIDNIGHT, MIDNIGHT + 120, 60)[0]["counts"]["FAKE"] == 2
+
+    def test_rollups_accumulate_across_batches(self, store, clock):
+        """Test that later batches add to existing rollup rows"""
+        write(store, clock, [0])
+        store.flush()
+        write(store, clock, [1, 2])
+        store.flush()
+        assert store.aggregate(MIDNIGHT, MIDNIGHT + 60, 60)[0]["counts"]["FAKE"] == 3
+
+    def test_queries_use_indexes(self, store, clock):
+        """Test that history queries search indexes instead of scanning the table"""
+        write(store, clock, [0])
+        store.flush()
+        connection = store._reader()
+        for where, parameters in [("ts >= ?", [0]), ("prediction = ?", ["FAKE"]), ("text_hash = ?", [b"x"])]:
+            plan = connection.execute(f"EXPLAIN QUERY PLAN SELECT * FROM predictions WHERE {where}", parameters).fetchall()
+            assert "USING INDEX" in plan[0][-1]
+
+    def test_invalid_aggregates_rejected(self, store):
+        """Test bucket sizes without a rollup and oversized ranges"""
+        with pytest.raises(ValueError):
+            store.aggregate(MIDNIGHT, MIDNIGHT + 3600, 90)
+        with pytest.raises(ValueError):
+            store.aggregate(MIDNIGHT, MIDNIGHT + 2000 * 60, 60)
+        with pytest.raises(ValueError):
+            store.aggregate(MIDNIGHT, MIDNIGHT, 60)
+
+    def test_committed_on_stop(self, store, clock):
+        """Test that stopping the writer commits what is still buffered"""
+        write(store, clock, [0, 1])
+        store.stop()
+        assert len(store.recent()) == 2
+
+    def test_overflow_drops_instead_of_blocking(self, tmp_path):
+        """Test that records beyond the buffer capacity are counted as dropped"""
+        store = PredictionStore(str(tmp_path / "predictions.db"), capacity=10)
+        # Hold the writer off so the buffer can only fill up
+        store._thread = object()
+        for _ in range(25):
+            store.record("predict", "FAKE", 80.5, "neutral", "text")
+        assert store.stats()["buffered"] == 10
+        assert store.dropped == 15
+
+    def test_disabled_without_path(self):
+        """Test that the store is a no-op without a path"""
+        store = PredictionStore(None)
+        store.record("predict", "FAKE", 80.5, "neutral", "text")
+        assert store.stats() == dict(store.stats(), enabled=False, buffered=0, written=0)
+        with pytest.raises(ValueError):
+            store.recent()
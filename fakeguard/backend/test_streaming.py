@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from streaming import iter_lines, parse_record, encode_line
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(chunks, max_line_bytes=100):
+    async def run():
+        return [item async for item in iter_lines(_chunks(*chunks), max_line_bytes)]
+    return asyncio.run(run())
+
+
+class TestIterLines:
+    """Test splitting a chunked upload into lines"""
+
+    def test_lines_split_across_chunks(self):
+        """Test that lines spanning chunk boundaries are reassembled"""
+        assert collect([b'{"a"', b':1}\n{"b":2}\n{"c"', b":3}"]) == [
+            (1, b'{"a":1}'), (2, b'{"b":2}'), (3, b'{"c":3}')
+        ]
+
+    def test_overlong_lines_are_reported_and_skipped(self):
+        """Test that lines above the limit are yielded as None without buffering"""
+        assert collect([b"x" * 8, b"x" * 8 + b"\nok\n"], max_line_bytes=10) == [(1, None), (2, b"ok")]
+        assert collect([b"ok\n" + b"x" * 20], max_line_bytes=10) == [(1, b"ok"), (2, None)]
+
+
+class TestParseRecord:
+    """Test NDJSON record parsing"""
+
+    def test_valid_record(self):
+        """Test that id and text are extracted"""
+        assert parse_record(b'{"id": 7, "text": "hello"}') == (7, "hello")
+
+    @pytest.mark.parametrize("line", [b"not json", b"[1, 2]", b'{"id": 1}', b'{"text": 5}'])
+    def test_invalid_records(self, line):
+        """Test that malformed records raise ValueError"""
+        with pytest.raises(ValueError):
+            parse_record(line)
+
+    def test_encode_line(self):
+        """Test that results are compact single lines"""
+        assert encode_line({"id": 1, "error": "x"}) == b'{"id":1,"error":"x"}\n'
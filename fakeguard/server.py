@@ -1,50 +1,424 @@
 #!/usr/bin/env python3
 """
 Simple HTTP Server for FakeGuard Website
-Serves index.html on http://localhost:8000
+Serves index.html on http://localhost:8000 (or the port given as argument)
+
+Connections are handled on threads. Files are kept in memory until they change
+on disk, and every response carries an ETag so revalidation costs a 304.
+Fingerprinted build assets (name.<hash>.js) are cached by browsers for a year.
+Compressible files are served gzip- or brotli-encoded, either from `.gz`/`.br`
+files next to them or from variants built when the file is loaded; all of them
+are loaded at startup. Files too large to cache are sent with sendfile (or
+from a memory map where the platform has no sendfile), and byte ranges are
+supported for partial downloads and media seeking.
+
+Usage:
+    python server.py [port]
 """
 
+import gzip
 import http.server
-import socketserver
+import io
+import mimetypes
+import mmap
 import os
+import re
 import sys
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional
+    brotli = None
+
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent.absolute()
-os.chdir(SCRIPT_DIR)
 
-PORT = 8000
-HANDLER = http.server.SimpleHTTPRequestHandler
+DEFAULT_PORT = 8000
+
+# Files up to this size are kept in memory, within a total budget
+CACHE_MAX_FILE_BYTES = 1024 * 1024
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Chunk size when writing from a memory map without sendfile
+MMAP_CHUNK_BYTES = 1024 * 1024
+
+# Content types worth compressing; smaller files are sent as they are
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+COMPRESS_MIN_BYTES = 512
+
+# Directories not preloaded at startup
+SKIPPED_DIRS = {"node_modules", "__pycache__"}
+
+# Build tools put a content hash in the name (main.3f2a9c1e.js), so the URL
+# changes whenever the content does
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[a-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Content codings in order of preference, with the suffix of their precompressed files
+ENCODINGS = (("br", ".br"), ("gzip", ".gz")) if brotli else (("gzip", ".gz"),)
+
+
+class CachedFile:
+    """A file's body, its compressed variants and validators, as of one mtime"""
+
+    def __init__(self, path: Path, stat: os.stat_result, content_type: str):
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.content_type = content_type
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.body = path.read_bytes()
+        # coding -> body
+        self.variants = {}
+        if self.size >= COMPRESS_MIN_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            for coding, suffix in ENCODINGS:
+                self.variants[coding] = self._precompressed(path, suffix) or self._compress(coding)
+
+    def _precompressed(self, path: Path, suffix: str):
+        """Body of a `.gz`/`.br` file built alongside this one, unless it is stale"""
+        variant = path.with_name(path.name + suffix)
+        try:
+            if variant.stat().st_mtime_ns >= self.mtime_ns:
+                return variant.read_bytes()
+        except OSError:
+            pass
+        return None
+
+    def _compress(self, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(self.body)
+        return gzip.compress(self.body, compresslevel=9, mtime=0)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.variants.values())
+
+
+class FileCache:
+    """Thread-safe LRU cache of small files, invalidated when their mtime changes"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, max_file_bytes: int = CACHE_MAX_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.nbytes = 0
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, stat: os.stat_result, content_type: str):
+        """The cached file for `path` at `stat`, loading it if needed; None if it is too large to cache"""
+        if stat.st_size > self.max_file_bytes:
+            return None
+        key = str(path)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._files.move_to_end(key)
+                return entry
+        # Load outside the lock; two threads may load the same file, which is harmless
+        entry = CachedFile(path, stat, content_type)
+        with self._lock:
+            previous = self._files.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._files[key] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes and len(self._files) > 1:
+                _, evicted = self._files.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings a client accepts, from its Accept-Encoding header"""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def guess_content_type(path: Path) -> str:
+    return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison)"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def parse_range(header: str, size: int):
+    """
+    (first, last) byte positions of a single-range `Range` header, None to send
+    the whole file, or False when the range cannot be satisfied
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # Other units and multiple ranges: answer with the whole file
+        return None
+    first, sep, last = spec.strip().partition("-")
+    try:
+        if not sep:
+            return None
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+        first = int(first)
+        last = int(last) if last else None
+    except ValueError:
+        return None
+    if last is not None and first > last:
+        return None
+    if first >= size:
+        return False
+    return first, size - 1 if last is None else min(last, size - 1)
+
+
+class FileRange:
+    """An open file and the byte range of it to send"""
+
+    def __init__(self, f, offset: int, count: int):
+        self.file = f
+        self.offset = offset
+        self.count = count
+
+    def send(self, sock, wfile):
+        """Copy the range to the client without passing it through Python buffers"""
+        if self.count == 0:
+            return
+        if hasattr(os, "sendfile"):
+            sock.sendfile(self.file, self.offset, self.count)
+        else:
+            self._send_mapped(wfile)
+
+    def _send_mapped(self, wfile):
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = min(self.offset + self.count, len(mapped))
+            with memoryview(mapped) as view:
+                for start in range(self.offset, end, MMAP_CHUNK_BYTES):
+                    wfile.write(view[start:min(start + MMAP_CHUNK_BYTES, end)])
+
+    def close(self):
+        self.file.close()
+
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def end_headers(self):
-        # Add cache control headers to prevent caching
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
-        super().end_headers()
+    # Keep-alive, so a page and its assets share one connection
+    protocol_version = "HTTP/1.1"
 
-try:
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
-        print("=" * 60)
-        print("🚀 FakeGuard Server Started!")
-        print("=" * 60)
-        print(f"\n✅ Server running at: http://localhost:{PORT}")
-        print(f"📁 Serving files from: {SCRIPT_DIR}")
-        print(f"\n🌐 Open your browser and go to:")
-        print(f"   👉 http://localhost:{PORT}\n")
-        print("=" * 60)
-        print("Press Ctrl+C to stop the server")
-        print("=" * 60 + "\n")
-        
-        httpd.serve_forever()
-        
-except KeyboardInterrupt:
-    print("\n\n❌ Server stopped by user")
-    sys.exit(0)
-except OSError as e:
-    print(f"\n❌ Error: {e}")
-    print(f"\nPort {PORT} might be in use. Try running with a different port:")
-    print(f"   python server.py 8080")
-    sys.exit(1)
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            if not self.path.split("?", 1)[0].endswith("/"):
+                # Redirect to the trailing slash, as the parent class does
+                return super().send_head()
+            path = path / "index.html"
+        try:
+            stat = path.stat()
+        except OSError:
+            if path.name == "index.html":
+                # No index: fall back to the parent's directory listing
+                return super().send_head()
+            self.send_error(404, "File not found")
+            return None
+
+        cache_control = IMMUTABLE if HASHED_NAME.search(path.name) else REVALIDATE
+        entry = self.server.file_cache.get(path, stat, guess_content_type(path))
+        if entry is None:
+            return self._send_uncached(path, stat, cache_control)
+
+        coding = None
+        if entry.variants:
+            accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+            coding = next((c for c, _ in ENCODINGS if c in entry.variants and (c in accepted or "*" in accepted)), None)
+        etag = entry.etag if coding is None else f'{entry.etag[:-1]}-{coding}"'
+        body = entry.body if coding is None else entry.variants[coding]
+
+        if self._not_modified(etag, stat):
+            self.send_response(304)
+            self._send_validators(etag, entry.last_modified, cache_control, vary=bool(entry.variants))
+            self.end_headers()
+            return None
+
+        # Ranges are only served from the identity encoding
+        byte_range = self._requested_range(len(body), etag, entry.last_modified) if coding is None else None
+        if byte_range is False:
+            return self._send_unsatisfiable(len(body))
+        first, last = byte_range or (0, len(body) - 1)
+        self._send_file_headers(entry.content_type, len(body), byte_range)
+        if coding is not None:
+            self.send_header("Content-Encoding", coding)
+        self._send_validators(etag, entry.last_modified, cache_control, vary=bool(entry.variants))
+        self.end_headers()
+        return io.BytesIO(body[first:last + 1] if byte_range else body)
+
+    def _send_uncached(self, path: Path, stat: os.stat_result, cache_control: str):
+        """Large files are sent from disk with sendfile, with the same validators"""
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        if self._not_modified(etag, stat):
+            self.send_response(304)
+            self._send_validators(etag, last_modified, cache_control)
+            self.end_headers()
+            return None
+        byte_range = self._requested_range(stat.st_size, etag, last_modified)
+        if byte_range is False:
+            return self._send_unsatisfiable(stat.st_size)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        first, last = byte_range or (0, stat.st_size - 1)
+        self._send_file_headers(guess_content_type(path), stat.st_size, byte_range)
+        self._send_validators(etag, last_modified, cache_control)
+        self.end_headers()
+        return FileRange(f, first, last - first + 1)
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, FileRange):
+            source.send(self.connection, outputfile)
+        else:
+            super().copyfile(source, outputfile)
+
+    def _requested_range(self, size: int, etag: str, last_modified: str):
+        """The byte range to send, honouring If-Range; see parse_range"""
+        header = self.headers.get("Range")
+        if header is None or size == 0:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range.strip() not in (etag, last_modified):
+            # The client's partial copy is stale: send the whole file
+            return None
+        return parse_range(header, size)
+
+    def _send_file_headers(self, content_type: str, size: int, byte_range):
+        """Status line, type and length of a full (200) or partial (206) response"""
+        if byte_range:
+            first, last = byte_range
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+            size = last - first + 1
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(size))
+        self.send_header("Accept-Ranges", "bytes")
+
+    def _send_unsatisfiable(self, size: int):
+        self.send_response(416)
+        self.send_header("Content-Range", f"bytes */{size}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return None
+
+    def _not_modified(self, etag: str, stat: os.stat_result) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+        return False
+
+    def _send_validators(self, etag: str, last_modified: str, cache_control: str, vary: bool = False):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Cache-Control", cache_control)
+        if vary:
+            self.send_header("Vary", "Accept-Encoding")
+
+
+class FakeGuardServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server sharing one file cache between its handler threads"""
+
+    daemon_threads = True
+
+    def __init__(self, address, directory: Path = SCRIPT_DIR):
+        self.directory = directory
+        self.file_cache = FileCache()
+        super().__init__(address, partial(MyHTTPRequestHandler, directory=str(directory)))
+
+    def preload(self) -> int:
+        """Load (and compress) every cacheable file up front; returns the number of files cached"""
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS and not d.startswith(".")]
+            for name in files:
+                path = Path(root) / name
+                if name.startswith(".") or name.endswith((".gz", ".br")):
+                    continue
+                try:
+                    self.file_cache.get(path, path.stat(), guess_content_type(path))
+                except OSError:
+                    continue
+        return len(self.file_cache)
+
+
+def parse_port(argv) -> int:
+    return int(argv[1]) if len(argv) > 1 else DEFAULT_PORT
+
+
+def main(argv=None) -> int:
+    argv = sys.argv if argv is None else argv
+    try:
+        port = parse_port(argv)
+    except ValueError:
+        print(f"\n❌ Error: invalid port '{argv[1]}'")
+        print(f"\nUsage: python server.py [port]")
+        return 1
+
+    try:
+        with FakeGuardServer(("", port)) as httpd:
+            cached = httpd.preload()
+            print("=" * 60)
+            print("🚀 FakeGuard Server Started!")
+            print("=" * 60)
+            print(f"\n✅ Server running at: http://localhost:{port}")
+            print(f"📁 Serving files from: {SCRIPT_DIR}")
+            print(f"📦 {cached} files cached ({httpd.file_cache.nbytes // 1024} KB with compressed variants)")
+            print(f"\n🌐 Open your browser and go to:")
+            print(f"   👉 http://localhost:{port}\n")
+            print("=" * 60)
+            print("Press Ctrl+C to stop the server")
+            print("=" * 60 + "\n")
+
+            httpd.serve_forever()
+
+    except KeyboardInterrupt:
+        print("\n\n❌ Server stopped by user")
+        return 0
+    except OSError as e:
+        print(f"\n❌ Error: {e}")
+        print(f"\nPort {port} might be in use. Try running with a different port:")
+        print(f"   python server.py 8080")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
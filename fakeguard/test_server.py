@@ -0,0 +1,182 @@
+"""
+Tests for the static file server
+"""
+import gzip
+import http.client
+import os
+import threading
+
+import pytest
+from server import CACHE_MAX_FILE_BYTES, FakeGuardServer, parse_range
+
+# Too large for the file cache, so it is sent with sendfile
+LARGE = bytes(range(256)) * (CACHE_MAX_FILE_BYTES // 256 + 17)
+PAGE = "<html><body>" + "<p>FakeGuard checks news articles.</p>" * 40 + "</body></html>"
+
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / "index.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "app.js").write_text("console.log('ok');", encoding="utf-8")
+    (tmp_path / "video.bin").write_bytes(LARGE)
+    return tmp_path
+
+
+@pytest.fixture
+def server(site):
+    httpd = FakeGuardServer(("127.0.0.1", 0), directory=site)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(server, path, **headers):
+    """Status, headers and body of one GET request"""
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        connection.request("GET", path, headers={name.replace("_", "-"): value for name, value in headers.items()})
+        response = connection.getresponse()
+        return response.status, response.headers, response.read()
+    finally:
+        connection.close()
+
+
+class TestStaticFiles:
+    """Test caching headers, revalidation and encoded variants"""
+
+    def test_serves_file_with_validators(self, server):
+        """Test that a file is served with an ETag, Last-Modified and a revalidate policy"""
+        status, headers, body = get(server, "/index.html")
+        assert status == 200
+        assert body.decode("utf-8") == PAGE
+        assert headers["ETag"] and headers["Last-Modified"]
+        assert headers["Cache-Control"] == "no-cache"
+        assert int(headers["Content-Length"]) == len(body)
+
+    def test_directory_serves_index(self, server):
+        """Test that the site root serves index.html"""
+        status, _, body = get(server, "/")
+        assert status == 200
+        assert body.decode("utf-8") == PAGE
+
+    def test_if_none_match_returns_304(self, server):
+        """Test that a matching ETag is answered with an empty 304"""
+        _, headers, _ = get(server, "/app.js")
+        status, revalidated, body = get(server, "/app.js", If_None_Match=headers["ETag"])
+        assert status == 304
+        assert body == b""
+        assert revalidated["ETag"] == headers["ETag"]
+
+    def test_stale_etag_returns_file(self, server):
+        """Test that a non-matching ETag gets the full file"""
+        status, _, body = get(server, "/app.js", If_None_Match='"stale"')
+        assert status == 200
+        assert body == b"console.log('ok');"
+
+    def test_gzip_variant_with_vary(self, server):
+        """Test that compressible files are sent gzip-encoded with their own ETag and Vary"""
+        _, identity, _ = get(server, "/index.html")
+        status, headers, body = get(server, "/index.html", Accept_Encoding="gzip")
+        assert status == 200
+        assert headers["Content-Encoding"] == "gzip"
+        assert headers["Vary"] == "Accept-Encoding"
+        assert identity["Vary"] == "Accept-Encoding"
+        assert headers["ETag"] != identity["ETag"]
+        assert gzip.decompress(body).decode("utf-8") == PAGE
+
+        status, _, _ = get(server, "/index.html", Accept_Encoding="gzip", If_None_Match=headers["ETag"])
+        assert status == 304
+
+    def test_small_files_are_not_encoded(self, server):
+        """Test that files below the compression threshold are sent as they are, without Vary"""
+        _, headers, body = get(server, "/app.js", Accept_Encoding="gzip")
+        assert "Content-Encoding" not in headers
+        assert "Vary" not in headers
+        assert body == b"console.log('ok');"
+
+    def test_changed_file_invalidates_cache(self, server, site):
+        """Test that a new mtime replaces the cached body and the ETag"""
+        _, before, _ = get(server, "/app.js")
+        path = site / "app.js"
+        path.write_text("console.log('changed');", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        status, after, body = get(server, "/app.js", If_None_Match=before["ETag"])
+        assert status == 200
+        assert body == b"console.log('changed');"
+        assert after["ETag"] != before["ETag"]
+
+    def test_missing_file_returns_404(self, server):
+        """Test that unknown paths are 404"""
+        status, _, _ = get(server, "/missing.js")
+        assert status == 404
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=1000-", False),
+    ("bytes=-0", False),
+    ("bytes=0-9,20-29", None),
+    ("bytes=50-10", None),
+    ("bytes=abc-", None),
+    ("bytes=5", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    """Test single, open-ended, suffix and unsatisfiable ranges over a 1000-byte file"""
+    assert parse_range(header, 1000) == expected
+
+
+class TestRanges:
+    """Test partial responses from cached and sendfile-served files"""
+
+    def test_large_file_served_whole(self, server):
+        """Test that a file over the cache limit is sent in full from disk"""
+        status, headers, body = get(server, "/video.bin")
+        assert status == 200
+        assert headers["Accept-Ranges"] == "bytes"
+        assert body == LARGE
+        assert len(server.file_cache) == 0
+
+    def test_large_file_range(self, server):
+        """Test that a range of an uncached file gets 206 with Content-Range"""
+        first, last = CACHE_MAX_FILE_BYTES - 10, CACHE_MAX_FILE_BYTES + 4095
+        status, headers, body = get(server, "/video.bin", Range=f"bytes={first}-{last}")
+        assert status == 206
+        assert headers["Content-Range"] == f"bytes {first}-{last}/{len(LARGE)}"
+        assert int(headers["Content-Length"]) == last - first + 1
+        assert body == LARGE[first:last + 1]
+
+    def test_suffix_and_open_ended_ranges(self, server):
+        """Test suffix (-N) and open-ended (N-) ranges"""
+        status, _, body = get(server, "/video.bin", Range="bytes=-100")
+        assert status == 206
+        assert body == LARGE[-100:]
+        status, _, body = get(server, "/index.html", Range="bytes=12-")
+        assert status == 206
+        assert body.decode("utf-8") == PAGE[12:]
+
+    def test_unsatisfiable_range_returns_416(self, server):
+        """Test that a range past the end is 416 with the file size"""
+        for path, size in (("/video.bin", len(LARGE)), ("/app.js", len("console.log('ok');"))):
+            status, headers, body = get(server, path, Range=f"bytes={size}-")
+            assert status == 416
+            assert headers["Content-Range"] == f"bytes */{size}"
+            assert body == b""
+
+    def test_if_range(self, server):
+        """Test that If-Range with the current ETag gets the range and a stale one the whole file"""
+        _, headers, _ = get(server, "/video.bin")
+        status, _, body = get(server, "/video.bin", Range="bytes=0-9", If_Range=headers["ETag"])
+        assert status == 206
+        assert body == LARGE[:10]
+        status, _, body = get(server, "/video.bin", Range="bytes=0-9", If_Range='"stale"')
+        assert status == 200
+        assert body == LARGE